@@ -0,0 +1,38 @@
+"""Order keyset pagination indexes
+
+Revision ID: 0001_order_keyset_indexes
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_order_keyset_indexes'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Fresh databases get these indexes from Base.metadata.create_all()
+    if not sa.inspect(op.get_bind()).has_table("orders"):
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_project_id "
+            "ON orders (project_id, id)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_project_status_id "
+            "ON orders (project_id, status_id, id)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_order_project_status_id")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_order_project_id")
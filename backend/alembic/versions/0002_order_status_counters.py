@@ -0,0 +1,43 @@
+"""Per-status order counters
+
+Revision ID: 0002_order_status_counters
+Revises: 0001_order_keyset_indexes
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_order_status_counters'
+down_revision = '0001_order_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # Fresh databases get the table from Base.metadata.create_all()
+    if not inspector.has_table("orders"):
+        return
+
+    if not inspector.has_table("order_status_counters"):
+        op.create_table(
+            'order_status_counters',
+            sa.Column('project_id', sa.Integer(), sa.ForeignKey('projects.id'), primary_key=True),
+            sa.Column('status_id', sa.Integer(), sa.ForeignKey('order_statuses.id', ondelete='CASCADE'), primary_key=True),
+            sa.Column('orders_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+    # Seed counters from existing orders
+    op.execute(
+        "INSERT INTO order_status_counters (project_id, status_id, orders_count) "
+        "SELECT project_id, status_id, count(*) FROM orders GROUP BY project_id, status_id "
+        "ON CONFLICT (project_id, status_id) DO UPDATE SET orders_count = EXCLUDED.orders_count"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('order_status_counters')
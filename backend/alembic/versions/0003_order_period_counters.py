@@ -0,0 +1,39 @@
+"""Per-project day/month order counters
+
+Revision ID: 0003_order_period_counters
+Revises: 0002_order_status_counters
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_order_period_counters'
+down_revision = '0002_order_status_counters'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # Fresh databases get the table from Base.metadata.create_all()
+    if not inspector.has_table("orders") or inspector.has_table("order_period_counters"):
+        return
+
+    # Counters for existing orders are filled by
+    # python -m app.scripts.backfill_order_counters (bucketed in project timezones)
+    op.create_table(
+        'order_period_counters',
+        sa.Column('project_id', sa.Integer(), sa.ForeignKey('projects.id'), primary_key=True),
+        sa.Column('period', sa.String(5), primary_key=True),
+        sa.Column('period_start', sa.Date(), primary_key=True),
+        sa.Column('created_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('accepted_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('order_period_counters')
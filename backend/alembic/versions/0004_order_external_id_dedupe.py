@@ -0,0 +1,43 @@
+"""Opt-in (project_id, external_id) uniqueness for orders
+
+Revision ID: 0004_order_external_id_dedupe
+Revises: 0003_order_period_counters
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_order_external_id_dedupe'
+down_revision = '0003_order_period_counters'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # Fresh databases get the column and index from Base.metadata.create_all()
+    if not inspector.has_table("orders"):
+        return
+
+    columns = {column["name"] for column in inspector.get_columns("orders")}
+    if "external_id_unique" not in columns:
+        # Constant default: no table rewrite on PostgreSQL 11+
+        op.add_column(
+            'orders',
+            sa.Column('external_id_unique', sa.Boolean(), nullable=False, server_default=sa.false())
+        )
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_order_project_external_id "
+            "ON orders (project_id, external_id) WHERE external_id_unique"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_order_project_external_id")
+    op.drop_column('orders', 'external_id_unique')
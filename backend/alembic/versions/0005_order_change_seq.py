@@ -0,0 +1,66 @@
+"""Per-project order change sequence for incremental sync
+
+Revision ID: 0005_order_change_seq
+Revises: 0004_order_external_id_dedupe
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.models.order import ORDER_CHANGE_SEQ_DDL
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_order_change_seq'
+down_revision = '0004_order_external_id_dedupe'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # Fresh databases get the tables and trigger from Base.metadata.create_all()
+    if not inspector.has_table("orders"):
+        return
+
+    if not inspector.has_table("order_change_seqs"):
+        op.create_table(
+            'order_change_seqs',
+            sa.Column('project_id', sa.Integer(), sa.ForeignKey('projects.id'), primary_key=True),
+            sa.Column('last_seq', sa.BigInteger(), nullable=False, server_default='0'),
+        )
+
+    if not inspector.has_table("order_deletions"):
+        op.create_table(
+            'order_deletions',
+            sa.Column('project_id', sa.Integer(), sa.ForeignKey('projects.id'), primary_key=True),
+            sa.Column('change_seq', sa.BigInteger(), primary_key=True),
+            sa.Column('order_id', sa.Integer(), nullable=False),
+            sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index('ix_order_deletions_deleted_at', 'order_deletions', ['deleted_at'])
+
+    # Existing orders keep NULL: integrators start with a full load, then follow the feed
+    columns = {column["name"] for column in inspector.get_columns("orders")}
+    if "change_seq" not in columns:
+        op.add_column('orders', sa.Column('change_seq', sa.BigInteger(), nullable=True))
+
+    op.execute("DROP TRIGGER IF EXISTS orders_change_seq ON orders")
+    for statement in ORDER_CHANGE_SEQ_DDL:
+        op.execute(statement)
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_project_change_seq "
+            "ON orders (project_id, change_seq)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_order_project_change_seq")
+    op.execute("DROP TRIGGER IF EXISTS orders_change_seq ON orders")
+    op.execute("DROP FUNCTION IF EXISTS orders_bump_change_seq()")
+    op.drop_column('orders', 'change_seq')
+    op.drop_table('order_deletions')
+    op.drop_table('order_change_seqs')
@@ -0,0 +1,48 @@
+"""Keyset pagination indexes for the admin order list sorts
+
+Revision ID: 0006_order_sort_keyset_indexes
+Revises: 0005_order_change_seq
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_order_sort_keyset_indexes'
+down_revision = '0005_order_change_seq'
+branch_labels = None
+depends_on = None
+
+
+# (project_id, <sort column>, id) for every sort_by of GET /orders
+INDEXES = {
+    "idx_order_project_created_id": "project_id, created_at, id",
+    "idx_order_project_modified_id": "project_id, coalesce(updated_at, created_at), id",
+    "idx_order_project_status_updated_id": "project_id, status_updated_at, id",
+    "idx_order_project_amount_id": "project_id, total_amount, id",
+    "idx_order_project_name_id": "project_id, customer_name, id",
+}
+
+
+def upgrade() -> None:
+    # Fresh databases get these indexes from Base.metadata.create_all()
+    if not sa.inspect(op.get_bind()).has_table("orders"):
+        return
+
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON orders ({columns})")
+        # Prefix of idx_order_project_created_id
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_order_project_created")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_project_created "
+            "ON orders (project_id, created_at)"
+        )
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
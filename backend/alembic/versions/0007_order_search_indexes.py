@@ -0,0 +1,44 @@
+"""Trigram search indexes on order name, email and phone digits
+
+Revision ID: 0007_order_search_indexes
+Revises: 0006_order_sort_keyset_indexes
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_order_search_indexes'
+down_revision = '0006_order_sort_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+
+# Must match phone_digits_sql() in app/utils/phone.py
+PHONE_DIGITS = r"right(regexp_replace(customer_phone, '\D', '', 'g'), 10)"
+
+INDEXES = {
+    "idx_order_name_trgm": "customer_name gin_trgm_ops",
+    "idx_order_email_trgm": "customer_email gin_trgm_ops",
+    "idx_order_phone_digits_trgm": f"({PHONE_DIGITS}) gin_trgm_ops",
+}
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Fresh databases get these indexes from Base.metadata.create_all()
+    if not sa.inspect(op.get_bind()).has_table("orders"):
+        return
+
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON orders USING gin ({columns})")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
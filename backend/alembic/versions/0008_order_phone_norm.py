@@ -0,0 +1,45 @@
+"""Normalized (E.164) customer phone on orders
+
+Revision ID: 0008_order_phone_norm
+Revises: 0007_order_search_indexes
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.models.order import ORDER_CHANGE_SEQ_DDL
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_order_phone_norm'
+down_revision = '0007_order_search_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # Fresh databases get the column and index from Base.metadata.create_all()
+    if not inspector.has_table("orders"):
+        return
+
+    columns = {column["name"] for column in inspector.get_columns("orders")}
+    if "phone_norm" not in columns:
+        op.add_column('orders', sa.Column('phone_norm', sa.String(16), nullable=True))
+
+    # Trigger function learns app.skip_change_seq, used by the backfill
+    op.execute(ORDER_CHANGE_SEQ_DDL[0])
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_project_phone_norm "
+            "ON orders (project_id, phone_norm)"
+        )
+
+    # Existing rows are filled by app.celery_app.tasks.maintenance.backfill_phone_norm
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_order_project_phone_norm")
+    op.drop_column('orders', 'phone_norm')
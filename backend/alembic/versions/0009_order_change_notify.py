@@ -0,0 +1,31 @@
+"""NOTIFY order_changes from the change sequence trigger (live order feed)
+
+Revision ID: 0009_order_change_notify
+Revises: 0008_order_phone_norm
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.models.order import ORDER_CHANGE_SEQ_DDL
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_order_change_notify'
+down_revision = '0008_order_phone_norm'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # Fresh databases get the function from Base.metadata.create_all()
+    if not inspector.has_table("orders"):
+        return
+
+    op.execute(ORDER_CHANGE_SEQ_DDL[0])
+
+
+def downgrade() -> None:
+    # Notifications nobody listens to are dropped; the function stays as is
+    pass
@@ -0,0 +1,39 @@
+"""Monthly partitions of order_history by created_at (ORDER_HISTORY_PARTITIONING)
+
+Revision ID: 0010_order_history_partitions
+Revises: 0009_order_change_notify
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.config import settings
+from app.services.partitions import is_partitioned, rebuild_table
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_order_history_partitions'
+down_revision = '0009_order_change_notify'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("order_history"):
+        return
+
+    # Opt-in: copies the whole table in this transaction (plan a maintenance window).
+    # To enable later, set ORDER_HISTORY_PARTITIONING and re-run this revision
+    # (alembic downgrade 0009_order_change_notify && alembic upgrade head).
+    if not settings.ORDER_HISTORY_PARTITIONING or is_partitioned(bind, "order_history"):
+        return
+
+    rebuild_table(bind, "order_history", partitioned=True, months_ahead=settings.PARTITION_PREMAKE_MONTHS)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if is_partitioned(bind, "order_history"):
+        rebuild_table(bind, "order_history", partitioned=False)
@@ -0,0 +1,48 @@
+"""Keyset pagination index of the order history
+
+Revision ID: 0011_order_history_keyset_index
+Revises: 0010_order_history_partitions
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.services.partitions import is_partitioned
+
+
+# revision identifiers, used by Alembic.
+revision = '0011_order_history_keyset_index'
+down_revision = '0010_order_history_partitions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Fresh databases get this index from Base.metadata.create_all()
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("order_history"):
+        return
+
+    if is_partitioned(bind, "order_history"):
+        # CONCURRENTLY isn't supported on partitioned tables; the index cascades to the partitions
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS idx_order_history_order_created "
+            "ON order_history (order_id, created_at, id)"
+        )
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_history_order_created "
+            "ON order_history (order_id, created_at, id)"
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if is_partitioned(bind, "order_history"):
+        op.execute("DROP INDEX IF EXISTS idx_order_history_order_created")
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_order_history_order_created")
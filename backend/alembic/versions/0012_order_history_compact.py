@@ -0,0 +1,96 @@
+"""Compact order history: one record per mutation with a JSON diff
+
+Revision ID: 0012_order_history_compact
+Revises: 0011_order_history_keyset_index
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012_order_history_compact'
+down_revision = '0011_order_history_keyset_index'
+branch_labels = None
+depends_on = None
+
+
+# Orders whose history is compacted per statement
+COMPACT_BATCH_ORDERS = 10000
+
+# Field rows written by one update share order, author, action, comment and
+# transaction time; each group becomes its lowest-id row holding all fields.
+# One statement per batch, so every batch is applied atomically.
+COMPACT_SQL = """
+WITH groups AS (
+    SELECT
+        order_id,
+        created_at,
+        min(id) AS keep_id,
+        array_agg(id) AS ids,
+        json_object_agg(field_name, json_build_array(old_value, new_value) ORDER BY id) AS changes
+    FROM order_history
+    WHERE order_id >= :first AND order_id < :last
+        AND changes IS NULL AND field_name IS NOT NULL
+    GROUP BY order_id, user_id, action, comment, created_at
+    HAVING count(*) > 1 AND count(*) = count(DISTINCT field_name)
+),
+compacted AS (
+    UPDATE order_history
+    SET changes = groups.changes, field_name = NULL, old_value = NULL, new_value = NULL
+    FROM groups
+    WHERE order_history.id = groups.keep_id AND order_history.created_at = groups.created_at
+)
+DELETE FROM order_history
+USING groups
+WHERE order_history.order_id = groups.order_id
+    AND order_history.created_at = groups.created_at
+    AND order_history.id = ANY(groups.ids)
+    AND order_history.id <> groups.keep_id
+"""
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("order_history"):
+        return
+
+    columns = {column["name"] for column in inspector.get_columns("order_history")}
+    if "changes" not in columns:
+        op.add_column('order_history', sa.Column('changes', sa.JSON(), nullable=True))
+    if "source" not in columns:
+        op.add_column('order_history', sa.Column('source', sa.String(length=50), nullable=True))
+
+    # Existing history is compacted in short transactions, batch by batch
+    # of order IDs, so the table stays writable meanwhile
+    with op.get_context().autocommit_block():
+        last_order_id = bind.execute(sa.text("SELECT max(order_id) FROM order_history")).scalar() or 0
+        for first in range(0, last_order_id + 1, COMPACT_BATCH_ORDERS):
+            bind.execute(sa.text(COMPACT_SQL), {"first": first, "last": first + COMPACT_BATCH_ORDERS})
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("order_history"):
+        return
+
+    columns = {column["name"] for column in inspector.get_columns("order_history")}
+    if "source" in columns:
+        op.drop_column('order_history', 'source')
+    if "changes" not in columns:
+        return
+
+    # Expand compact records back into one row per field
+    op.execute(
+        "INSERT INTO order_history "
+        "(order_id, user_id, action, field_name, old_value, new_value, comment, ip_address, user_agent, created_at) "
+        "SELECT order_id, user_id, action, fields.key, fields.value->>0, fields.value->>1, "
+        "comment, ip_address, user_agent, created_at "
+        "FROM order_history, json_each(order_history.changes) AS fields "
+        "WHERE order_history.changes IS NOT NULL"
+    )
+    op.execute("DELETE FROM order_history WHERE changes IS NOT NULL")
+    op.drop_column('order_history', 'changes')
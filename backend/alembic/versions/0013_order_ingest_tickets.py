@@ -0,0 +1,38 @@
+"""Tickets of queued orders, committed with the orders
+
+Revision ID: 0013_order_ingest_tickets
+Revises: 0012_order_history_compact
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0013_order_ingest_tickets'
+down_revision = '0012_order_history_compact'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # Fresh databases get the table from Base.metadata.create_all()
+    if not inspector.has_table("orders") or inspector.has_table("order_ingest_tickets"):
+        return
+
+    op.create_table(
+        'order_ingest_tickets',
+        sa.Column('ticket', sa.String(length=64), primary_key=True),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_order_ingest_tickets_created_at', 'order_ingest_tickets', ['created_at'])
+
+
+def downgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("order_ingest_tickets"):
+        op.drop_index('ix_order_ingest_tickets_created_at', table_name='order_ingest_tickets')
+        op.drop_table('order_ingest_tickets')
@@ -9,7 +9,8 @@ from app.core.security import (
     get_password_hash, 
     create_access_token, 
     get_current_user,
-    generate_api_key
+    generate_api_key,
+    invalidate_user_identity
 )
 from app.core.config import settings
 from app.models.user import User, UserRole, UserStatus
@@ -90,6 +91,8 @@ async def login_user(
     stmt = update(User).where(User.id == user.id).values(last_login_at=func.now())
     await db.execute(stmt)
     await db.commit()
+    # /me reads last_login_at from the cached identity
+    await invalidate_user_identity(user.id)
     
     return TokenResponse(
         access_token=access_token,
@@ -131,6 +134,8 @@ async def login_simple(
     stmt = update(User).where(User.id == user.id).values(last_login_at=func.now())
     await db.execute(stmt)
     await db.commit()
+    # /me reads last_login_at from the cached identity
+    await invalidate_user_identity(user.id)
     
     return TokenResponse(
         access_token=access_token,
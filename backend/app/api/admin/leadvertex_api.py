@@ -1,27 +1,68 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, func, and_, or_, desc, asc
 from sqlalchemy.orm import selectinload
-from typing import List, Optional, Dict, Any, Union
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional, Dict, Any, Union, Tuple
 from datetime import datetime
-from app.core.database import get_async_db
+from decimal import Decimal, InvalidOperation
+import re
+from functools import lru_cache
+from app.core.config import settings
+from app.core.database import get_async_db, get_read_db, async_read_session
 from app.core.security import get_current_user, APIKeyAuth
 from app.models.user import User, Project, OrderStatus
-from app.models.order import Order, OrderHistory
+from app.models.order import Order, OrderItem, OrderHistory
 from app.schemas.main import (
     ProjectInfo, StatusListItem, OrderCreate, OrderUpdate, OrderResponse,
-    BaseResponse, PaginationParams
+    BaseResponse, PaginationParams, StatusSnapshot
 )
 from app.utils.timezone import get_customer_timezone, convert_to_local_time
+from app.services.order_ingest import (
+    build_order_row, get_default_status_id, insert_orders, insert_order_once,
+    find_orders_by_external_ids, unique_external_id_enabled
+)
+from app.services.idempotency import (
+    claim_idempotency_key, store_idempotency_result, release_idempotency_key, MAX_KEY_LENGTH
+)
+from app.services.order_counters import (
+    StatusChange, apply_status_changes, get_period_counts, get_status_counts, lock_order_status
+)
+from app.services.order_queue import enqueue_order, get_ticket_result, OrderQueueFullError
+from app.services.project_config import get_project_config
+from app.services.order_changes import get_order_changes
+from app.services.order_mutations import lock_order_row, apply_order_update
+from app.services.order_history import HISTORY_SOURCE_API, request_context
+from app.utils.streaming import stream_json_array, stream_json_object
 
 router = APIRouter()
 
+# Upper bound for batch endpoints
+MAX_BATCH_IDS = 5000
+
+# Upper bound for addOrders.html
+MAX_BATCH_ORDERS = 1000
+
+# orders[0][name]=... style form fields
+FORM_ARRAY_FIELD = re.compile(r"^orders\[(\d+)\]\[(\w+)\]$")
+
+# Keyset page size for ID lists when only afterId is given
+DEFAULT_PAGE_IDS = 1000
+
+# Rows fetched per round-trip when streaming from a server-side cursor
+STREAM_BATCH_SIZE = 5000
+
+# Page size of getOrdersChanges.html (full order payloads)
+DEFAULT_PAGE_CHANGES = 500
+MAX_PAGE_CHANGES = 1000
+
 # LeadVertex Compatible API Endpoints
 
 @router.get("/getProjectInfo.html")
 async def get_project_info(
     token: str = Query(..., description="API token"),
-    db: AsyncSession = Depends(get_async_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get project information - LeadVertex API compatible"""
     # Authenticate using API key
@@ -29,46 +70,12 @@ async def get_project_info(
     auth_data = await auth(token, db)
     project = auth_data["project"]
     
-    # Get today's statistics
-    today = datetime.now().date()
-    
-    # Count today's orders
-    stmt = select(func.count(Order.id)).where(
-        and_(
-            Order.project_id == project.id,
-            func.date(Order.created_at) == today
-        )
-    )
-    result = await db.execute(stmt)
-    today_orders = result.scalar() or 0
-    
-    # Count today's accepted orders (orders in 'accepted' group)
-    stmt = (
-        select(func.count(Order.id))
-        .join(OrderStatus)
-        .where(
-            and_(
-                Order.project_id == project.id,
-                func.date(Order.created_at) == today,
-                OrderStatus.group == "accepted"
-            )
-        )
-    )
-    result = await db.execute(stmt)
-    today_accepted = result.scalar() or 0
-    
-    # Count orders for current month
-    from datetime import datetime
-    current_month = datetime.now().replace(day=1)
-    
-    stmt = select(func.count(Order.id)).where(
-        and_(
-            Order.project_id == project.id,
-            Order.created_at >= current_month
-        )
-    )
-    result = await db.execute(stmt)
-    orders_for_period = result.scalar() or 0
+    # Today's and this month's statistics from the maintained counters
+    # (day and month boundaries in the project's timezone)
+    period_counts = await get_period_counts(db, project.id, project.settings)
+    today_orders = period_counts["day"]["created"]
+    today_accepted = period_counts["day"]["accepted"]
+    orders_for_period = period_counts["month"]["created"]
     
     # Format response like LeadVertex
     response = {
@@ -90,7 +97,7 @@ async def get_project_info(
 @router.get("/getStatusList.html")
 async def get_status_list(
     token: str = Query(..., description="API token"),
-    db: AsyncSession = Depends(get_async_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get list of order statuses - LeadVertex API compatible"""
     # Authenticate using API key
@@ -98,31 +105,17 @@ async def get_status_list(
     auth_data = await auth(token, db)
     project = auth_data["project"]
     
-    # Get all statuses for project with order counts
-    stmt = (
-        select(
-            OrderStatus,
-            func.count(Order.id).label("order_count")
-        )
-        .outerjoin(Order, and_(
-            Order.status_id == OrderStatus.id,
-            Order.project_id == project.id
-        ))
-        .where(OrderStatus.project_id == project.id)
-        .group_by(OrderStatus.id)
-        .order_by(OrderStatus.position)
-    )
-    
-    result = await db.execute(stmt)
-    statuses_with_counts = result.all()
+    # Statuses come from the project config cache, counts from the maintained counters
+    config = await get_project_config(db, project.id)
+    counts = await get_status_counts(db, project.id)
     
     # Format response like LeadVertex
     response = {}
-    for i, (status, order_count) in enumerate(statuses_with_counts):
+    for i, status in enumerate(config.statuses):
         response[str(i)] = {
             "name": status.name,
             "group": status.group,
-            "orders": str(order_count or 0),
+            "orders": str(counts.get(status.id, 0)),
             "goodsQuantity": status.goods_quantity_action
         }
     
@@ -132,7 +125,9 @@ async def get_status_list(
 async def get_orders_ids_in_status(
     token: str = Query(..., description="API token"),
     status: int = Query(..., description="Status ID"),
-    db: AsyncSession = Depends(get_async_db)
+    afterId: Optional[int] = Query(None, description="Return IDs greater than this one"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_BATCH_IDS, description="Page size"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all order IDs in specific status - LeadVertex API compatible"""
     # Authenticate using API key
@@ -141,18 +136,12 @@ async def get_orders_ids_in_status(
     project = auth_data["project"]
     
     # Get order IDs in status
-    stmt = select(Order.id).where(
-        and_(
-            Order.project_id == project.id,
-            Order.status_id == status
-        )
-    ).order_by(Order.created_at.desc())
-    
-    result = await db.execute(stmt)
-    order_ids = result.scalars().all()
+    conditions = [
+        Order.project_id == project.id,
+        Order.status_id == status
+    ]
     
-    # Return as list of strings (LeadVertex format)
-    return [str(order_id) for order_id in order_ids]
+    return await _order_ids_response(db, conditions, afterId, limit)
 
 @router.get("/getOrdersIdsByCondition.html")
 async def get_orders_ids_by_condition(
@@ -172,7 +161,9 @@ async def get_orders_ids_by_condition(
     shippedTo: Optional[str] = Query(None, description="Shipped orders end date"),
     canceledFrom: Optional[str] = Query(None, description="Canceled orders start date"),
     canceledTo: Optional[str] = Query(None, description="Canceled orders end date"),
-    db: AsyncSession = Depends(get_async_db)
+    afterId: Optional[int] = Query(None, description="Return IDs greater than this one"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_BATCH_IDS, description="Page size"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Search orders by various conditions - LeadVertex API compatible"""
     # Authenticate using API key
@@ -282,18 +273,15 @@ async def get_orders_ids_by_condition(
             pass
     
     # Execute query
-    stmt = select(Order.id).where(and_(*conditions)).order_by(Order.created_at.desc())
-    result = await db.execute(stmt)
-    order_ids = result.scalars().all()
-    
-    # Return as list of strings (LeadVertex format)
-    return [str(order_id) for order_id in order_ids]
+    return await _order_ids_response(db, conditions, afterId, limit)
 
 @router.get("/getOrder.html")
 async def get_order(
     token: str = Query(..., description="API token"),
     id: int = Query(..., description="Order ID"),
-    db: AsyncSession = Depends(get_async_db)
+    fields: Optional[str] = Query(None, description="Comma-separated keys to return, e.g. id,status,phone"),
+    include: Optional[str] = Query(None, description="Comma-separated relations to return: operator, items"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get order details - LeadVertex API compatible"""
     # Authenticate using API key
@@ -301,19 +289,20 @@ async def get_order(
     auth_data = await auth(token, db)
     project = auth_data["project"]
     
-    # Get order with relations
-    stmt = (
-        select(Order)
-        .options(
-            selectinload(Order.status),
-            selectinload(Order.operator),
-            selectinload(Order.items)
+    try:
+        keys, relations = _parse_order_keys(fields, include)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-        .where(and_(Order.id == id, Order.project_id == project.id))
-    )
     
+    # Only the columns the requested keys need
+    stmt = select(*_order_key_columns(keys, relations)).where(
+        and_(Order.id == id, Order.project_id == project.id)
+    )
     result = await db.execute(stmt)
-    order = result.scalar_one_or_none()
+    order = result.one_or_none()
     
     if not order:
         raise HTTPException(
@@ -321,66 +310,133 @@ async def get_order(
             detail="Order not found"
         )
     
+    order_status = None
+    if "status" in keys:
+        config = await get_project_config(db, project.id)
+        order_status = config.status(order.status_id)
+    
+    operator = None
+    if "operator" in relations and order.operator_id:
+        operator = await db.get(User, order.operator_id)
+    
+    items = []
+    if "items" in relations:
+        result = await db.execute(
+            select(OrderItem).where(OrderItem.order_id == order.id).order_by(OrderItem.id)
+        )
+        items = result.scalars().all()
+    
     # Format response like LeadVertex
-    response = {
-        "id": order.id,
-        "externalId": order.external_id,
-        "status": order.status.name if order.status else "",
-        "statusId": order.status_id,
-        "name": order.customer_name,
-        "phone": order.customer_phone,
-        "email": order.customer_email,
-        "country": order.country,
-        "region": order.region,
-        "city": order.city,
-        "address": order.address,
-        "postalCode": order.postal_code,
-        "comment": order.comment,
-        "internalComment": order.internal_comment,
-        "totalAmount": float(order.total_amount),
-        "shippingCost": float(order.shipping_cost),
-        "trackingNumber": order.tracking_number,
-        "paymentMethod": order.payment_method,
-        "paymentStatus": order.payment_status,
-        "paidAmount": float(order.paid_amount),
-        "source": order.source,
-        "utmSource": order.utm_source,
-        "utmMedium": order.utm_medium,
-        "utmCampaign": order.utm_campaign,
-        "utmContent": order.utm_content,
-        "utmTerm": order.utm_term,
-        "operatorId": order.operator_id,
-        "operatorName": f"{order.operator.first_name} {order.operator.last_name}" if order.operator else None,
-        "callsCount": order.calls_count,
-        "lastCallResult": order.last_call_result,
-        "nextCallAt": order.next_call_at.strftime("%Y-%m-%d %H:%M:%S") if order.next_call_at else None,
-        "createdAt": order.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-        "updatedAt": order.updated_at.strftime("%Y-%m-%d %H:%M:%S") if order.updated_at else None,
-        "statusUpdatedAt": order.status_updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-        "approvedAt": order.approved_at.strftime("%Y-%m-%d %H:%M:%S") if order.approved_at else None,
-        "shippedAt": order.shipped_at.strftime("%Y-%m-%d %H:%M:%S") if order.shipped_at else None,
-        "canceledAt": order.canceled_at.strftime("%Y-%m-%d %H:%M:%S") if order.canceled_at else None,
-        "customFields": order.custom_fields,
-        "items": [
-            {
-                "id": item.id,
-                "productId": item.product_id,
-                "productName": item.product_name,
-                "productSku": item.product_sku,
-                "quantity": item.quantity,
-                "price": float(item.price),
-                "total": float(item.total)
-            }
-            for item in order.items
-        ]
-    }
+    return _format_order(order, order_status, operator, items, keys)
+
+@router.api_route("/getOrdersByIds.html", methods=["GET", "POST"])
+async def get_orders_by_ids(
+    request: Request,
+    token: str = Query(..., description="API token"),
+    ids: Optional[str] = Query(None, description="Order IDs, comma-separated"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get details for many orders at once - LeadVertex API compatible"""
+    # Authenticate using API key
+    auth = APIKeyAuth()
+    auth_data = await auth(token, db)
+    project = auth_data["project"]
     
-    return response
+    # Long ID lists may be sent as form data instead of query string
+    if ids is None and request.method == "POST":
+        form_data = await request.form()
+        ids = form_data.get("ids")
+    
+    try:
+        order_ids = list(dict.fromkeys(int(i) for i in (ids or "").split(",") if i.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers"
+        )
+    
+    if len(order_ids) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No more than {MAX_BATCH_IDS} ids per request"
+        )
+    
+    orders = []
+    if order_ids:
+        stmt = select(Order).where(
+            and_(Order.id.in_(order_ids), Order.project_id == project.id)
+        )
+        result = await db.execute(stmt)
+        orders = result.scalars().all()
+    
+    statuses, operators, items = await _load_order_relations(db, project.id, orders)
+    
+    # Keep the order of requested IDs
+    orders_by_id = {order.id: order for order in orders}
+    pairs = (
+        (
+            order_id,
+            _format_order(
+                orders_by_id[order_id],
+                statuses.get(orders_by_id[order_id].status_id),
+                operators.get(orders_by_id[order_id].operator_id),
+                items.get(order_id, [])
+            )
+        )
+        for order_id in order_ids if order_id in orders_by_id
+    )
+    
+    return StreamingResponse(stream_json_object(pairs), media_type="application/json")
+
+@router.get("/getOrdersChanges.html")
+async def get_orders_changes(
+    token: str = Query(..., description="API token"),
+    afterSeq: int = Query(0, ge=0, description="Last change sequence number already processed"),
+    limit: int = Query(DEFAULT_PAGE_CHANGES, ge=1, le=MAX_PAGE_CHANGES, description="Page size"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Orders created, updated or deleted after afterSeq, for incremental sync.
+    
+    Each order appears once with its current state. Pass lastSeq of the
+    response as afterSeq of the next request until hasMore is false.
+    """
+    # Authenticate using API key
+    auth = APIKeyAuth()
+    auth_data = await auth(token, db)
+    project = auth_data["project"]
+    
+    changes, orders, has_more = await get_order_changes(db, project.id, afterSeq, limit)
+    statuses, operators, items = await _load_order_relations(db, project.id, list(orders.values()))
+    
+    payload = []
+    for seq, order_id, deleted in changes:
+        order = orders.get(order_id)
+        if not deleted and order is None:
+            # Deleted since; its tombstone follows later in the feed
+            continue
+        payload.append({
+            "seq": seq,
+            "id": order_id,
+            "deleted": deleted,
+            "order": None if deleted else _format_order(
+                order,
+                statuses.get(order.status_id),
+                operators.get(order.operator_id),
+                items.get(order_id, [])
+            )
+        })
+    
+    return {
+        "changes": payload,
+        "lastSeq": changes[-1][0] if changes else afterSeq,
+        "hasMore": has_more
+    }
 
 @router.post("/addOrder.html")
 async def add_order(
     request: Request,
     token: str = Query(..., description="API token"),
+    wait: float = Query(0, ge=0, le=10, description="Seconds to wait for the order ID in queue mode"),
     db: AsyncSession = Depends(get_async_db)
 ):
     """Add new order - LeadVertex API compatible"""
@@ -392,89 +448,179 @@ async def add_order(
     # Get form data
     form_data = await request.form()
     
-    # Required fields
-    customer_name = form_data.get("name", "").strip()
-    customer_phone = form_data.get("phone", "").strip()
+    # Get default status (first processing status)
+    default_status_id = await get_default_status_id(db, project.id)
     
-    if not customer_name or not customer_phone:
+    if not default_status_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Name and phone are required"
+            detail="No processing status found in project"
         )
     
-    # Get default status (first processing status)
-    stmt = (
-        select(OrderStatus)
-        .where(and_(
-            OrderStatus.project_id == project.id,
-            OrderStatus.group == "processing"
-        ))
-        .order_by(OrderStatus.position)
-    )
-    result = await db.execute(stmt)
-    default_status = result.scalar_one_or_none()
+    try:
+        order_data = build_order_row(
+            project.id, form_data, default_status_id,
+            unique_external_id=unique_external_id_enabled(project.settings)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
-    if not default_status:
+    # Retries with the same Idempotency-Key get the original response
+    idempotency_key = request.headers.get("Idempotency-Key")
+    if idempotency_key:
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Idempotency-Key is longer than {MAX_KEY_LENGTH} characters"
+            )
+        
+        claimed, previous = await claim_idempotency_key("addOrder", project.id, idempotency_key)
+        if previous is not None:
+            return await _replay_add_order(previous)
+        if not claimed:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still being processed",
+                headers={"Retry-After": "1"}
+            )
+    
+    response = None
+    try:
+        response = await _create_order(db, project, order_data, wait)
+    finally:
+        # Also on cancellation (client gone, shutdown): the retry is processed again
+        if idempotency_key and response is None:
+            await release_idempotency_key("addOrder", project.id, idempotency_key)
+    
+    if idempotency_key:
+        await store_idempotency_result("addOrder", project.id, idempotency_key, response)
+    
+    return response
+
+@router.get("/getQueuedOrder.html")
+async def get_queued_order(
+    token: str = Query(..., description="API token"),
+    ticket: str = Query(..., description="Ticket returned by addOrder.html in queue mode"),
+    wait: float = Query(0, ge=0, le=10, description="Seconds to wait for the order ID"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Resolve a queued addOrder.html ticket to the order ID"""
+    # Authenticate using API key
+    auth = APIKeyAuth()
+    auth_data = await auth(token, db)
+    project = auth_data["project"]
+    await db.close()
+    
+    result = await get_ticket_result(ticket, wait)
+    
+    if not result:
+        return {"success": True, "queued": True, "ticket": ticket}
+    
+    if result.get("project_id") != project.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ticket not found"
+        )
+    
+    if result.get("error"):
+        return {"success": False, "error": result["error"]}
+    
+    return {"id": result["order_id"], "success": True}
+
+@router.post("/addOrders.html")
+async def add_orders(
+    request: Request,
+    token: str = Query(..., description="API token"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Add many orders in one transaction"""
+    # Authenticate using API key
+    auth = APIKeyAuth()
+    auth_data = await auth(token, db)
+    project = auth_data["project"]
+    
+    orders_data = await _read_orders_payload(request)
+    
+    if len(orders_data) > MAX_BATCH_ORDERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No more than {MAX_BATCH_ORDERS} orders per request"
+        )
+    
+    default_status_id = await get_default_status_id(db, project.id)
+    
+    if not default_status_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No processing status found in project"
         )
     
-    # Create order
-    order_data = {
-        "project_id": project.id,
-        "customer_name": customer_name,
-        "customer_phone": customer_phone,
-        "customer_email": form_data.get("email"),
-        "country": form_data.get("country", "Россия"),
-        "region": form_data.get("region"),
-        "city": form_data.get("city"),
-        "address": form_data.get("address"),
-        "postal_code": form_data.get("postalCode"),
-        "comment": form_data.get("comment"),
-        "total_amount": float(form_data.get("totalAmount", 0)),
-        "status_id": default_status.id,
-        "source": "api",
-        "external_id": form_data.get("externalId"),
-        "utm_source": form_data.get("utmSource"),
-        "utm_medium": form_data.get("utmMedium"),
-        "utm_campaign": form_data.get("utmCampaign"),
-        "utm_content": form_data.get("utmContent"),
-        "utm_term": form_data.get("utmTerm"),
-        "landing_url": form_data.get("landingUrl"),
-        "custom_fields": {}
-    }
+    unique_external_id = unique_external_id_enabled(project.settings)
     
-    # Add custom fields
-    for key, value in form_data.items():
-        if key.startswith("custom_"):
-            order_data["custom_fields"][key] = value
-    
-    # Detect customer timezone
-    if order_data["city"]:
-        order_data["customer_timezone"] = get_customer_timezone(order_data["city"])
-        if order_data["customer_timezone"]:
-            order_data["customer_local_time"] = convert_to_local_time(
-                datetime.utcnow(), 
-                order_data["customer_timezone"]
-            )
+    # Validate every order before touching the database
+    results = []
+    rows = []
+    for index, order_data in enumerate(orders_data):
+        try:
+            rows.append(build_order_row(
+                project.id, order_data, default_status_id,
+                unique_external_id=unique_external_id
+            ))
+            results.append({"index": index, "success": True})
+        except ValueError as e:
+            results.append({"index": index, "success": False, "error": str(e)})
+    
+    # Known or repeated externalIds resolve to the existing order instead of a new row
+    existing = {}
+    if unique_external_id:
+        existing = await find_orders_by_external_ids(
+            db, project.id, [row["external_id"] for row in rows if row["external_id_unique"]]
+        )
     
-    db_order = Order(**order_data)
-    db.add(db_order)
-    await db.commit()
-    await db.refresh(db_order)
+    new_rows = []
+    new_results = []
+    batch_duplicates = []
+    first_seen = {}
+    for row_result, row in zip([r for r in results if r["success"]], rows):
+        external_id = row["external_id"] if row["external_id_unique"] else None
+        if external_id in existing:
+            row_result["id"] = existing[external_id]
+        elif external_id in first_seen:
+            batch_duplicates.append((row_result, first_seen[external_id]))
+        else:
+            if external_id:
+                first_seen[external_id] = row_result
+            new_rows.append(row)
+            new_results.append(row_result)
+    
+    try:
+        order_ids = await insert_orders(db, new_rows, "Order created via API")
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if "uq_order_project_external_id" not in str(e.orig):
+            raise
+        # A concurrent request created one of these externalIds first
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="externalId was created by a concurrent request, retry",
+            headers={"Retry-After": "1"}
+        )
     
-    # Add to order history
-    history = OrderHistory(
-        order_id=db_order.id,
-        action="order_created",
-        comment="Order created via API"
-    )
-    db.add(history)
-    await db.commit()
+    for row_result, order_id in zip(new_results, order_ids):
+        row_result["id"] = order_id
+    for row_result, original in batch_duplicates:
+        row_result["id"] = original["id"]
     
-    # Return order ID (LeadVertex format)
-    return {"id": db_order.id, "success": True}
+    return {
+        "success": True,
+        "created": len(order_ids),
+        "failed": len(results) - len(rows),
+        "orders": results
+    }
 
 @router.post("/updateOrder.html")
 async def update_order(
@@ -489,20 +635,9 @@ async def update_order(
     auth_data = await auth(token, db)
     project = auth_data["project"]
     
-    # Get order
-    stmt = select(Order).where(and_(Order.id == id, Order.project_id == project.id))
-    result = await db.execute(stmt)
-    order = result.scalar_one_or_none()
-    
-    if not order:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Order not found"
-        )
-    
     # Get form data
     form_data = await request.form()
-    update_data = {}
+    changes = {}
     
     # Map form fields to order fields
     field_mapping = {
@@ -528,19 +663,16 @@ async def update_order(
         "externalId": "external_id"
     }
     
-    # Track changes for history
-    changes = []
-    
     for form_field, db_field in field_mapping.items():
         if form_field in form_data:
-            old_value = getattr(order, db_field)
             new_value = form_data[form_field]
             
             # Convert numeric fields
             if db_field in ["total_amount", "shipping_cost", "paid_amount"]:
+                # Decimal like the column, so an unchanged amount compares equal
                 try:
-                    new_value = float(new_value) if new_value else 0
-                except ValueError:
+                    new_value = Decimal(str(new_value)) if new_value else Decimal(0)
+                except InvalidOperation:
                     continue
             elif db_field in ["status_id", "operator_id"]:
                 try:
@@ -548,52 +680,21 @@ async def update_order(
                 except ValueError:
                     continue
             
-            if str(old_value) != str(new_value):
-                update_data[db_field] = new_value
-                changes.append({
-                    "field": db_field,
-                    "old_value": str(old_value) if old_value else None,
-                    "new_value": str(new_value) if new_value else None
-                })
-    
-    # Update order
-    if update_data:
-        update_data["updated_at"] = func.now()
-        
-        # Update status timestamp if status changed
-        if "status_id" in update_data:
-            update_data["status_updated_at"] = func.now()
-            
-            # Set approved/shipped/canceled timestamps based on status group
-            stmt = select(OrderStatus).where(OrderStatus.id == update_data["status_id"])
-            result = await db.execute(stmt)
-            new_status = result.scalar_one_or_none()
-            
-            if new_status:
-                if new_status.group == "accepted" and not order.approved_at:
-                    update_data["approved_at"] = func.now()
-                elif new_status.group == "shipped" and not order.shipped_at:
-                    update_data["shipped_at"] = func.now()
-                elif new_status.group in ["canceled", "return", "spam"] and not order.canceled_at:
-                    update_data["canceled_at"] = func.now()
-        
-        stmt = update(Order).where(Order.id == id).values(**update_data)
-        await db.execute(stmt)
-        await db.commit()
-        
-        # Add history entries
-        for change in changes:
-            history = OrderHistory(
-                order_id=id,
-                action="field_updated",
-                field_name=change["field"],
-                old_value=change["old_value"],
-                new_value=change["new_value"],
-                comment="Updated via API"
-            )
-            db.add(history)
-        
-        await db.commit()
+            changes[db_field] = new_value
+    
+    # Lock the order; only fields that differ are written, in one transaction
+    order = await lock_order_row(db, id, project.id)
+    
+    if not order:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+    
+    await apply_order_update(
+        db, order, changes, comment="Updated via API", context=request_context(request, HISTORY_SOURCE_API)
+    )
+    await db.commit()
     
     return {"success": True}
 
@@ -621,7 +722,301 @@ async def delete_order(
         )
     
     # Delete order (cascade will handle related records)
+    old_status_id = await lock_order_status(db, id)
+    await apply_status_changes(db, [StatusChange(project.id, id, old_status_id, None)])
     await db.delete(order)
     await db.commit()
     
-    return {"success": True}
\ No newline at end of file
+    return {"success": True}
+
+# Helpers
+
+async def _create_order(db: AsyncSession, project, order_data: Dict[str, Any], wait: float) -> Dict[str, Any]:
+    """Write or enqueue a validated addOrder.html row and build the LeadVertex response"""
+    # Queue mode: hand the lead to the ingestion consumer and release the connection
+    if project.settings.get("ingest_mode", settings.ORDER_INGEST_MODE) == "queue":
+        # A retried externalId is answered from the index instead of being queued again
+        if order_data["external_id_unique"]:
+            existing = await find_orders_by_external_ids(db, project.id, [order_data["external_id"]])
+            if existing:
+                return {"id": existing[order_data["external_id"]], "success": True}
+        
+        await db.close()
+        try:
+            ticket = await enqueue_order(order_data)
+        except OrderQueueFullError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Order queue is full, retry later",
+                headers={"Retry-After": "5"}
+            )
+        
+        result = await get_ticket_result(ticket, wait) if wait else None
+        if result and result.get("order_id"):
+            return {"id": result["order_id"], "success": True}
+        
+        return {"success": True, "queued": True, "ticket": ticket}
+    
+    # Order and its history row go in one transaction; a duplicate
+    # externalId resolves to the existing order
+    order_id, _ = await insert_order_once(db, order_data, "Order created via API")
+    await db.commit()
+    
+    # Return order ID (LeadVertex format)
+    return {"id": order_id, "success": True}
+
+async def _replay_add_order(previous: Dict[str, Any]) -> Dict[str, Any]:
+    """Response for a repeated Idempotency-Key, with the order ID once a queued order is written"""
+    if previous.get("queued"):
+        result = await get_ticket_result(previous["ticket"])
+        if result and result.get("order_id"):
+            return {"id": result["order_id"], "success": True}
+    return previous
+
+async def _read_orders_payload(request: Request) -> List[Dict[str, Any]]:
+    """Read orders from a JSON array or orders[N][field] form fields"""
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            payload = await request.json()
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid JSON"
+            )
+        
+        if isinstance(payload, dict):
+            payload = payload.get("orders")
+        
+        if not isinstance(payload, list) or not all(isinstance(o, dict) for o in payload):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expected a list of orders"
+            )
+        
+        return payload
+    
+    form_data = await request.form()
+    orders: Dict[int, Dict[str, Any]] = {}
+    for key, value in form_data.multi_items():
+        match = FORM_ARRAY_FIELD.match(key)
+        if match:
+            orders.setdefault(int(match.group(1)), {})[match.group(2)] = value
+    
+    return [orders[index] for index in sorted(orders)]
+
+async def _order_ids_response(
+    db: AsyncSession,
+    conditions: List[Any],
+    after_id: Optional[int],
+    limit: Optional[int]
+):
+    """Return matching order IDs as a list of strings (LeadVertex format)"""
+    # Default LeadVertex behaviour: every matching ID, newest first
+    if after_id is None and limit is None:
+        stmt = (
+            select(Order.id)
+            .where(and_(*conditions))
+            .order_by(Order.created_at.desc())
+        )
+        return StreamingResponse(
+            stream_json_array(_stream_order_ids(stmt)),
+            media_type="application/json"
+        )
+    
+    # Keyset page ordered by ID, next cursor goes to X-Next-After-Id
+    page_size = limit or DEFAULT_PAGE_IDS
+    if after_id is not None:
+        conditions = [*conditions, Order.id > after_id]
+    
+    stmt = (
+        select(Order.id)
+        .where(and_(*conditions))
+        .order_by(Order.id)
+        .limit(page_size)
+    )
+    result = await db.execute(stmt)
+    order_ids = [str(order_id) for order_id in result.scalars().all()]
+    
+    headers = {}
+    if len(order_ids) == page_size:
+        headers["X-Next-After-Id"] = order_ids[-1]
+    
+    return JSONResponse(content=order_ids, headers=headers)
+
+async def _stream_order_ids(stmt):
+    """Yield order IDs from a server-side cursor"""
+    # The request session is closed before the response body is sent; the scan goes to the replica like the request
+    async with await async_read_session() as session:
+        result = await session.stream_scalars(
+            stmt.execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        async for order_id in result:
+            yield str(order_id)
+
+async def _load_order_relations(
+    db: AsyncSession,
+    project_id: int,
+    orders: List[Order]
+) -> Tuple[Dict[int, StatusSnapshot], Dict[int, User], Dict[int, List[OrderItem]]]:
+    """Load statuses (cached), operators and items for a batch of orders"""
+    statuses: Dict[int, StatusSnapshot] = {}
+    operators: Dict[int, User] = {}
+    items: Dict[int, List[OrderItem]] = {}
+    
+    if not orders:
+        return statuses, operators, items
+    
+    config = await get_project_config(db, project_id)
+    statuses = {s.id: s for s in config.statuses}
+    
+    operator_ids = {order.operator_id for order in orders if order.operator_id}
+    if operator_ids:
+        stmt = select(User).where(User.id.in_(operator_ids))
+        result = await db.execute(stmt)
+        operators = {u.id: u for u in result.scalars().all()}
+    
+    stmt = (
+        select(OrderItem)
+        .where(OrderItem.order_id.in_([order.id for order in orders]))
+        .order_by(OrderItem.id)
+    )
+    result = await db.execute(stmt)
+    for item in result.scalars().all():
+        items.setdefault(item.order_id, []).append(item)
+    
+    return statuses, operators, items
+
+def _format_datetime(value: Optional[datetime]) -> Optional[str]:
+    return value.strftime("%Y-%m-%d %H:%M:%S") if value else None
+
+# getOrder.html keys backed by one Order column: key -> (column, converter)
+LEADVERTEX_ORDER_COLUMNS = {
+    "id": ("id", None),
+    "externalId": ("external_id", None),
+    "statusId": ("status_id", None),
+    "name": ("customer_name", None),
+    "phone": ("customer_phone", None),
+    "email": ("customer_email", None),
+    "country": ("country", None),
+    "region": ("region", None),
+    "city": ("city", None),
+    "address": ("address", None),
+    "postalCode": ("postal_code", None),
+    "comment": ("comment", None),
+    "internalComment": ("internal_comment", None),
+    "totalAmount": ("total_amount", float),
+    "shippingCost": ("shipping_cost", float),
+    "trackingNumber": ("tracking_number", None),
+    "paymentMethod": ("payment_method", None),
+    "paymentStatus": ("payment_status", None),
+    "paidAmount": ("paid_amount", float),
+    "source": ("source", None),
+    "utmSource": ("utm_source", None),
+    "utmMedium": ("utm_medium", None),
+    "utmCampaign": ("utm_campaign", None),
+    "utmContent": ("utm_content", None),
+    "utmTerm": ("utm_term", None),
+    "operatorId": ("operator_id", None),
+    "callsCount": ("calls_count", None),
+    "lastCallResult": ("last_call_result", None),
+    "nextCallAt": ("next_call_at", _format_datetime),
+    "createdAt": ("created_at", _format_datetime),
+    "updatedAt": ("updated_at", _format_datetime),
+    "statusUpdatedAt": ("status_updated_at", _format_datetime),
+    "approvedAt": ("approved_at", _format_datetime),
+    "shippedAt": ("shipped_at", _format_datetime),
+    "canceledAt": ("canceled_at", _format_datetime),
+    "customFields": ("custom_fields", None),
+}
+
+# Keys of getOrder.html, in response order; status comes from the cached project config
+LEADVERTEX_ORDER_KEYS = (
+    "id", "externalId", "status", "statusId", "name", "phone", "email", "country",
+    "region", "city", "address", "postalCode", "comment", "internalComment",
+    "totalAmount", "shippingCost", "trackingNumber", "paymentMethod", "paymentStatus",
+    "paidAmount", "source", "utmSource", "utmMedium", "utmCampaign", "utmContent",
+    "utmTerm", "operatorId", "operatorName", "callsCount", "lastCallResult",
+    "nextCallAt", "createdAt", "updatedAt", "statusUpdatedAt", "approvedAt",
+    "shippedAt", "canceledAt", "customFields", "items"
+)
+
+# include= relations of getOrder.html and the keys they provide
+LEADVERTEX_ORDER_RELATIONS = {"operator": "operatorName", "items": "items"}
+
+def _column_getter(column: str, converter):
+    if converter is None:
+        return lambda order, order_status, operator, items: getattr(order, column)
+    return lambda order, order_status, operator, items: converter(getattr(order, column))
+
+def _format_item(item) -> Dict[str, Any]:
+    return {
+        "id": item.id,
+        "productId": item.product_id,
+        "productName": item.product_name,
+        "productSku": item.product_sku,
+        "quantity": item.quantity,
+        "price": float(item.price),
+        "total": float(item.total)
+    }
+
+@lru_cache(maxsize=256)
+def _order_formatter(keys: Tuple[str, ...]) -> Tuple[Tuple[str, Any], ...]:
+    """(key, getter) pairs for a set of getOrder.html keys, in response order"""
+    getters = {
+        key: _column_getter(column, converter)
+        for key, (column, converter) in LEADVERTEX_ORDER_COLUMNS.items()
+    }
+    getters["status"] = lambda order, order_status, operator, items: order_status.name if order_status else ""
+    getters["operatorName"] = (
+        lambda order, order_status, operator, items:
+        f"{operator.first_name} {operator.last_name}" if operator else None
+    )
+    getters["items"] = lambda order, order_status, operator, items: [_format_item(item) for item in items]
+    return tuple((key, getters[key]) for key in LEADVERTEX_ORDER_KEYS if key in keys)
+
+def _parse_order_keys(fields: Optional[str], include: Optional[str]) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Normalize getOrder.html fields=/include= into (keys, relations); raises ValueError.
+    
+    Without fields= and include= the full order is returned, as before.
+    """
+    requested = [part.strip() for part in (fields or "").split(",") if part.strip()]
+    relations = [part.strip() for part in (include or "").split(",") if part.strip()]
+    
+    scalar_keys = [key for key in LEADVERTEX_ORDER_KEYS if key not in LEADVERTEX_ORDER_RELATIONS.values()]
+    unknown = [key for key in requested if key not in scalar_keys]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    unknown = [name for name in relations if name not in LEADVERTEX_ORDER_RELATIONS]
+    if unknown:
+        raise ValueError(f"Unknown include: {', '.join(unknown)}. Allowed: {', '.join(LEADVERTEX_ORDER_RELATIONS)}")
+    
+    if fields is None and include is None:
+        relations = list(LEADVERTEX_ORDER_RELATIONS)
+    keys = set(requested or scalar_keys)
+    keys.update(LEADVERTEX_ORDER_RELATIONS[relation] for relation in relations)
+    return tuple(sorted(keys)), tuple(sorted(set(relations)))
+
+def _order_key_columns(keys: Tuple[str, ...], relations: Tuple[str, ...]):
+    """Order columns needed to format keys"""
+    columns = {"id"}
+    for key in keys:
+        if key in LEADVERTEX_ORDER_COLUMNS:
+            columns.add(LEADVERTEX_ORDER_COLUMNS[key][0])
+    if "status" in keys:
+        columns.add("status_id")
+    if "operator" in relations:
+        columns.add("operator_id")
+    return [getattr(Order, name) for name in sorted(columns)]
+
+def _format_order(
+    order: Order,
+    order_status: Optional[StatusSnapshot],
+    operator: Optional[User],
+    items: List[OrderItem],
+    keys: Tuple[str, ...] = LEADVERTEX_ORDER_KEYS
+) -> Dict[str, Any]:
+    """Format order like LeadVertex getOrder.html; keys limits the output (fields=)"""
+    return {
+        key: getter(order, order_status, operator, items)
+        for key, getter in _order_formatter(keys)
+    }
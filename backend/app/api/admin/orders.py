@@ -1,28 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, WebSocket, WebSocketDisconnect, UploadFile, File, Form
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, func, and_, or_, desc, asc, text
 from sqlalchemy.orm import selectinload
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-from app.core.database import get_async_db
-from app.core.security import get_current_user, Permission
+from contextlib import aclosing
+import os
+import secrets
+import aiofiles
+from app.core.config import settings
+from app.core.database import get_async_db, get_read_db, AsyncSessionLocal
+from app.core.security import get_current_user, get_user_identity, decode_access_token, authenticate_user, Permission
 from app.models.user import User, OrderStatus
 from app.models.order import Order, OrderItem, OrderHistory, Product
+from app.services.order_counters import StatusChange, apply_status_changes, get_status_counts, lock_order_status
+from app.services.project_config import get_project_config, invalidate_project_config
+from app.services.list_counts import COUNT_EXACT, COUNT_ESTIMATED, COUNT_NONE, COUNT_MODE_PATTERN, count_rows
+from app.services.order_search import order_filter_conditions, order_search_rank
+from app.services.order_mutations import (
+    bulk_changes, count_bulk_orders, run_bulk_operation, lock_order_row, apply_order_update
+)
+from app.celery_app.celery import celery_app
+from app.celery_app.tasks.orders import BULK_PROGRESS_STATE, run_bulk_order_operation, export_orders, import_orders
+from app.celery_app.tasks.maintenance import rebuild_period_counters
+from app.services.order_export import EXPORT_MEDIA_TYPES, estimate_export_rows, export_filename, stream_order_export
+from app.services.order_import import IMPORT_DIR, IMPORT_EXTENSIONS
+from app.services.order_feed import FEED_KEEPALIVE, order_feed_events
+from app.services.order_history import (
+    HISTORY_SOURCE_ADMIN, request_context, decode_history_cursor, count_order_history, get_order_history_page
+)
+from app.services.order_fields import (
+    ORDER_FIELDS, ORDER_RELATIONS, parse_fieldset, order_columns, order_page_adapter, load_relations
+)
+from app.utils.phone import normalize_phone
 from app.schemas.main import (
     OrderCreate, OrderUpdate, OrderResponse, OrderStatusCreate, 
     OrderStatusUpdate, OrderStatusResponse, BaseResponse, 
-    PaginationParams, PaginatedResponse
+    PaginationParams, PaginatedResponse, BulkOrderRequest, BulkOrderResult, OrderExportRequest, OrderExportResult,
+    OrderImportResult, OrderDetailResponse, OrderHistoryPage,
+    UserResponse, UserIdentity
+)
+from app.utils.pagination import (
+    KeysetCursor, NEXT, PREV, encode_cursor, decode_cursor, keyset_condition, keyset_order
 )
 
 router = APIRouter()
 
+# Allowed sort_by values; each has a (project_id, <column>, id) index for keyset pages
+ORDER_SORT_COLUMNS = {
+    "id": Order.id,
+    "created_at": Order.created_at,
+    # Orders that were never edited sort by creation time
+    "updated_at": func.coalesce(Order.updated_at, Order.created_at),
+    "status_updated_at": Order.status_updated_at,
+    "total_amount": Order.total_amount,
+    "customer_name": Order.customer_name,
+}
+
 # Order Status Management
 
 @router.get("/statuses", response_model=List[OrderStatusResponse])
 async def get_order_statuses(
     project_id: int = Query(...),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all order statuses for project"""
     await Permission.require_project_access(current_user, project_id, db)
@@ -38,6 +80,17 @@ async def get_order_statuses(
     
     return statuses
 
+@router.get("/statuses/counts", response_model=Dict[int, int])
+async def get_order_status_counts(
+    project_id: int = Query(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get number of orders per status for project"""
+    await Permission.require_project_access(current_user, project_id, db)
+    
+    return await get_status_counts(db, project_id)
+
 @router.post("/statuses", response_model=OrderStatusResponse)
 async def create_order_status(
     status_data: OrderStatusCreate,
@@ -69,6 +122,7 @@ async def create_order_status(
     db.add(db_status)
     await db.commit()
     await db.refresh(db_status)
+    await invalidate_project_config(project_id)
     
     return db_status
 
@@ -96,10 +150,15 @@ async def update_order_status(
     # Update fields
     update_data = status_data.dict(exclude_unset=True)
     if update_data:
+        # Accepted period counters are keyed on the group of each order's status
+        regrouped = "group" in update_data and update_data["group"] != status.group
         stmt = update(OrderStatus).where(OrderStatus.id == status_id).values(**update_data)
         await db.execute(stmt)
         await db.commit()
         await db.refresh(status)
+        await invalidate_project_config(status.project_id)
+        if regrouped:
+            rebuild_period_counters.delay(status.project_id)
     
     return status
 
@@ -134,8 +193,10 @@ async def delete_order_status(
             detail=f"Cannot delete status with {order_count} orders"
         )
     
+    project_id = status.project_id
     await db.delete(status)
     await db.commit()
+    await invalidate_project_config(project_id)
     
     return BaseResponse(message="Status deleted successfully")
 
@@ -153,92 +214,483 @@ async def get_orders(
     date_to: Optional[datetime] = Query(None),
     sort_by: str = Query("created_at"),
     sort_order: str = Query("desc"),
+    cursor: Optional[str] = Query(None, description="next_cursor/prev_cursor of a previous page"),
+    count_mode: Optional[str] = Query(
+        None,
+        pattern=COUNT_MODE_PATTERN,
+        description="exact (default for page numbers), estimated or none (default for cursor pages)"
+    ),
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(ORDER_FIELDS)}"),
+    include: Optional[str] = Query(None, description=f"Comma-separated relations: {', '.join(ORDER_RELATIONS)}"),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get orders with filtering and pagination"""
+    """Get orders with filtering and pagination.
+    
+    Pages are addressed by page number (OFFSET) or, for deep scrolling, by
+    cursor; every response carries next_cursor/prev_cursor. With search,
+    sort_by=relevance puts the best matches first.
+    """
     await Permission.require_project_access(current_user, project_id, db, "can_view_orders")
     
+    search = search.strip() if search else None
+    
+    try:
+        fieldset, relations = parse_fieldset(fields, include)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if sort_by == "relevance" and search:
+        sort_column = order_search_rank(search)
+    elif sort_by in ORDER_SORT_COLUMNS:
+        sort_column = ORDER_SORT_COLUMNS[sort_by]
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"sort_by must be one of: {', '.join(ORDER_SORT_COLUMNS)} (or relevance with search)"
+        )
+    descending = sort_order.lower() == "desc"
+    
+    keyset = None
+    if cursor:
+        try:
+            keyset = decode_cursor(cursor, sort_column.type.python_type)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        if (keyset.sort_by, keyset.sort_order) != (sort_by, sort_order.lower()):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor was issued for a different sort_by/sort_order"
+            )
+    
     # Build base query
-    conditions = [Order.project_id == project_id]
+    conditions = order_filter_conditions(project_id, status_id, operator_id, search, date_from, date_to)
     
-    if status_id:
-        conditions.append(Order.status_id == status_id)
+    # Count total orders (cursor pages skip the count unless asked)
+    if count_mode is None:
+        count_mode = COUNT_NONE if keyset else COUNT_EXACT
     
-    if operator_id:
-        conditions.append(Order.operator_id == operator_id)
+    if count_mode == COUNT_ESTIMATED and not (operator_id or search or date_from or date_to):
+        # Only project/status filters: the maintained per-status counters answer it
+        counts = await get_status_counts(db, project_id)
+        total = counts.get(status_id, 0) if status_id else sum(counts.values())
+        total_is_estimate = True
+    else:
+        filters = {
+            "project_id": project_id,
+            "status_id": status_id,
+            "operator_id": operator_id,
+            # Case is kept: tracking number and external ID matches are exact
+            "search": search,
+            "date_from": date_from,
+            "date_to": date_to
+        }
+        total, total_is_estimate = await count_rows(
+            db, select(Order.id).where(and_(*conditions)), count_mode, "orders", filters
+        )
+    pages = (total + limit - 1) // limit if total is not None else None
     
-    if search:
-        search_conditions = [
-            Order.customer_name.ilike(f"%{search}%"),
-            Order.customer_phone.ilike(f"%{search}%"),
-            Order.customer_email.ilike(f"%{search}%"),
-            Order.id == int(search) if search.isdigit() else False
-        ]
-        conditions.append(or_(*search_conditions))
+    direction = keyset.direction if keyset else NEXT
+    # Only the requested columns; relations are attached by load_relations below
+    stmt = (
+        select(*order_columns(fieldset), sort_column.label("sort_value"))
+        .where(and_(*conditions))
+        .order_by(*keyset_order(sort_column, Order.id, descending, direction))
+        .limit(limit + 1)
+    )
     
-    if date_from:
-        conditions.append(Order.created_at >= date_from)
+    if keyset:
+        stmt = stmt.where(keyset_condition(sort_column, Order.id, keyset, descending))
+    else:
+        stmt = stmt.offset((page - 1) * limit)
     
-    if date_to:
-        conditions.append(Order.created_at <= date_to)
+    result = await db.execute(stmt)
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == PREV:
+        rows.reverse()
+    
+    # Cursors point at the first/last row of this page
+    next_cursor = None
+    prev_cursor = None
+    if rows:
+        sort_key = (sort_by, sort_order.lower())
+        if direction == NEXT:
+            if has_more:
+                next_cursor = _order_cursor(sort_key, rows[-1], NEXT)
+            if keyset or page > 1:
+                prev_cursor = _order_cursor(sort_key, rows[0], PREV)
+        else:
+            next_cursor = _order_cursor(sort_key, rows[-1], NEXT)
+            if has_more:
+                prev_cursor = _order_cursor(sort_key, rows[0], PREV)
+    
+    orders = [dict(row._mapping) for row in rows]
+    for order in orders:
+        del order["sort_value"]
+    await load_relations(db, project_id, orders, relations)
+    
+    page_data = {
+        "items": orders,
+        "total": total,
+        "total_is_estimate": total_is_estimate,
+        "page": page,
+        "limit": limit,
+        "pages": pages,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor
+    }
+    return Response(
+        content=order_page_adapter(fieldset, relations).dump_json(page_data),
+        media_type="application/json"
+    )
+
+@router.get("/customer-history", response_model=Dict[str, Any])
+async def get_customer_history(
+    project_id: int = Query(...),
+    phone: str = Query(..., min_length=5, max_length=30),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get a customer's orders and per-status counts by phone number in any format"""
+    await Permission.require_project_access(current_user, project_id, db, "can_view_orders")
     
-    # Count total orders
-    count_stmt = select(func.count(Order.id)).where(and_(*conditions))
-    result = await db.execute(count_stmt)
-    total = result.scalar()
+    phone_norm = normalize_phone(phone)
+    if not phone_norm:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid phone number"
+        )
     
-    # Get orders with pagination
-    offset = (page - 1) * limit
+    # Both queries are served by idx_order_project_phone_norm
+    customer = and_(Order.project_id == project_id, Order.phone_norm == phone_norm)
     
-    # Build order by clause
-    order_column = getattr(Order, sort_by, Order.created_at)
-    if sort_order.lower() == "desc":
-        order_clause = desc(order_column)
-    else:
-        order_clause = asc(order_column)
+    stmt = select(Order.status_id, func.count(Order.id)).where(customer).group_by(Order.status_id)
+    result = await db.execute(stmt)
+    by_status = dict(result.all())
     
     stmt = (
-        select(Order)
-        .options(
-            selectinload(Order.status),
-            selectinload(Order.operator),
-            selectinload(Order.items)
+        select(
+            Order.id, Order.status_id, Order.customer_name, Order.total_amount,
+            Order.operator_id, Order.source, Order.created_at
         )
-        .where(and_(*conditions))
-        .order_by(order_clause)
-        .offset(offset)
+        .where(customer)
+        .order_by(desc(Order.created_at), desc(Order.id))
         .limit(limit)
     )
-    
     result = await db.execute(stmt)
-    orders = result.scalars().all()
+    rows = result.all()
+    
+    config = await get_project_config(db, project_id)
+    by_group: Dict[str, int] = {}
+    for status_id, count in by_status.items():
+        order_status = config.status(status_id)
+        group = order_status.group if order_status else "unknown"
+        by_group[group] = by_group.get(group, 0) + count
+    
+    orders = []
+    for row in rows:
+        order_status = config.status(row.status_id)
+        orders.append({
+            "id": row.id,
+            "status_id": row.status_id,
+            "status": order_status.name if order_status else None,
+            "customer_name": row.customer_name,
+            "total_amount": float(row.total_amount),
+            "operator_id": row.operator_id,
+            "source": row.source,
+            "created_at": row.created_at
+        })
+    
+    return {
+        "phone": phone_norm,
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "by_group": by_group,
+        "orders": orders
+    }
+
+@router.post("/bulk", response_model=BulkOrderResult)
+async def bulk_orders(
+    bulk_request: BulkOrderRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Change status, assign, update or delete many orders at once.
     
-    # Calculate pagination info
-    pages = (total + limit - 1) // limit
+    Orders are selected by order_ids or by the filters of the order list.
+    Up to ORDER_BULK_INLINE_LIMIT orders are changed within the request;
+    larger batches run in the background, polled at GET /orders/bulk/{job_id}.
+    """
+    permission = "can_delete_orders" if bulk_request.action == "delete" else "can_edit_orders"
+    await Permission.require_project_access(current_user, bulk_request.project_id, db, permission)
     
-    return PaginatedResponse(
-        items=orders,
-        total=total,
-        page=page,
-        limit=limit,
-        pages=pages
+    if (bulk_request.order_ids is None) == (bulk_request.filter is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass either order_ids or filter"
+        )
+    
+    changes = bulk_changes(bulk_request)
+    nothing_to_change = (
+        (bulk_request.action == "status" and bulk_request.status_id is None)
+        or (bulk_request.action == "assign" and bulk_request.operator_id is None)
+        or (bulk_request.action == "update" and not changes)
+    )
+    if nothing_to_change:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nothing to change: pass status_id, operator_id or changes for the action"
+        )
+    
+    order_status = None
+    if "status_id" in changes:
+        config = await get_project_config(db, bulk_request.project_id)
+        order_status = config.status(changes["status_id"])
+        if not order_status:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Status not found in project"
+            )
+    
+    if changes.get("operator_id"):
+        # Verify operator has access to project
+        await Permission.require_project_access(
+            await get_user_by_id(changes["operator_id"], db),
+            bulk_request.project_id,
+            db
+        )
+    
+    total = await count_bulk_orders(db, bulk_request)
+    
+    if total > settings.ORDER_BULK_INLINE_LIMIT:
+        job = run_bulk_order_operation.delay(
+            bulk_request.model_dump(mode="json", exclude_unset=True), current_user.id, total
+        )
+        return BulkOrderResult(job_id=job.id, state="pending", total=total)
+    
+    processed, changed = await run_bulk_operation(db, bulk_request, order_status, current_user.id)
+    await db.commit()
+    
+    return BulkOrderResult(state="done", total=total, processed=processed, changed=changed)
+
+@router.get("/bulk/{job_id}", response_model=BulkOrderResult)
+async def get_bulk_orders_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Progress of a background bulk operation"""
+    job = celery_app.AsyncResult(job_id)
+    info = job.info if isinstance(job.info, dict) else {}
+    
+    # Progress and results carry the project; queued jobs reveal nothing yet
+    if "project_id" in info:
+        await Permission.require_project_access(current_user, info["project_id"], db, "can_view_orders")
+    
+    return BulkOrderResult(
+        job_id=job_id,
+        state=_job_state(job, info),
+        total=info.get("total"),
+        processed=info.get("processed", 0),
+        changed=info.get("changed", 0),
+        error=info.get("error")
     )
 
-@router.get("/{order_id}", response_model=OrderResponse)
+@router.get("/feed")
+async def order_feed(
+    request: Request,
+    project_id: int = Query(...),
+    after_seq: Optional[int] = Query(None, ge=0, description="Resume after this change; reconnects send Last-Event-ID"),
+    access_token: str = Query(..., description="JWT access token (EventSource cannot send headers)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Live order changes of a project as server-sent events.
+    
+    "order" events carry {"seq", "id", "deleted", "order"} with the default
+    fields of GET /orders items; the event id is the change sequence number, so
+    a reconnecting EventSource resumes where it stopped. "reset" means the
+    client is too far behind and should reload the list.
+    """
+    user = await authenticate_user(decode_access_token(access_token), db)
+    await Permission.require_project_access(user, project_id, db, "can_view_orders")
+    # The stream outlives the request; don't hold a pooled connection for it
+    await db.close()
+    
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        after_seq = int(last_event_id)
+    
+    return StreamingResponse(
+        _order_feed_sse(user.id, project_id, after_seq),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/feed/ws")
+async def order_feed_ws(
+    websocket: WebSocket,
+    project_id: int,
+    access_token: str,
+    after_seq: Optional[int] = None
+):
+    """WebSocket variant of GET /orders/feed; messages are {"event", "seq", "data"}"""
+    try:
+        async with AsyncSessionLocal() as db:
+            user = await authenticate_user(decode_access_token(access_token), db)
+            await Permission.require_project_access(user, project_id, db, "can_view_orders")
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    try:
+        async with aclosing(order_feed_events(project_id, after_seq)) as events:
+            async for seq, event, data in events:
+                if event == FEED_KEEPALIVE and not await _can_follow_feed(user.id, project_id):
+                    await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+                    return
+                await websocket.send_text(f'{{"event":"{event}","seq":{seq},"data":{data}}}')
+    except WebSocketDisconnect:
+        return
+
+@router.post("/export")
+async def export_orders_file(
+    export_request: OrderExportRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Export orders matching the order list filters as CSV or XLSX.
+    
+    Up to ORDER_EXPORT_INLINE_LIMIT orders (planner estimate) are streamed in
+    the response; larger exports are written to /uploads/exports in the
+    background and return an OrderExportResult polled at GET /orders/export/{job_id}.
+    """
+    await Permission.require_project_access(current_user, export_request.project_id, db, "can_view_orders")
+    
+    total = await estimate_export_rows(db, export_request)
+    
+    if total > settings.ORDER_EXPORT_INLINE_LIMIT:
+        job = export_orders.delay(export_request.model_dump(mode="json"), total)
+        return OrderExportResult(job_id=job.id, state="pending", total=total)
+    
+    # The stream reads in its own session; release this one before it starts
+    await db.close()
+    
+    return StreamingResponse(
+        stream_order_export(export_request),
+        media_type=EXPORT_MEDIA_TYPES[export_request.format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(export_request)}"'}
+    )
+
+@router.get("/export/{job_id}", response_model=OrderExportResult)
+async def get_export_orders_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Progress and file URL of a background order export"""
+    job = celery_app.AsyncResult(job_id)
+    info = job.info if isinstance(job.info, dict) else {}
+    
+    # Progress and results carry the project; queued jobs reveal nothing yet
+    if "project_id" in info:
+        await Permission.require_project_access(current_user, info["project_id"], db, "can_view_orders")
+    
+    return OrderExportResult(
+        job_id=job_id,
+        state=_job_state(job, info),
+        total=info.get("total"),
+        processed=info.get("processed", 0),
+        url=info.get("url"),
+        error=info.get("error")
+    )
+
+@router.post("/import", response_model=OrderImportResult)
+async def import_orders_file(
+    project_id: int = Form(...),
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create orders from an .xlsx or .csv file in the background.
+    
+    The first row names the columns (name, phone, email, city, address,
+    totalAmount, externalId, ...; see app/services/order_import.py). Progress
+    and per-row errors are polled at GET /orders/import/{job_id}.
+    """
+    await Permission.require_project_access(current_user, project_id, db, "can_edit_orders")
+    
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in IMPORT_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported file type. Allowed: {', '.join(IMPORT_EXTENSIONS)}"
+        )
+    
+    import_dir = os.path.join(settings.UPLOAD_DIR, IMPORT_DIR)
+    os.makedirs(import_dir, exist_ok=True)
+    # /uploads is served without authentication; the name must not be guessable
+    path = os.path.join(import_dir, f"{secrets.token_urlsafe(16)}{extension}")
+    
+    size = 0
+    async with aiofiles.open(path, "wb") as upload:
+        while chunk := await file.read(1024 * 1024):
+            size += len(chunk)
+            if size > settings.ORDER_IMPORT_MAX_FILE_SIZE:
+                break
+            await upload.write(chunk)
+    
+    if size > settings.ORDER_IMPORT_MAX_FILE_SIZE:
+        os.remove(path)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File is larger than {settings.ORDER_IMPORT_MAX_FILE_SIZE // (1024 * 1024)}MB"
+        )
+    
+    job = import_orders.delay(project_id, path, current_user.id)
+    return OrderImportResult(job_id=job.id, state="pending")
+
+@router.get("/import/{job_id}", response_model=OrderImportResult)
+async def get_import_orders_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Progress and row errors of an order import"""
+    job = celery_app.AsyncResult(job_id)
+    info = job.info if isinstance(job.info, dict) else {}
+    
+    # Progress and results carry the project; queued jobs reveal nothing yet
+    if "project_id" in info:
+        await Permission.require_project_access(current_user, info["project_id"], db, "can_view_orders")
+    
+    return OrderImportResult(
+        job_id=job_id,
+        state=_job_state(job, info),
+        processed=info.get("processed", 0),
+        created=info.get("created", 0),
+        duplicates=info.get("duplicates", 0),
+        failed=info.get("failed", 0),
+        errors=info.get("errors", []),
+        error=info.get("error")
+    )
+
+@router.get("/{order_id}", response_model=OrderDetailResponse)
 async def get_order(
     order_id: int,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get specific order"""
+    """Get specific order with its latest ORDER_HISTORY_EMBED_LIMIT history events"""
     stmt = (
         select(Order)
         .options(
             selectinload(Order.status),
             selectinload(Order.operator),
-            selectinload(Order.items),
-            selectinload(Order.history)
+            selectinload(Order.items)
         )
         .where(Order.id == order_id)
     )
@@ -254,7 +706,17 @@ async def get_order(
     
     await Permission.require_project_access(current_user, order.project_id, db, "can_view_orders")
     
-    return order
+    # Busy orders have thousands of events: embed the latest, page through the rest
+    history, history_next_cursor = await get_order_history_page(db, order_id, settings.ORDER_HISTORY_EMBED_LIMIT)
+    history_count = len({entry.id for entry in history})
+    if history_next_cursor:
+        history_count = await count_order_history(db, order_id)
+    
+    return OrderDetailResponse.model_validate(order).model_copy(update={
+        "recent_history": history,
+        "history_count": history_count,
+        "history_next_cursor": history_next_cursor
+    })
 
 @router.post("/", response_model=OrderResponse)
 async def create_order(
@@ -269,24 +731,14 @@ async def create_order(
     # Get default status if not provided
     status_id = order_data.status_id
     if not status_id:
-        stmt = (
-            select(OrderStatus)
-            .where(and_(
-                OrderStatus.project_id == project_id,
-                OrderStatus.group == "processing"
-            ))
-            .order_by(OrderStatus.position)
-        )
-        result = await db.execute(stmt)
-        default_status = result.scalar_one_or_none()
+        config = await get_project_config(db, project_id)
+        status_id = config.default_status_id
         
-        if not default_status:
+        if not status_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No default status found"
             )
-        
-        status_id = default_status.id
     
     # Create order
     db_order = Order(
@@ -294,10 +746,13 @@ async def create_order(
         status_id=status_id,
         operator_id=current_user.id,
         source="manual",
+        phone_norm=normalize_phone(order_data.customer_phone),
         **order_data.dict(exclude={"status_id"})
     )
     
     db.add(db_order)
+    await db.flush()
+    await apply_status_changes(db, [StatusChange(project_id, db_order.id, None, status_id)])
     await db.commit()
     await db.refresh(db_order)
     
@@ -331,90 +786,26 @@ async def create_order(
 async def update_order(
     order_id: int,
     order_data: OrderUpdate,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_db)
 ):
     """Update order"""
-    # Get order
-    stmt = select(Order).where(Order.id == order_id)
-    result = await db.execute(stmt)
-    order = result.scalar_one_or_none()
-    
-    if not order:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Order not found"
-        )
-    
-    await Permission.require_project_access(current_user, order.project_id, db, "can_edit_orders")
-    
-    # Track changes for history
-    changes = []
-    update_data = order_data.dict(exclude_unset=True)
-    
-    for field, new_value in update_data.items():
-        old_value = getattr(order, field)
-        if old_value != new_value:
-            changes.append({
-                "field": field,
-                "old_value": str(old_value) if old_value else None,
-                "new_value": str(new_value) if new_value else None
-            })
+    project_id = await _order_project_id(db, order_id)
+    await Permission.require_project_access(current_user, project_id, db, "can_edit_orders")
     
-    # Update order
-    if update_data:
-        update_data["updated_at"] = func.now()
-        
-        # Update status timestamp if status changed
-        if "status_id" in update_data:
-            update_data["status_updated_at"] = func.now()
-            
-            # Set approved/shipped/canceled timestamps based on status group
-            stmt = select(OrderStatus).where(OrderStatus.id == update_data["status_id"])
-            result = await db.execute(stmt)
-            new_status = result.scalar_one_or_none()
-            
-            if new_status:
-                if new_status.group == "accepted" and not order.approved_at:
-                    update_data["approved_at"] = func.now()
-                elif new_status.group == "shipped" and not order.shipped_at:
-                    update_data["shipped_at"] = func.now()
-                elif new_status.group in ["canceled", "return", "spam"] and not order.canceled_at:
-                    update_data["canceled_at"] = func.now()
-        
-        stmt = update(Order).where(Order.id == order_id).values(**update_data)
-        await db.execute(stmt)
-        await db.commit()
-        
-        # Add history entries
-        for change in changes:
-            history = OrderHistory(
-                order_id=order_id,
-                user_id=current_user.id,
-                action="field_updated",
-                field_name=change["field"],
-                old_value=change["old_value"],
-                new_value=change["new_value"]
-            )
-            db.add(history)
-        
-        await db.commit()
+    # Lock the order for the whole update, only once access is granted
+    order = await _lock_order(db, order_id, project_id)
     
-    # Reload with relations
-    stmt = (
-        select(Order)
-        .options(
-            selectinload(Order.status),
-            selectinload(Order.operator),
-            selectinload(Order.items)
-        )
-        .where(Order.id == order_id)
+    # One UPDATE ... RETURNING, history and counters in this transaction
+    order = await apply_order_update(
+        db, order, order_data.dict(exclude_unset=True), current_user.id,
+        context=request_context(request, HISTORY_SOURCE_ADMIN)
     )
+    response = await _order_response(db, order)
+    await db.commit()
     
-    result = await db.execute(stmt)
-    order = result.scalar_one()
-    
-    return order
+    return response
 
 @router.delete("/{order_id}", response_model=BaseResponse)
 async def delete_order(
@@ -446,6 +837,8 @@ async def delete_order(
     db.add(history)
     await db.commit()
     
+    old_status_id = await lock_order_status(db, order_id)
+    await apply_status_changes(db, [StatusChange(order.project_id, order_id, old_status_id, None)])
     await db.delete(order)
     await db.commit()
     
@@ -455,59 +848,49 @@ async def delete_order(
 async def assign_order(
     order_id: int,
     operator_id: int,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_db)
 ):
     """Assign order to operator"""
-    # Get order
-    stmt = select(Order).where(Order.id == order_id)
-    result = await db.execute(stmt)
-    order = result.scalar_one_or_none()
-    
-    if not order:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Order not found"
-        )
-    
-    await Permission.require_project_access(current_user, order.project_id, db, "can_edit_orders")
+    project_id = await _order_project_id(db, order_id)
+    await Permission.require_project_access(current_user, project_id, db, "can_edit_orders")
     
     # Verify operator has access to project
     await Permission.require_project_access(
         await get_user_by_id(operator_id, db), 
-        order.project_id, 
+        project_id, 
         db
     )
     
-    # Update assignment
-    old_operator_id = order.operator_id
-    stmt = update(Order).where(Order.id == order_id).values(
-        operator_id=operator_id,
-        updated_at=func.now()
-    )
-    await db.execute(stmt)
-    await db.commit()
+    # Lock the order for the whole update, only once access is granted
+    order = await _lock_order(db, order_id, project_id)
     
-    # Add to history
-    history = OrderHistory(
-        order_id=order_id,
-        user_id=current_user.id,
-        action="operator_assigned",
-        old_value=str(old_operator_id) if old_operator_id else None,
-        new_value=str(operator_id)
+    # Update assignment
+    await apply_order_update(
+        db, order, {"operator_id": operator_id}, current_user.id,
+        action="operator_assigned", context=request_context(request, HISTORY_SOURCE_ADMIN)
     )
-    db.add(history)
     await db.commit()
     
     return BaseResponse(message="Order assigned successfully")
 
-@router.get("/{order_id}/history", response_model=List[Dict[str, Any]])
+@router.get("/{order_id}/history", response_model=OrderHistoryPage)
 async def get_order_history(
     order_id: int,
+    limit: int = Query(settings.ORDER_HISTORY_PAGE_SIZE, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of a previous page (or history_next_cursor of the order)"),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get order history"""
+    """Get order history, newest first, one keyset page at a time"""
+    keyset = None
+    if cursor:
+        try:
+            keyset = decode_history_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
     # Get order to check access
     stmt = select(Order).where(Order.id == order_id)
     result = await db.execute(stmt)
@@ -521,42 +904,82 @@ async def get_order_history(
     
     await Permission.require_project_access(current_user, order.project_id, db, "can_view_orders")
     
-    # Get history with user info
-    stmt = (
-        select(OrderHistory, User)
-        .outerjoin(User, OrderHistory.user_id == User.id)
-        .where(OrderHistory.order_id == order_id)
-        .order_by(desc(OrderHistory.created_at))
-    )
+    # Authors come from the cached user directory instead of a join per row
+    items, next_cursor = await get_order_history_page(db, order_id, limit, keyset)
     
-    result = await db.execute(stmt)
-    history_items = result.all()
-    
-    history_data = []
-    for history, user in history_items:
-        history_data.append({
-            "id": history.id,
-            "action": history.action,
-            "field_name": history.field_name,
-            "old_value": history.old_value,
-            "new_value": history.new_value,
-            "comment": history.comment,
-            "created_at": history.created_at,
-            "user": {
-                "id": user.id,
-                "email": user.email,
-                "first_name": user.first_name,
-                "last_name": user.last_name
-            } if user else None
-        })
-    
-    return history_data
+    return OrderHistoryPage(
+        items=items,
+        total=await count_order_history(db, order_id),
+        limit=limit,
+        next_cursor=next_cursor
+    )
 
-async def get_user_by_id(user_id: int, db: AsyncSession) -> User:
-    """Helper function to get user by ID"""
-    stmt = select(User).where(User.id == user_id)
-    result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
+def _order_cursor(sort_key, row, direction: str) -> str:
+    """Cursor at a row (with id and sort_value) of get_orders"""
+    sort_by, sort_order = sort_key
+    return encode_cursor(KeysetCursor(sort_by, sort_order, row.sort_value, row.id, direction))
+
+async def _order_project_id(db: AsyncSession, order_id: int) -> int:
+    """Project of an order, read without locking (404 if missing)"""
+    project_id = await db.scalar(select(Order.project_id).where(Order.id == order_id))
+    if project_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+    return project_id
+
+async def _lock_order(db: AsyncSession, order_id: int, project_id: int):
+    """Lock an order of project until commit (404 if it was deleted meanwhile)"""
+    order = await lock_order_row(db, order_id, project_id)
+    if not order:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+    return order
+
+async def _order_response(db: AsyncSession, order) -> OrderResponse:
+    """OrderResponse of an orders row with its status and operator"""
+    order_status = await db.get(OrderStatus, order.status_id)
+    operator = await db.get(User, order.operator_id) if order.operator_id else None
+    return OrderResponse.model_validate({
+        **order._mapping,
+        "status": OrderStatusResponse.model_validate(order_status) if order_status else None,
+        "operator": UserResponse.model_validate(operator) if operator else None
+    })
+
+def _job_state(job, info: Dict[str, Any]) -> str:
+    # pending, running, done or failed for a Celery job of this router
+    if job.state in (BULK_PROGRESS_STATE, "STARTED"):
+        return "running"
+    if job.state == "SUCCESS":
+        return "failed" if info.get("error") else "done"
+    if job.state == "FAILURE":
+        return "failed"
+    return "pending"
+
+async def _can_follow_feed(user_id: int, project_id: int) -> bool:
+    # Access may be revoked while a feed is open; the identity is cached
+    async with AsyncSessionLocal() as db:
+        user = await get_user_identity(db, user_id)
+        if user is None or user.status != "active":
+            return False
+        return await Permission.can_access_project(user, project_id, db, "can_view_orders")
+
+async def _order_feed_sse(user_id: int, project_id: int, after_seq: Optional[int]):
+    async with aclosing(order_feed_events(project_id, after_seq)) as events:
+        async for seq, event, data in events:
+            if event == FEED_KEEPALIVE:
+                if not await _can_follow_feed(user_id, project_id):
+                    return
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {seq}\nevent: {event}\ndata: {data}\n\n"
+
+async def get_user_by_id(user_id: int, db: AsyncSession) -> UserIdentity:
+    """Helper function to get user by ID (cached identity with memberships)"""
+    user = await get_user_identity(db, user_id)
     
     if not user:
         raise HTTPException(
@@ -4,7 +4,7 @@ from sqlalchemy import select, update, func, and_, or_, desc, asc
 from sqlalchemy.orm import selectinload
 from typing import List, Optional, Dict, Any
 from decimal import Decimal
-from app.core.database import get_async_db
+from app.core.database import get_async_db, get_read_db
 from app.core.security import get_current_user, Permission
 from app.models.user import User
 from app.models.order import Product, StockMovement, Order, OrderItem
@@ -12,6 +12,7 @@ from app.schemas.main import (
     ProductCreate, ProductUpdate, ProductResponse, BaseResponse,
     PaginationParams, PaginatedResponse
 )
+from app.services.list_counts import COUNT_MODE_PATTERN, count_rows
 
 router = APIRouter()
 
@@ -26,8 +27,9 @@ async def get_products(
     low_stock: Optional[bool] = Query(None),
     sort_by: str = Query("created_at"),
     sort_order: str = Query("desc"),
+    count_mode: str = Query("exact", pattern=COUNT_MODE_PATTERN, description="exact, estimated or none"),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get products with filtering and pagination"""
     await Permission.require_project_access(current_user, project_id, db)
@@ -50,9 +52,15 @@ async def get_products(
         conditions.append(Product.stock_quantity <= Product.low_stock_threshold)
     
     # Count total
-    count_stmt = select(func.count(Product.id)).where(and_(*conditions))
-    result = await db.execute(count_stmt)
-    total = result.scalar()
+    filters = {
+        "project_id": project_id,
+        "search": search.lower() if search else None,
+        "is_active": is_active,
+        "low_stock": low_stock or None
+    }
+    total, total_is_estimate = await count_rows(
+        db, select(Product.id).where(and_(*conditions)), count_mode, "products", filters
+    )
     
     # Get products
     offset = (page - 1) * limit
@@ -74,11 +82,12 @@ async def get_products(
     result = await db.execute(stmt)
     products = result.scalars().all()
     
-    pages = (total + limit - 1) // limit
+    pages = (total + limit - 1) // limit if total is not None else None
     
     return PaginatedResponse(
         items=products,
         total=total,
+        total_is_estimate=total_is_estimate,
         page=page,
         limit=limit,
         pages=pages
@@ -88,7 +97,7 @@ async def get_products(
 async def get_product(
     product_id: int,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get specific product"""
     stmt = select(Product).where(Product.id == product_id)
@@ -321,7 +330,7 @@ async def adjust_stock(
 async def get_stock_movements(
     product_id: int,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get stock movement history for product"""
     # Get product
@@ -378,7 +387,7 @@ async def get_product_statistics(
     product_id: int,
     days: int = Query(30, ge=1, le=365),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get product statistics"""
     # Get product
@@ -455,7 +464,7 @@ async def get_product_statistics(
 async def get_low_stock_products(
     project_id: int = Query(...),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get products with low stock"""
     await Permission.require_project_access(current_user, project_id, db)
@@ -5,12 +5,18 @@ from sqlalchemy.orm import selectinload
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from app.core.database import get_async_db
-from app.core.security import get_current_user, get_current_admin, generate_api_key, Permission
+from app.core.security import (
+    get_current_user, get_current_admin, generate_api_key, Permission,
+    invalidate_api_key_cache, invalidate_user_identity
+)
 from app.models.user import User, Project, ProjectUser, UserRole
 from app.schemas.main import (
     ProjectCreate, ProjectUpdate, ProjectResponse, ProjectInfo,
     BaseResponse, PaginationParams, PaginatedResponse
 )
+from app.services.project_config import invalidate_project_config
+from app.utils.timezone import get_project_timezone
+from app.celery_app.tasks.maintenance import rebuild_period_counters
 
 router = APIRouter()
 
@@ -69,6 +75,7 @@ async def create_project(
     
     db.add(project_user)
     await db.commit()
+    await invalidate_user_identity(current_user.id)
     
     return db_project
 
@@ -140,10 +147,16 @@ async def update_project(
     # Update fields
     update_data = project_data.dict(exclude_unset=True)
     if update_data:
+        # Day/month counters are bucketed in the project timezone
+        old_timezone = get_project_timezone(project.settings)
         stmt = update(Project).where(Project.id == project_id).values(**update_data)
         await db.execute(stmt)
         await db.commit()
         await db.refresh(project)
+        await invalidate_api_key_cache(project.api_key)
+        await invalidate_project_config(project_id)
+        if get_project_timezone(project.settings) != old_timezone:
+            rebuild_period_counters.delay(project_id)
     
     return project
 
@@ -171,8 +184,16 @@ async def delete_project(
             detail="Only project owner or admin can delete project"
         )
     
+    # Members' cached identities list the project until they are invalidated
+    result = await db.execute(select(ProjectUser.user_id).where(ProjectUser.project_id == project_id))
+    member_ids = result.scalars().all()
+    
     await db.delete(project)
     await db.commit()
+    await invalidate_api_key_cache(project.api_key)
+    # After the commit, so a load racing the delete can't cache the membership again
+    for member_id in member_ids:
+        await invalidate_user_identity(member_id)
     
     return BaseResponse(message="Project deleted successfully")
 
@@ -185,11 +206,16 @@ async def regenerate_api_key(
     """Regenerate project API key"""
     await Permission.require_project_access(current_user, project_id, db, "can_manage_users")
     
+    stmt = select(Project.api_key).where(Project.id == project_id)
+    result = await db.execute(stmt)
+    old_api_key = result.scalar_one_or_none()
+    
     new_api_key = generate_api_key()
     
     stmt = update(Project).where(Project.id == project_id).values(api_key=new_api_key)
     await db.execute(stmt)
     await db.commit()
+    await invalidate_api_key_cache(old_api_key)
     
     return {"api_key": new_api_key}
 
@@ -280,6 +306,7 @@ async def add_user_to_project(
     
     db.add(project_user)
     await db.commit()
+    await invalidate_user_identity(user.id)
     
     return BaseResponse(message="User added to project successfully")
 
@@ -320,5 +347,6 @@ async def remove_user_from_project(
     
     await db.delete(project_user)
     await db.commit()
+    await invalidate_user_identity(user_id)
     
     return BaseResponse(message="User removed from project successfully")
\ No newline at end of file
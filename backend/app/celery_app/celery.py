@@ -12,7 +12,8 @@ celery_app = Celery(
         "app.celery_app.tasks.notifications", 
         "app.celery_app.tasks.telephony",
         "app.celery_app.tasks.analytics",
-        "app.celery_app.tasks.maintenance"
+        "app.celery_app.tasks.maintenance",
+        "app.celery_app.tasks.orders"
     ]
 )
 
@@ -74,11 +75,29 @@ celery_app.conf.beat_schedule = {
         "schedule": 30 * 60,  # 30 minutes
     },
     
+    # Repair per-status order counters every hour
+    "reconcile-status-counters": {
+        "task": "app.celery_app.tasks.maintenance.reconcile_status_counters",
+        "schedule": crontab(minute=30),
+    },
+    
+    # Premake monthly partitions and drop expired ones daily at 1:30 AM
+    "maintain-partitions": {
+        "task": "app.celery_app.tasks.maintenance.maintain_partitions",
+        "schedule": crontab(hour=1, minute=30),
+    },
+    
     # Clean up old records daily at 2 AM
     "cleanup-old-records": {
         "task": "app.celery_app.tasks.maintenance.cleanup_old_records",
         "schedule": crontab(hour=2, minute=0),
     },
+    
+    # Delete expired order exports (customer data under /uploads) every hour
+    "cleanup-exports": {
+        "task": "app.celery_app.tasks.maintenance.cleanup_exports",
+        "schedule": crontab(minute=15),
+    },
 }
 
 # Task routes for different queues
@@ -88,6 +107,7 @@ celery_app.conf.task_routes = {
     "app.celery_app.tasks.automation.*": {"queue": "automation"},
     "app.celery_app.tasks.analytics.*": {"queue": "analytics"},
     "app.celery_app.tasks.maintenance.*": {"queue": "default"},
+    "app.celery_app.tasks.orders.*": {"queue": "default"},
 }
 
 if __name__ == "__main__":
@@ -2,7 +2,7 @@ from celery.utils.log import get_task_logger
 from datetime import datetime, timedelta, date
 from typing import Dict, List, Any, Optional
 from app.celery_app.celery import celery_app
-from app.core.database import SessionLocal
+from app.core.database import read_session
 from app.models.order import Order
 from app.models.user import User, Project
 from app.models.cpa import Click, Conversion
@@ -17,7 +17,7 @@ logger = get_task_logger(__name__)
 def generate_daily_reports():
     """Generate daily analytics reports for all projects"""
     try:
-        with SessionLocal() as db:
+        with read_session() as db:
             yesterday = date.today() - timedelta(days=1)
             
             # Get all active projects
@@ -47,7 +47,7 @@ def generate_daily_reports():
 def calculate_conversion_analytics(project_id: int, start_date: str, end_date: str):
     """Calculate detailed conversion analytics for a project"""
     try:
-        with SessionLocal() as db:
+        with read_session() as db:
             start_dt = datetime.strptime(start_date, "%Y-%m-%d")
             end_dt = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
             
@@ -79,7 +79,7 @@ def calculate_conversion_analytics(project_id: int, start_date: str, end_date: s
 def update_conversion_rates():
     """Update conversion rates for all active projects"""
     try:
-        with SessionLocal() as db:
+        with read_session() as db:
             # Get projects with recent activity
             last_week = datetime.utcnow() - timedelta(days=7)
             
@@ -121,7 +121,7 @@ def update_conversion_rates():
 def generate_operator_performance_report(operator_id: int, start_date: str, end_date: str):
     """Generate performance report for specific operator"""
     try:
-        with SessionLocal() as db:
+        with read_session() as db:
             start_dt = datetime.strptime(start_date, "%Y-%m-%d")
             end_dt = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
             
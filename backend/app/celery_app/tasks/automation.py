@@ -10,6 +10,9 @@ from app.core.database import SessionLocal
 from app.models.user import User, Project, OrderStatus
 from app.models.order import Order, OrderHistory
 from app.models.cpa import AutomationRule, AutomationExecution, SMSTemplate, SMSMessage
+from app.services.order_counters import StatusChange, apply_status_changes_sync, lock_order_status_sync
+from app.services.order_history import HISTORY_SOURCE_AUTOMATION, history_diff
+from app.services.project_config import get_project_config_sync
 from app.utils.email import send_order_notification_email
 from app.utils.timezone import get_working_hours_status
 
@@ -264,7 +267,12 @@ def change_order_status_action(db, order: Order, action: Dict[str, Any]) -> Dict
     """Change order status action"""
     new_status_id = action.get("status_id")
     
-    old_status_id = order.status_id
+    # Only statuses of the order's project
+    if get_project_config_sync(db, order.project_id).status(new_status_id) is None:
+        return {"action": "change_status", "error": f"Unknown status {new_status_id}"}
+    
+    old_status_id = lock_order_status_sync(db, order.id)
+    apply_status_changes_sync(db, [StatusChange(order.project_id, order.id, old_status_id, new_status_id)])
     
     # Update order status
     stmt = update(Order).where(Order.id == order.id).values(
@@ -278,10 +286,9 @@ def change_order_status_action(db, order: Order, action: Dict[str, Any]) -> Dict
     history = OrderHistory(
         order_id=order.id,
         action="status_changed_by_automation",
-        field_name="status_id",
-        old_value=str(old_status_id),
-        new_value=str(new_status_id),
-        comment="Status changed by automation rule"
+        changes=history_diff([("status_id", old_status_id, new_status_id)]),
+        comment="Status changed by automation rule",
+        source=HISTORY_SOURCE_AUTOMATION
     )
     db.add(history)
     
@@ -357,10 +364,9 @@ def assign_operator_action(db, order: Order, action: Dict[str, Any]) -> Dict[str
     history = OrderHistory(
         order_id=order.id,
         action="operator_assigned_by_automation",
-        field_name="operator_id",
-        old_value=str(old_operator_id) if old_operator_id else None,
-        new_value=str(operator_id),
-        comment="Operator assigned by automation rule"
+        changes=history_diff([("operator_id", old_operator_id, operator_id)]),
+        comment="Operator assigned by automation rule",
+        source=HISTORY_SOURCE_AUTOMATION
     )
     db.add(history)
     
@@ -388,7 +394,8 @@ def add_comment_action(db, order: Order, action: Dict[str, Any]) -> Dict[str, An
     history = OrderHistory(
         order_id=order.id,
         action="comment_added_by_automation",
-        comment=comment_text
+        comment=comment_text,
+        source=HISTORY_SOURCE_AUTOMATION
     )
     db.add(history)
     
@@ -467,8 +474,9 @@ def auto_assign_orders(self):
             history = OrderHistory(
                 order_id=order.id,
                 action="auto_assigned",
-                new_value=str(operator.id),
-                comment="Automatically assigned to operator"
+                changes=history_diff([("operator_id", None, operator.id)]),
+                comment="Automatically assigned to operator",
+                source=HISTORY_SOURCE_AUTOMATION
             )
             self.db.add(history)
             
@@ -527,22 +535,19 @@ def update_shipping_statuses(self):
             days_shipped = (datetime.now() - order.shipped_at).days
             if days_shipped >= 3:
                 # Find "delivered" status
-                stmt = (
-                    select(OrderStatus)
-                    .where(
-                        and_(
-                            OrderStatus.project_id == order.project_id,
-                            OrderStatus.group == "paid"
-                        )
-                    )
-                    .limit(1)
-                )
-                delivered_status = self.db.execute(stmt).scalar_one_or_none()
+                config = get_project_config_sync(self.db, order.project_id)
+                delivered_status_id = config.first_status_id("paid")
                 
-                if delivered_status and order.status_id != delivered_status.id:
+                if delivered_status_id and order.status_id != delivered_status_id:
+                    old_status_id = lock_order_status_sync(self.db, order.id)
+                    apply_status_changes_sync(
+                        self.db,
+                        [StatusChange(order.project_id, order.id, old_status_id, delivered_status_id)]
+                    )
+                    
                     # Update status
                     stmt = update(Order).where(Order.id == order.id).values(
-                        status_id=delivered_status.id,
+                        status_id=delivered_status_id,
                         status_updated_at=func.now(),
                         updated_at=func.now()
                     )
@@ -552,9 +557,9 @@ def update_shipping_statuses(self):
                     history = OrderHistory(
                         order_id=order.id,
                         action="status_updated_by_shipping",
-                        field_name="status_id",
-                        new_value=str(delivered_status.id),
-                        comment="Status updated based on shipping information"
+                        changes=history_diff([("status_id", old_status_id, delivered_status_id)]),
+                        comment="Status updated based on shipping information",
+                        source=HISTORY_SOURCE_AUTOMATION
                     )
                     self.db.add(history)
                     
@@ -1,11 +1,17 @@
 from celery.utils.log import get_task_logger
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.celery_app.celery import celery_app
 from app.core.database import SessionLocal
-from app.models.order import Order, OrderHistory, CallLog
+from app.models.user import Project
+from app.models.order import Order, OrderHistory, OrderDeletion, OrderIngestTicket, CallLog
 from app.models.cpa import Click, RobotCall, SMSMessage
-from sqlalchemy import delete, select, and_, func
+from app.services.order_counters import reconcile_status_counters_sync, rebuild_period_counters_sync
+from app.services.order_export import cleanup_export_files
+from app.services.partitions import MONTHLY_PARTITIONED_TABLES, is_partitioned, ensure_partitions, drop_partitions_before, add_months, month_start
+from app.core.config import settings
+from app.utils.phone import normalize_phone
+from sqlalchemy import delete, select, update, and_, func, bindparam, text
 import os
 import shutil
 
@@ -21,10 +27,11 @@ def cleanup_old_records():
             # Clean up old order history (keep last 6 months)
             six_months_ago = datetime.utcnow() - timedelta(days=180)
             
-            # Order history cleanup
-            stmt = delete(OrderHistory).where(OrderHistory.created_at < six_months_ago)
-            result = db.execute(stmt)
-            cleanup_results["order_history_deleted"] = result.rowcount
+            # Order history cleanup; partitioned history expires by partition (maintain_partitions)
+            if not is_partitioned(db, OrderHistory.__tablename__):
+                stmt = delete(OrderHistory).where(OrderHistory.created_at < six_months_ago)
+                result = db.execute(stmt)
+                cleanup_results["order_history_deleted"] = result.rowcount
             
             # Old call logs cleanup (keep last 3 months)
             three_months_ago = datetime.utcnow() - timedelta(days=90)
@@ -66,6 +73,17 @@ def cleanup_old_records():
                 logger.warning(f"SMS messages cleanup failed: {str(e)}")
                 cleanup_results["sms_messages_deleted"] = 0
             
+            # Deleted order tombstones of the change feed (keep last 6 months)
+            stmt = delete(OrderDeletion).where(OrderDeletion.deleted_at < six_months_ago)
+            result = db.execute(stmt)
+            cleanup_results["order_deletions_deleted"] = result.rowcount
+            
+            # Queue tickets only matter until their stream entries are acknowledged
+            ticket_cutoff = datetime.utcnow() - timedelta(seconds=settings.ORDER_QUEUE_RESULT_TTL)
+            stmt = delete(OrderIngestTicket).where(OrderIngestTicket.created_at < ticket_cutoff)
+            result = db.execute(stmt)
+            cleanup_results["order_ingest_tickets_deleted"] = result.rowcount
+            
             db.commit()
             
             # File cleanup
@@ -79,6 +97,49 @@ def cleanup_old_records():
         logger.error(f"Error during cleanup: {str(exc)}")
         return {"error": str(exc)}
 
+@celery_app.task
+def maintain_partitions():
+    """Create upcoming monthly partitions and remove those past retention"""
+    try:
+        with SessionLocal() as db:
+            results = {}
+            retention_months = {"order_history": settings.ORDER_HISTORY_RETENTION_MONTHS}
+            current = month_start(datetime.utcnow().date())
+            
+            for table in MONTHLY_PARTITIONED_TABLES:
+                if not is_partitioned(db, table):
+                    continue
+                
+                created = ensure_partitions(db, table, settings.PARTITION_PREMAKE_MONTHS)
+                removed = drop_partitions_before(
+                    db,
+                    table,
+                    add_months(current, -retention_months[table]),
+                    detach_only=settings.PARTITION_RETENTION_DETACH_ONLY
+                )
+                # One table per transaction keeps the ACCESS EXCLUSIVE locks short
+                db.commit()
+                results[table] = {"created": created, "removed": removed}
+            
+            logger.info(f"Partition maintenance completed: {results}")
+            return results
+            
+    except Exception as exc:
+        logger.error(f"Error during partition maintenance: {str(exc)}")
+        return {"error": str(exc)}
+
+@celery_app.task
+def cleanup_exports():
+    """Delete order export files past ORDER_EXPORT_RETENTION_HOURS"""
+    try:
+        removed = cleanup_export_files(settings.ORDER_EXPORT_RETENTION_HOURS)
+        logger.info(f"Export cleanup completed: {removed} files deleted")
+        return {"exports_deleted": removed}
+    
+    except Exception as exc:
+        logger.error(f"Error during export cleanup: {str(exc)}")
+        return {"error": str(exc)}
+
 @celery_app.task
 def optimize_database():
     """Optimize database performance"""
@@ -271,6 +332,90 @@ def check_system_health():
         logger.error(f"Error during health check: {str(exc)}")
         return {"error": str(exc)}
 
+@celery_app.task
+def reconcile_status_counters(project_id: Optional[int] = None):
+    """Repair drift between order_status_counters and the orders table"""
+    try:
+        with SessionLocal() as db:
+            if project_id:
+                project_ids = [project_id]
+            else:
+                project_ids = db.execute(select(Project.id)).scalars().all()
+            
+            corrected = {}
+            for pid in project_ids:
+                # One short transaction per project keeps counter locks brief
+                fixed = reconcile_status_counters_sync(db, pid)
+                db.commit()
+                if fixed:
+                    corrected[pid] = fixed
+            
+            if corrected:
+                logger.warning(f"Status counters drifted and were repaired: {corrected}")
+            
+            return {"projects_checked": len(project_ids), "corrected": corrected}
+            
+    except Exception as exc:
+        logger.error(f"Error during status counter reconcile: {str(exc)}")
+        return {"error": str(exc)}
+
+@celery_app.task
+def rebuild_period_counters(project_id: int):
+    """Recompute day/month counters after a project's timezone or a status group changed"""
+    try:
+        with SessionLocal() as db:
+            written = rebuild_period_counters_sync(db, project_id)
+            db.commit()
+            return {"project_id": project_id, "counters_written": written}
+            
+    except Exception as exc:
+        logger.error(f"Error rebuilding period counters for project {project_id}: {str(exc)}")
+        return {"error": str(exc)}
+
+@celery_app.task
+def backfill_phone_norm(batch_size: int = 5000):
+    """Fill orders.phone_norm for orders created before it was maintained"""
+    try:
+        stmt = (
+            update(Order.__table__)
+            .where(Order.__table__.c.id == bindparam("order_id"))
+            # Keep updated_at: dateModFrom syncs should not see the backfill either
+            .values(phone_norm=bindparam("normalized"), updated_at=Order.__table__.c.updated_at)
+        )
+        updated = 0
+        last_id = 0
+        
+        with SessionLocal() as db:
+            while True:
+                rows = db.execute(
+                    select(Order.id, Order.customer_phone)
+                    .where(and_(Order.id > last_id, Order.phone_norm.is_(None)))
+                    .order_by(Order.id)
+                    .limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                
+                values = [
+                    {"order_id": order_id, "normalized": normalize_phone(phone)}
+                    for order_id, phone in rows
+                ]
+                values = [value for value in values if value["normalized"]]
+                if values:
+                    # A derived column, not an order change: keep it out of getOrdersChanges.html
+                    db.execute(text("SET LOCAL app.skip_change_seq = 'on'"))
+                    db.execute(stmt, values)
+                db.commit()
+                updated += len(values)
+        
+        logger.info(f"phone_norm backfilled for {updated} orders")
+        return {"updated": updated}
+        
+    except Exception as exc:
+        logger.error(f"Error during phone_norm backfill: {str(exc)}")
+        return {"error": str(exc)}
+
 def cleanup_old_files() -> Dict[str, Any]:
     """Clean up old files from uploads directory"""
     try:
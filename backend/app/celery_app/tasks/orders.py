@@ -0,0 +1,84 @@
+import os
+from celery.utils.log import get_task_logger
+from typing import Dict, Any, Optional
+from app.celery_app.celery import celery_app
+from app.core.database import SessionLocal, read_session
+from app.schemas.main import BulkOrderRequest, OrderExportRequest
+from app.services.order_export import export_orders_to_file
+from app.services.order_import import ImportProgress, import_orders_file
+from app.services.order_mutations import bulk_changes, run_bulk_operation_sync
+from app.services.project_config import get_project_config_sync
+
+logger = get_task_logger(__name__)
+
+# Celery state of a running bulk operation; meta carries the progress counts
+BULK_PROGRESS_STATE = "PROGRESS"
+
+@celery_app.task(bind=True)
+def run_bulk_order_operation(self, payload: Dict[str, Any], user_id: Optional[int], total: int):
+    """Apply a bulk order operation too large for the request, reporting progress per chunk"""
+    request = BulkOrderRequest.model_validate(payload)
+    progress = {"project_id": request.project_id, "total": total, "processed": 0, "changed": 0}
+    
+    def report(processed: int, changed: int):
+        progress.update(processed=processed, changed=changed)
+        self.update_state(state=BULK_PROGRESS_STATE, meta=progress)
+    
+    try:
+        with SessionLocal() as db:
+            status_id = bulk_changes(request).get("status_id")
+            order_status = get_project_config_sync(db, request.project_id).status(status_id) if status_id else None
+            run_bulk_operation_sync(db, request, order_status, user_id, report)
+        
+        logger.info(f"Bulk {request.action} in project {request.project_id}: {progress}")
+        return progress
+        
+    except Exception as exc:
+        logger.error(f"Bulk {request.action} in project {request.project_id} failed: {str(exc)}")
+        return {**progress, "error": str(exc)}
+
+@celery_app.task(bind=True)
+def export_orders(self, payload: Dict[str, Any], total: Optional[int]):
+    """Write an order export too large for the request to uploads/exports, reporting progress"""
+    request = OrderExportRequest.model_validate(payload)
+    progress = {"project_id": request.project_id, "total": total, "processed": 0}
+    
+    def report(processed: int):
+        progress.update(processed=processed)
+        self.update_state(state=BULK_PROGRESS_STATE, meta=progress)
+    
+    try:
+        with read_session() as db:
+            exported = export_orders_to_file(db, request, report)
+        
+        logger.info(f"Exported {exported['rows']} orders of project {request.project_id} to {exported['url']}")
+        return {**progress, "processed": exported["rows"], "url": exported["url"]}
+        
+    except Exception as exc:
+        logger.error(f"Order export of project {request.project_id} failed: {str(exc)}")
+        return {**progress, "error": str(exc)}
+
+@celery_app.task(bind=True)
+def import_orders(self, project_id: int, path: str, user_id: Optional[int]):
+    """Create orders from an uploaded .xlsx/.csv file, reporting progress per chunk"""
+    result = {"project_id": project_id, "processed": 0, "created": 0, "duplicates": 0, "failed": 0}
+    
+    def report(progress: ImportProgress):
+        result.update(progress.counts())
+        self.update_state(state=BULK_PROGRESS_STATE, meta=result)
+    
+    try:
+        with SessionLocal() as db:
+            progress = import_orders_file(db, project_id, path, user_id, report)
+        
+        logger.info(f"Imported orders into project {project_id}: {progress.counts()}")
+        return {**result, **progress.counts(), "errors": progress.errors}
+        
+    except Exception as exc:
+        logger.error(f"Order import into project {project_id} failed: {str(exc)}")
+        return {**result, "error": str(exc)}
+    
+    finally:
+        # The upload holds customer data and is served under /uploads; don't keep it
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Async Redis client for FastAPI
+redis_client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+
+# Sync Redis client for Celery
+sync_redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+# Pub/sub channel used to drop in-process cache entries in every worker
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Generation counters of shared entries outlive any load in progress
+GENERATION_TTL = 24 * 60 * 60
+
+# SET KEYS[1] only while the generation KEYS[2] still has the value read before loading
+SET_IF_GENERATION_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+_MISSING = object()
+
+class TTLCache:
+    """In-process LRU cache with per-entry expiry and hit/miss counters"""
+    
+    registry: Dict[str, "TTLCache"] = {}
+    
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 60):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped by every invalidation, so loads that started before one don't store stale values
+        self.epoch = 0
+        # Caller-defined counters (e.g. shared-cache hits) reported with stats()
+        self.counters: Dict[str, int] = {}
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        TTLCache.registry[name] = self
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return cached value or default, counting the lookup"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, epoch: Optional[int] = None):
+        """Store value, evicting the least recently used entry when full.
+        
+        With epoch (read before loading value), nothing is stored if the cache
+        was invalidated meanwhile.
+        """
+        with self._lock:
+            if epoch is not None and epoch != self.epoch:
+                return
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+    
+    def incr(self, counter: str, amount: int = 1):
+        """Bump a caller-defined counter"""
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+    
+    def pop(self, key: Hashable):
+        """Drop a single entry"""
+        with self._lock:
+            self.epoch += 1
+            self._data.pop(key, None)
+    
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self.epoch += 1
+            self._data.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            **self.counters
+        }
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Return counters for all in-process caches"""
+    return {name: cache.stats() for name, cache in TTLCache.registry.items()}
+
+def _drop_local(message: Dict[str, Any]):
+    cache = TTLCache.registry.get(message.get("cache"))
+    if cache is None:
+        return
+    
+    if message.get("key") is None:
+        cache.clear()
+    else:
+        cache.pop(message["key"])
+
+def _generation_key(redis_key: str) -> str:
+    return f"{redis_key}:gen"
+
+async def read_generation(redis_key: str) -> Optional[str]:
+    """Generation of a shared entry, to read before loading it; None when Redis is unavailable"""
+    try:
+        return await redis_client.get(_generation_key(redis_key)) or ""
+    except Exception as e:
+        logger.warning(f"Failed to read cache generation of {redis_key}: {str(e)}")
+        return None
+
+async def set_if_generation(redis_key: str, value: str, ex: int, generation: Optional[str]) -> bool:
+    """Store a loaded entry unless it was invalidated since read_generation.
+    
+    Returns False when it was, so the caller doesn't cache the stale value
+    locally either.
+    """
+    if generation is None:
+        return True
+    try:
+        return bool(await redis_client.eval(
+            SET_IF_GENERATION_SCRIPT, 2, redis_key, _generation_key(redis_key), generation, value, ex
+        ))
+    except Exception as e:
+        logger.warning(f"Failed to store {redis_key} in cache: {str(e)}")
+        return True
+
+async def delete_shared(redis_key: str):
+    """Delete a shared entry and bump its generation, so loads in progress don't store it again"""
+    generation_key = _generation_key(redis_key)
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(redis_key)
+    pipe.incr(generation_key)
+    pipe.expire(generation_key, GENERATION_TTL)
+    await pipe.execute()
+
+async def publish_invalidation(cache_name: str, key: Optional[Hashable] = None):
+    """Drop a cache entry locally and tell the other workers to do the same"""
+    message = {"cache": cache_name, "key": key}
+    _drop_local(message)
+    
+    try:
+        await redis_client.publish(INVALIDATION_CHANNEL, json.dumps(message))
+    except Exception as e:
+        logger.warning(f"Failed to publish cache invalidation for {cache_name}: {str(e)}")
+
+def publish_invalidation_sync(cache_name: str, key: Optional[Hashable] = None):
+    """Sync variant of publish_invalidation for Celery tasks"""
+    message = {"cache": cache_name, "key": key}
+    _drop_local(message)
+    
+    try:
+        sync_redis_client.publish(INVALIDATION_CHANNEL, json.dumps(message))
+    except Exception as e:
+        logger.warning(f"Failed to publish cache invalidation for {cache_name}: {str(e)}")
+
+async def listen_for_invalidations():
+    """Apply invalidation messages published by other workers (runs for app lifetime)"""
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    _drop_local(json.loads(message["data"]))
+                except (ValueError, TypeError):
+                    continue
+        except asyncio.CancelledError:
+            await pubsub.aclose()
+            raise
+        except Exception as e:
+            logger.warning(f"Cache invalidation listener error: {str(e)}")
+            # Local entries may be stale while disconnected
+            for cache in TTLCache.registry.values():
+                cache.clear()
+            await pubsub.aclose()
+            await asyncio.sleep(5)
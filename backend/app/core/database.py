@@ -1,8 +1,13 @@
+import logging
+import time
+from typing import Any, Dict, Optional
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase, sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy import create_engine, text
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 # Async engine for FastAPI
 async_engine = create_async_engine(
     settings.DATABASE_URL,
@@ -34,6 +39,153 @@ SessionLocal = sessionmaker(
     bind=sync_engine
 )
 
+# Optional replica engines (DATABASE_REPLICA_URL*); a short connect timeout
+# lets reads fall back to the primary quickly when the replica is down
+async_replica_engine = create_async_engine(
+    settings.DATABASE_REPLICA_URL,
+    echo=settings.DEBUG,
+    pool_pre_ping=True,
+    pool_size=20,
+    max_overflow=30,
+    connect_args={"timeout": 5}
+) if settings.DATABASE_REPLICA_URL else None
+
+sync_replica_engine = create_engine(
+    settings.DATABASE_REPLICA_URL_SYNC,
+    echo=settings.DEBUG,
+    pool_pre_ping=True,
+    pool_size=20,
+    max_overflow=30,
+    connect_args={"connect_timeout": 5}
+) if settings.DATABASE_REPLICA_URL_SYNC else None
+
+AsyncReplicaSessionLocal = async_sessionmaker(
+    async_replica_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+) if async_replica_engine else None
+
+ReplicaSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=sync_replica_engine
+) if sync_replica_engine else None
+
+# Seconds the replica is behind: 0 when it has replayed everything it received
+REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+class ReplicaRouter:
+    """Decides per session whether reads go to the replica, from a periodically checked lag.
+    
+    Reads go to the primary when no replica is configured, when it can't be
+    reached, or when it may be more than REPLICA_MAX_LAG seconds behind. The
+    lag is only sampled every REPLICA_LAG_CHECK_INTERVAL seconds, so the time
+    since the sample counts as lag too: a stalled replica is dropped once the
+    bound is reached rather than up to one interval later. Writes and
+    read-your-writes paths always use the primary session makers.
+    """
+    
+    def __init__(self):
+        self.lag: Optional[float] = None
+        self.measured_at = 0.0
+        self.checked_at = 0.0
+        self.routed = 0
+        self.fallbacks = 0
+    
+    def _check_due(self) -> bool:
+        if time.monotonic() - self.checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+            return False
+        # Claimed before checking, so concurrent sessions use the last value meanwhile
+        self.checked_at = time.monotonic()
+        return True
+    
+    def _measured(self, lag: float):
+        self.lag = lag
+        self.measured_at = time.monotonic()
+    
+    def _route(self) -> bool:
+        # Worst case the replica replayed nothing since the sample
+        use_replica = (
+            self.lag is not None
+            and self.lag + time.monotonic() - self.measured_at <= settings.REPLICA_MAX_LAG
+        )
+        if use_replica:
+            self.routed += 1
+        else:
+            self.fallbacks += 1
+        return use_replica
+    
+    def _failed(self, error: Exception):
+        self.lag = None
+        logger.warning(f"Replica lag check failed, reading from the primary: {str(error)}")
+    
+    async def use_replica(self) -> bool:
+        if async_replica_engine is None:
+            return False
+        if self._check_due():
+            try:
+                async with async_replica_engine.connect() as connection:
+                    self._measured(float((await connection.execute(REPLICA_LAG_SQL)).scalar()))
+            except Exception as e:
+                self._failed(e)
+        return self._route()
+    
+    def use_replica_sync(self) -> bool:
+        if sync_replica_engine is None:
+            return False
+        if self._check_due():
+            try:
+                with sync_replica_engine.connect() as connection:
+                    self._measured(float(connection.execute(REPLICA_LAG_SQL).scalar()))
+            except Exception as e:
+                self._failed(e)
+        return self._route()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"lag": self.lag, "routed": self.routed, "fallbacks": self.fallbacks}
+
+replica_router = ReplicaRouter()
+
+async def async_read_session() -> AsyncSession:
+    """Session for read-only work that tolerates REPLICA_MAX_LAG staleness"""
+    if await replica_router.use_replica():
+        return AsyncReplicaSessionLocal()
+    return AsyncSessionLocal()
+
+def read_session() -> Session:
+    """Sync variant of async_read_session for Celery reports"""
+    if replica_router.use_replica_sync():
+        return ReplicaSessionLocal()
+    return SessionLocal()
+
+def is_replica_session(db) -> bool:
+    """Whether db reads from the replica (shared caches must not be filled from it)"""
+    return db.bind is not None and db.bind in (async_replica_engine, sync_replica_engine)
+
+def _pool_stats(engine) -> Dict[str, int]:
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow()
+    }
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Connection pool usage per engine and replica routing counters"""
+    engines = {
+        "primary": async_engine,
+        "primary_sync": sync_engine,
+        "replica": async_replica_engine,
+        "replica_sync": sync_replica_engine
+    }
+    stats: Dict[str, Any] = {name: _pool_stats(engine) for name, engine in engines.items() if engine is not None}
+    stats["replica_routing"] = replica_router.stats()
+    return stats
+
 class Base(DeclarativeBase):
     """Base class for all database models"""
     pass
@@ -46,6 +198,14 @@ async def get_async_db():
         finally:
             await session.close()
 
+# Dependency for read-only endpoints: the replica while it is fresh enough
+async def get_read_db():
+    async with await async_read_session() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
 # Dependency to get sync database session (for Celery)
 def get_sync_db():
     db = SessionLocal()
@@ -7,11 +7,16 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.core.config import settings
-from app.core.database import get_async_db
-from app.models.user import User, UserRole
+from app.core.database import get_async_db, AsyncSessionLocal, is_replica_session
+from app.core.cache import TTLCache, redis_client, publish_invalidation, read_generation, set_if_generation, delete_shared
+from app.models.user import User, UserRole, ProjectUser
+from app.schemas.main import ProjectSnapshot, UserIdentity
+import logging
 import secrets
 import string
 
+logger = logging.getLogger(__name__)
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -43,11 +48,11 @@ def generate_api_key() -> str:
     alphabet = string.ascii_letters + string.digits
     return ''.join(secrets.choice(alphabet) for _ in range(64))
 
-async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
-    """Verify JWT token and return payload"""
+def decode_access_token(token: str) -> dict:
+    """Verify JWT access token and return {"user_id", "payload"}"""
     try:
         payload = jwt.decode(
-            credentials.credentials, 
+            token, 
             settings.SECRET_KEY, 
             algorithms=[settings.ALGORITHM]
         )
@@ -66,16 +71,97 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """Verify JWT token and return payload"""
+    return decode_access_token(credentials.credentials)
+
+# User ID -> identity and memberships cache (L1 in-process, L2 shared through Redis)
+USER_IDENTITY_CACHE_NAME = "user_identity"
+USER_IDENTITY_REDIS_PREFIX = "user_identity:"
+
+user_identity_cache = TTLCache(
+    USER_IDENTITY_CACHE_NAME,
+    maxsize=settings.USER_IDENTITY_CACHE_SIZE,
+    ttl=settings.USER_IDENTITY_CACHE_TTL
+)
+
+async def invalidate_user_identity(user_id: int):
+    """Forget cached identity of user in all workers (after membership or status changes)"""
+    try:
+        await delete_shared(f"{USER_IDENTITY_REDIS_PREFIX}{user_id}")
+    except Exception as e:
+        logger.warning(f"Failed to delete cached user identity: {str(e)}")
+    
+    await publish_invalidation(USER_IDENTITY_CACHE_NAME, user_id)
+
+async def get_user_identity(db: AsyncSession, user_id: int) -> Optional[UserIdentity]:
+    """Resolve user and project memberships through L1, Redis and finally the database.
+    
+    Fills are guarded by the cache epoch and the Redis generation of the user,
+    so an invalidation that lands during a load isn't undone by it.
+    """
+    identity = user_identity_cache.get(user_id)
+    if identity is not None:
+        return identity
+    
+    epoch = user_identity_cache.epoch
+    redis_key = f"{USER_IDENTITY_REDIS_PREFIX}{user_id}"
+    try:
+        cached = await redis_client.get(redis_key)
+    except Exception as e:
+        logger.warning(f"User identity cache unavailable: {str(e)}")
+        cached = None
+    
+    if cached:
+        user_identity_cache.incr("redis_hits")
+        identity = UserIdentity.model_validate_json(cached)
+        user_identity_cache.set(user_id, identity, epoch=epoch)
+        return identity
+    
+    # Identities are shared through Redis: load them from the primary, so a lagging
+    # replica can't bring back revoked memberships or a disabled user
+    if is_replica_session(db):
+        async with AsyncSessionLocal() as primary_db:
+            return await get_user_identity(primary_db, user_id)
+    
+    user_identity_cache.incr("db_lookups")
+    generation = await read_generation(redis_key)
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    
+    if not user:
+        return None
+    
+    stmt = select(ProjectUser.project_id, ProjectUser.permissions).where(ProjectUser.user_id == user_id)
+    result = await db.execute(stmt)
+    identity = UserIdentity.model_validate(user).model_copy(update={
+        "memberships": {project_id: permissions or {} for project_id, permissions in result.all()}
+    })
+    
+    if await set_if_generation(redis_key, identity.model_dump_json(), settings.USER_IDENTITY_REDIS_TTL, generation):
+        user_identity_cache.set(user_id, identity, epoch=epoch)
+    
+    return identity
+
 async def get_current_user(
     token_data: dict = Depends(verify_token),
     db: AsyncSession = Depends(get_async_db)
-) -> User:
-    """Get current authenticated user"""
-    user_id = token_data["user_id"]
+) -> UserIdentity:
+    """Get current authenticated user with project memberships (cached, resolved once per request)"""
+    return await authenticate_user(token_data, db)
+
+async def authenticate_user(token_data: dict, db: AsyncSession) -> UserIdentity:
+    """Resolve the active user of a decoded access token, for endpoints without the Bearer header"""
+    try:
+        user_id = int(token_data["user_id"])
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
-    stmt = select(User).where(User.id == user_id)
-    result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
+    user = await get_user_identity(db, user_id)
     
     if user is None:
         raise HTTPException(
@@ -91,7 +177,7 @@ async def get_current_user(
     
     return user
 
-async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_admin(current_user: UserIdentity = Depends(get_current_user)) -> UserIdentity:
     """Require admin role"""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
@@ -100,7 +186,7 @@ async def get_current_admin(current_user: User = Depends(get_current_user)) -> U
         )
     return current_user
 
-async def get_current_operator(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_operator(current_user: UserIdentity = Depends(get_current_user)) -> UserIdentity:
     """Require operator role or higher"""
     if current_user.role not in [UserRole.ADMIN, UserRole.OPERATOR]:
         raise HTTPException(
@@ -109,6 +195,73 @@ async def get_current_operator(current_user: User = Depends(get_current_user)) -
         )
     return current_user
 
+# API key -> project snapshot cache (L1 in-process, L2 shared through Redis)
+API_KEY_CACHE_NAME = "api_key"
+API_KEY_REDIS_PREFIX = "api_key:"
+
+api_key_cache = TTLCache(
+    API_KEY_CACHE_NAME,
+    maxsize=settings.API_KEY_CACHE_SIZE,
+    ttl=settings.API_KEY_CACHE_TTL
+)
+async def invalidate_api_key_cache(api_key: Optional[str]):
+    """Forget cached project for API key in all workers"""
+    if not api_key:
+        return
+    
+    try:
+        await delete_shared(f"{API_KEY_REDIS_PREFIX}{api_key}")
+    except Exception as e:
+        logger.warning(f"Failed to delete cached API key: {str(e)}")
+    
+    await publish_invalidation(API_KEY_CACHE_NAME, api_key)
+
+async def _load_project_snapshot(token: str, db: AsyncSession) -> Optional[ProjectSnapshot]:
+    """Resolve API key through L1, Redis and finally the database.
+    
+    Fills are guarded like get_user_identity's, so a key revoked during a load
+    isn't cached again.
+    """
+    from app.models.user import Project
+    
+    snapshot = api_key_cache.get(token)
+    if snapshot is not None:
+        return snapshot
+    
+    epoch = api_key_cache.epoch
+    redis_key = f"{API_KEY_REDIS_PREFIX}{token}"
+    try:
+        cached = await redis_client.get(redis_key)
+    except Exception as e:
+        logger.warning(f"API key cache unavailable: {str(e)}")
+        cached = None
+    
+    if cached:
+        api_key_cache.incr("redis_hits")
+        snapshot = ProjectSnapshot.model_validate_json(cached)
+        api_key_cache.set(token, snapshot, epoch=epoch)
+        return snapshot
+    
+    # Same for snapshots: a lagging replica may still know a regenerated key or a deactivated project
+    if is_replica_session(db):
+        async with AsyncSessionLocal() as primary_db:
+            return await _load_project_snapshot(token, primary_db)
+    
+    api_key_cache.incr("db_lookups")
+    generation = await read_generation(redis_key)
+    stmt = select(Project).where(Project.api_key == token)
+    result = await db.execute(stmt)
+    project = result.scalar_one_or_none()
+    
+    if not project:
+        return None
+    
+    snapshot = ProjectSnapshot.model_validate(project)
+    if await set_if_generation(redis_key, snapshot.model_dump_json(), settings.API_KEY_CACHE_REDIS_TTL, generation):
+        api_key_cache.set(token, snapshot, epoch=epoch)
+    
+    return snapshot
+
 class APIKeyAuth:
     """API Key authentication for external integrations"""
     
@@ -121,11 +274,7 @@ class APIKeyAuth:
         db: AsyncSession = Depends(get_async_db)
     ) -> dict:
         """Verify API key and return project info"""
-        from app.models.user import Project
-        
-        stmt = select(Project).where(Project.api_key == token)
-        result = await db.execute(stmt)
-        project = result.scalar_one_or_none()
+        project = await _load_project_snapshot(token, db)
         
         if not project:
             raise HTTPException(
@@ -147,38 +296,34 @@ class Permission:
     
     @staticmethod
     async def can_access_project(
-        user: User, 
+        user: Union[UserIdentity, User], 
         project_id: int, 
         db: AsyncSession,
         required_permission: Optional[str] = None
     ) -> bool:
-        """Check if user can access specific project"""
-        from app.models.user import ProjectUser
+        """Check if user can access specific project (no queries for a cached UserIdentity)"""
+        identity = user if isinstance(user, UserIdentity) else await get_user_identity(db, user.id)
+        if identity is None:
+            return False
         
         # Project owner always has access
-        if user.role == UserRole.ADMIN:
+        if identity.role == UserRole.ADMIN:
             return True
         
         # Check project membership
-        stmt = select(ProjectUser).where(
-            ProjectUser.user_id == user.id,
-            ProjectUser.project_id == project_id
-        )
-        result = await db.execute(stmt)
-        project_user = result.scalar_one_or_none()
-        
-        if not project_user:
+        permissions = identity.memberships.get(project_id)
+        if permissions is None:
             return False
         
         # Check specific permission if required
         if required_permission:
-            return project_user.permissions.get(required_permission, False)
+            return permissions.get(required_permission, False)
         
         return True
     
     @staticmethod
     async def require_project_access(
-        user: User,
+        user: Union[UserIdentity, User],
         project_id: int,
         db: AsyncSession,
         permission: Optional[str] = None
@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+import asyncio
 import logging
 import time
 from contextlib import asynccontextmanager
@@ -10,7 +11,9 @@ from contextlib import asynccontextmanager
 # Import API routers
 from app.api.admin import auth, projects, orders, products, leadvertex_api
 from app.core.config import settings
-from app.core.database import async_engine, Base
+from app.core.database import async_engine, async_replica_engine, Base, get_pool_stats
+from app.core.cache import redis_client, listen_for_invalidations, get_cache_stats
+from app.services.order_feed import order_feed_hub
 
 # Configure logging
 logging.basicConfig(
@@ -31,11 +34,22 @@ async def lifespan(app: FastAPI):
     
     logger.info("Database tables created successfully")
     
+    # Keep in-process caches consistent across workers
+    invalidation_listener = asyncio.create_task(listen_for_invalidations())
+    
+    # Live order feed: LISTEN for committed changes and fan them out to clients
+    order_feed = asyncio.create_task(order_feed_hub.run())
+    
     yield
     
     # Shutdown
     logger.info("Shutting down application...")
+    invalidation_listener.cancel()
+    order_feed.cancel()
+    await redis_client.aclose()
     await async_engine.dispose()
+    if async_replica_engine is not None:
+        await async_replica_engine.dispose()
 
 # Create FastAPI application
 app = FastAPI(
@@ -133,7 +147,9 @@ async def health_check():
     return {
         "status": "healthy",
         "version": settings.PROJECT_VERSION,
-        "timestamp": time.time()
+        "timestamp": time.time(),
+        "caches": get_cache_stats(),
+        "database": get_pool_stats()
     }
 
 # Root endpoint
@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON, ForeignKey, DECIMAL, Index
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, Date, DateTime, Text, JSON, ForeignKey, DECIMAL, Index, DDL, event
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, false, text
 from datetime import datetime
 from enum import Enum
 from app.core.database import Base
+from app.utils.phone import phone_digits_sql
 
 class OrderSource(str, Enum):
     LANDING = "landing"
@@ -29,6 +30,8 @@ class Order(Base):
     # Customer info
     customer_name = Column(String(255), nullable=False)
     customer_phone = Column(String(20), nullable=False, index=True)
+    # customer_phone in E.164 (app.utils.phone.normalize_phone), for matching customers
+    phone_norm = Column(String(16), nullable=True)
     customer_email = Column(String(255), nullable=True)
     
     # Address
@@ -57,6 +60,8 @@ class Order(Base):
     
     # External IDs
     external_id = Column(String(255), nullable=True, index=True)
+    # Set for projects with settings["unique_external_id"]; covered by a partial unique index
+    external_id_unique = Column(Boolean, nullable=False, default=False, server_default=false())
     webmaster_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     
     # Landing page
@@ -98,6 +103,10 @@ class Order(Base):
     shipped_at = Column(DateTime(timezone=True), nullable=True)
     canceled_at = Column(DateTime(timezone=True), nullable=True)
     
+    # Per-project change sequence, set by the orders_change_seq trigger on every
+    # INSERT/UPDATE (see ORDER_CHANGE_SEQ_DDL); drives getOrdersChanges.html
+    change_seq = Column(BigInteger, nullable=True)
+    
     # Relations
     project = relationship("Project", back_populates="orders")
     status = relationship("OrderStatus", back_populates="orders")
@@ -111,14 +120,150 @@ class Order(Base):
     # Indexes
     __table_args__ = (
         Index('idx_order_project_status', 'project_id', 'status_id'),
-        Index('idx_order_project_created', 'project_id', 'created_at'),
+        # Keyset pagination of the admin order list: one per allowed sort_by
+        Index('idx_order_project_created_id', 'project_id', 'created_at', 'id'),
+        Index('idx_order_project_modified_id', 'project_id', func.coalesce(updated_at, created_at), 'id'),
+        Index('idx_order_project_status_updated_id', 'project_id', 'status_updated_at', 'id'),
+        Index('idx_order_project_amount_id', 'project_id', 'total_amount', 'id'),
+        Index('idx_order_project_name_id', 'project_id', 'customer_name', 'id'),
         Index('idx_order_operator_status', 'operator_id', 'status_id'),
         Index('idx_order_next_call', 'next_call_at'),
+        # Keyset pagination by ID (LeadVertex afterId/limit)
+        Index('idx_order_project_id', 'project_id', 'id'),
+        Index('idx_order_project_status_id', 'project_id', 'status_id', 'id'),
+        # Opt-in externalId deduplication for addOrder.html retries
+        Index(
+            'uq_order_project_external_id', 'project_id', 'external_id',
+            unique=True, postgresql_where=text('external_id_unique')
+        ),
+        # Incremental sync (getOrdersChanges.html)
+        Index('idx_order_project_change_seq', 'project_id', 'change_seq'),
+        # Customer order history and duplicate detection
+        Index('idx_order_project_phone_norm', 'project_id', 'phone_norm'),
+        # Operator search (app/services/order_search.py), pg_trgm
+        Index(
+            'idx_order_name_trgm', 'customer_name',
+            postgresql_using='gin', postgresql_ops={'customer_name': 'gin_trgm_ops'}
+        ),
+        Index(
+            'idx_order_email_trgm', 'customer_email',
+            postgresql_using='gin', postgresql_ops={'customer_email': 'gin_trgm_ops'}
+        ),
+        Index(
+            'idx_order_phone_digits_trgm', phone_digits_sql(customer_phone).label('phone_digits'),
+            postgresql_using='gin', postgresql_ops={'phone_digits': 'gin_trgm_ops'}
+        ),
     )
     
     def __repr__(self):
         return f"<Order(id={self.id}, customer='{self.customer_name}', phone='{self.customer_phone}')>"
 
+class OrderStatusCounter(Base):
+    """Number of orders per (project, status), maintained on every status change"""
+    __tablename__ = "order_status_counters"
+    
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    status_id = Column(Integer, ForeignKey("order_statuses.id", ondelete="CASCADE"), primary_key=True)
+    orders_count = Column(Integer, nullable=False, default=0)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class OrderPeriodCounter(Base):
+    """Orders created/accepted per project day and month, in the project's timezone"""
+    __tablename__ = "order_period_counters"
+    
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    period = Column(String(5), primary_key=True)  # day, month
+    period_start = Column(Date, primary_key=True)
+    
+    # Orders created in the period, and those of them currently in an "accepted" status
+    created_count = Column(Integer, nullable=False, default=0)
+    accepted_count = Column(Integer, nullable=False, default=0)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class OrderChangeSeq(Base):
+    """Last change sequence number handed out per project"""
+    __tablename__ = "order_change_seqs"
+    
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    last_seq = Column(BigInteger, nullable=False, default=0)
+
+class OrderDeletion(Base):
+    """Tombstone of a deleted order, so change feed consumers see the deletion"""
+    __tablename__ = "order_deletions"
+    
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    change_seq = Column(BigInteger, primary_key=True)
+    order_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+class OrderIngestTicket(Base):
+    """Stream entry of a queued order, committed with the order so a redelivered entry isn't inserted twice"""
+    __tablename__ = "order_ingest_tickets"
+    
+    ticket = Column(String(64), primary_key=True)
+    project_id = Column(Integer, nullable=False)
+    order_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+# The sequence row of the project stays locked until commit, so change numbers
+# become visible in the order they were handed out and a reader that has seen
+# change N never gets a later commit with a number below N. NOTIFY on the
+# order_changes channel (payload: project ID, so one per project and
+# transaction) wakes the live order feed when the transaction commits.
+ORDER_CHANGE_SEQ_DDL = (
+    """
+    CREATE OR REPLACE FUNCTION orders_bump_change_seq() RETURNS trigger AS $$
+    DECLARE
+        next_seq BIGINT;
+        changed_project_id INTEGER;
+    BEGIN
+        -- Maintenance updates of derived columns (e.g. phone_norm backfill) opt out
+        IF TG_OP = 'UPDATE' AND current_setting('app.skip_change_seq', true) = 'on' THEN
+            RETURN NEW;
+        END IF;
+        
+        IF TG_OP = 'DELETE' THEN
+            changed_project_id := OLD.project_id;
+        ELSE
+            changed_project_id := NEW.project_id;
+        END IF;
+        
+        INSERT INTO order_change_seqs (project_id, last_seq) VALUES (changed_project_id, 1)
+        ON CONFLICT (project_id) DO UPDATE SET last_seq = order_change_seqs.last_seq + 1
+        RETURNING last_seq INTO next_seq;
+        
+        PERFORM pg_notify('order_changes', changed_project_id::text);
+        
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO order_deletions (project_id, change_seq, order_id, deleted_at)
+            VALUES (changed_project_id, next_seq, OLD.id, now());
+            RETURN OLD;
+        END IF;
+        
+        NEW.change_seq := next_seq;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER orders_change_seq
+    BEFORE INSERT OR UPDATE OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION orders_bump_change_seq()
+    """,
+)
+
+for statement in ORDER_CHANGE_SEQ_DDL:
+    event.listen(Order.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+# Trigram operator classes of the search indexes
+event.listen(
+    Order.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
 class OrderItem(Base):
     __tablename__ = "order_items"
     
@@ -141,6 +286,11 @@ class OrderItem(Base):
     product = relationship("Product", back_populates="order_items")
 
 class OrderHistory(Base):
+    """Order audit trail; optionally partitioned by month of created_at (app/services/partitions.py).
+    
+    Read it through app/services/order_history.py, which expands compact
+    records into one item per changed field.
+    """
     __tablename__ = "order_history"
     
     id = Column(Integer, primary_key=True)
@@ -153,7 +303,12 @@ class OrderHistory(Base):
     new_value = Column(Text, nullable=True)
     comment = Column(Text, nullable=True)
     
+    # Compact records: every field a mutation changed, {"status_id": ["1", "2"], ...},
+    # instead of one field_name/old_value/new_value row per field
+    changes = Column(JSON, nullable=True)
+    
     # Context
+    source = Column(String(50), nullable=True)  # admin, api, bulk, automation (see app/services/order_history.py)
     ip_address = Column(String(45), nullable=True)
     user_agent = Column(String(500), nullable=True)
     
@@ -162,6 +317,11 @@ class OrderHistory(Base):
     # Relations
     order = relationship("Order", back_populates="history")
     user = relationship("User")
+    
+    __table_args__ = (
+        # Newest-first keyset pagination of one order's history
+        Index('idx_order_history_order_created', 'order_id', 'created_at', 'id'),
+    )
 
 class CallLog(Base):
     __tablename__ = "call_logs"
@@ -3,6 +3,7 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum
+import pytz
 
 # Base schemas
 class BaseResponse(BaseModel):
@@ -18,10 +19,14 @@ class PaginationParams(BaseModel):
 class PaginatedResponse(BaseModel):
     """Paginated response"""
     items: List[Any]
-    total: int
+    total: Optional[int] = None  # None with count_mode=none
+    total_is_estimate: bool = False
     page: int
     limit: int
-    pages: int
+    pages: Optional[int] = None
+    # Keyset pagination (endpoints that support cursor=...)
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
 
 # User schemas
 class UserRole(str, Enum):
@@ -93,6 +98,14 @@ class ProjectUpdate(BaseModel):
     domain: Optional[str] = None
     webhook_url: Optional[str] = None
     settings: Optional[Dict[str, Any]] = None
+    
+    @field_validator("settings")
+    @classmethod
+    def validate_timezone(cls, value):
+        # Used in SQL for day/month counter buckets, so it must be a known zone
+        if value and value.get("timezone") is not None and value["timezone"] not in pytz.all_timezones_set:
+            raise ValueError(f"Unknown timezone: {value['timezone']}")
+        return value
 
 class ProjectResponse(ProjectBase):
     id: int
@@ -125,6 +138,80 @@ class ProjectInfo(BaseModel):
     class Config:
         allow_population_by_field_name = True
 
+class ProjectSnapshot(BaseModel):
+    """Cached project data used by API key authentication"""
+    id: int
+    name: str
+    title: Optional[str] = None
+    tariff: str
+    max_orders_per_month: Optional[int] = None
+    is_unlimited_orders: bool = False
+    is_active: bool = True
+    trial_ends_at: Optional[datetime] = None
+    created_at: datetime
+    api_key: Optional[str] = None
+    settings: Dict[str, Any] = {}
+    
+    @field_validator("settings", mode="before")
+    @classmethod
+    def default_settings(cls, value):
+        return value or {}
+    
+    class Config:
+        from_attributes = True
+
+class UserIdentity(UserResponse):
+    """Cached authenticated user with the permissions of each project membership"""
+    memberships: Dict[int, Dict[str, Any]] = {}  # project_id -> ProjectUser.permissions
+
+class StatusSnapshot(BaseModel):
+    """Cached order status used by ProjectConfig"""
+    id: int
+    name: str
+    color: Optional[str] = None
+    group: str
+    position: Optional[int] = 0
+    goods_quantity_action: Optional[int] = 0
+    is_active: Optional[bool] = True
+    
+    class Config:
+        from_attributes = True
+
+class ProjectConfig(BaseModel):
+    """Cached per-project configuration shared by the API and Celery workers"""
+    project_id: int
+    version: int = 0
+    settings: Dict[str, Any] = {}
+    statuses: List[StatusSnapshot] = []  # ordered by position
+    groups: Dict[str, List[int]] = {}  # group -> status IDs, ordered by position
+    
+    @field_validator("settings", mode="before")
+    @classmethod
+    def default_settings(cls, value):
+        return value or {}
+    
+    def status(self, status_id: Optional[int]) -> Optional[StatusSnapshot]:
+        """Return project status by ID"""
+        for project_status in self.statuses:
+            if project_status.id == status_id:
+                return project_status
+        return None
+    
+    def group_of(self, status_id: Optional[int]) -> Optional[str]:
+        """Return group of project status"""
+        project_status = self.status(status_id)
+        return project_status.group if project_status else None
+    
+    def first_status_id(self, group: str) -> Optional[int]:
+        """Return first status of group by position"""
+        status_ids = self.groups.get(group)
+        return status_ids[0] if status_ids else None
+    
+    @property
+    def default_status_id(self) -> Optional[int]:
+        """Status for new orders (first processing status)"""
+        return self.first_status_id("processing")
+
 # Order Status schemas
 class OrderStatusBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
@@ -272,6 +359,92 @@ class OrderResponse(OrderBase):
     class Config:
         from_attributes = True
 
+class OrderHistoryUser(BaseModel):
+    id: int
+    email: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+class OrderHistoryEntry(BaseModel):
+    id: int
+    action: str
+    field_name: Optional[str] = None
+    old_value: Optional[str] = None
+    new_value: Optional[str] = None
+    comment: Optional[str] = None
+    created_at: Optional[datetime] = None
+    user: Optional[OrderHistoryUser] = None
+
+class OrderHistoryPage(BaseModel):
+    """Newest-first page of an order's history; pass next_cursor as cursor= for older events.
+    
+    limit and total count history records; a record of a multi-field update
+    lists one item per field, sharing its id.
+    """
+    items: List[OrderHistoryEntry]
+    total: int
+    limit: int
+    next_cursor: Optional[str] = None
+
+class OrderDetailResponse(OrderResponse):
+    """Single order with its latest history events; history_next_cursor continues at GET /orders/{id}/history"""
+    recent_history: List[OrderHistoryEntry] = []
+    history_count: int = 0  # history records, as total of OrderHistoryPage
+    history_next_cursor: Optional[str] = None
+
+class BulkOrderFilter(BaseModel):
+    status_id: Optional[int] = None
+    operator_id: Optional[int] = None
+    search: Optional[str] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+class BulkOrderRequest(BaseModel):
+    project_id: int
+    action: str = Field(..., pattern=r"^(status|assign|update|delete)$")
+    
+    # Orders to change: an ID list or the filters of the order list
+    order_ids: Optional[List[int]] = Field(None, max_length=100000)
+    filter: Optional[BulkOrderFilter] = None
+    
+    status_id: Optional[int] = None  # action=status
+    operator_id: Optional[int] = None  # action=assign
+    changes: Optional[OrderUpdate] = None  # action=update
+
+class BulkOrderResult(BaseModel):
+    job_id: Optional[str] = None
+    state: str  # pending, running, done, failed
+    total: Optional[int] = None
+    processed: int = 0
+    changed: int = 0
+    error: Optional[str] = None
+
+class OrderExportRequest(BaseModel):
+    project_id: int
+    format: str = Field("csv", pattern=r"^(csv|xlsx)$")
+    filter: Optional[BulkOrderFilter] = None
+
+class OrderExportResult(BaseModel):
+    job_id: Optional[str] = None
+    state: str  # pending, running, done, failed
+    total: Optional[int] = None  # estimated
+    processed: int = 0
+    url: Optional[str] = None
+    error: Optional[str] = None
+
+class OrderImportResult(BaseModel):
+    job_id: Optional[str] = None
+    state: str  # pending, running, done, failed
+    processed: int = 0
+    created: int = 0
+    duplicates: int = 0  # rows whose externalId already has an order
+    failed: int = 0
+    errors: List[Dict[str, Any]] = []  # {"row": line number, "error"}
+    error: Optional[str] = None
+
 # Product schemas
 class ProductBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=255)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Rebuild per-status and day/month order counters from the orders table
+"""
+import sys
+import logging
+import argparse
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append('/app')
+
+from sqlalchemy import select
+from app.core.database import SessionLocal
+from app.models.user import Project
+from app.services.order_counters import reconcile_status_counters_sync, rebuild_period_counters_sync
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+def backfill_order_counters(project_id: int = None):
+    """Recount counters project by project, one transaction each"""
+    with SessionLocal() as db:
+        if project_id:
+            project_ids = [project_id]
+        else:
+            project_ids = db.execute(select(Project.id).order_by(Project.id)).scalars().all()
+        
+        for pid in project_ids:
+            try:
+                corrected = reconcile_status_counters_sync(db, pid)
+                periods = rebuild_period_counters_sync(db, pid)
+                db.commit()
+                logger.info(f"Project {pid}: {corrected} status counters corrected, {periods} period counters written")
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Project {pid}: counter backfill failed: {str(e)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill order counters")
+    parser.add_argument("--project-id", type=int, default=None, help="Only this project")
+    args = parser.parse_args()
+    
+    backfill_order_counters(args.project_id)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark operator order search (GET /orders?search=...) on a large orders table.
+
+Run against a scratch database: --seed inserts synthetic orders into the given
+project (source "benchmark") without updating its counters.
+
+    python app/scripts/benchmark_order_search.py --project-id 1 --seed 5000000
+    python app/scripts/benchmark_order_search.py --project-id 1 --baseline
+"""
+import sys
+import time
+import logging
+import argparse
+import statistics
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append('/app')
+
+from sqlalchemy import select, and_, or_, desc, text
+from app.core.database import SessionLocal
+from app.models.order import Order
+from app.services.order_ingest import get_default_status_id_sync
+from app.services.order_search import order_search_condition, order_search_rank
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+SEED_BATCH = 100000
+
+# Three phone formats of the same 10-digit number, as typed by customers
+SEED_SQL = text("""
+    INSERT INTO orders (
+        project_id, status_id, source, country, custom_fields, external_id_unique,
+        customer_name, customer_phone, customer_email, total_amount,
+        tracking_number, external_id, created_at
+    )
+    SELECT
+        :project_id, :status_id, 'benchmark', 'Россия', '{}', false,
+        (ARRAY['Иван', 'Пётр', 'Анна', 'Мария', 'Сергей'])[1 + i % 5] || ' ' ||
+            (ARRAY['Иванов', 'Петров', 'Смирнова', 'Кузнецова', 'Попов'])[1 + (i / 5) % 5] || ' ' || i,
+        CASE i % 3
+            WHEN 0 THEN '+7' || d
+            WHEN 1 THEN '8' || d
+            ELSE '+7 (' || substr(d, 1, 3) || ') ' || substr(d, 4, 3) || '-' || substr(d, 7, 2) || '-' || substr(d, 9, 2)
+        END,
+        'customer' || i || '@example.com',
+        i % 5000,
+        'TRK' || i,
+        'EXT' || i,
+        now() - (i % 365) * interval '1 day'
+    FROM generate_series(:start, :stop) AS i,
+        LATERAL (SELECT '9' || lpad((i * 7919 % 1000000000)::text, 9, '0') AS d) AS phone
+""")
+
+# Typical operator searches; the phone ones are typed differently from how they are stored
+SEARCHES = {
+    "name": "Смирнова 12345",
+    "email": "customer777777@",
+    "phone_full": "8 (900) 123-45-67",
+    "phone_partial": "123-45",
+    "tracking": "TRK4000000",
+    "external_id": "EXT2500000",
+}
+
+def seed(project_id: int, rows: int):
+    """Insert rows synthetic orders in SEED_BATCH transactions, then ANALYZE"""
+    with SessionLocal() as db:
+        status_id = get_default_status_id_sync(db, project_id)
+        start = (db.execute(select(Order.id).order_by(desc(Order.id)).limit(1)).scalar() or 0) + 1
+        
+        for offset in range(0, rows, SEED_BATCH):
+            stop = min(offset + SEED_BATCH, rows)
+            db.execute(SEED_SQL, {
+                "project_id": project_id,
+                "status_id": status_id,
+                "start": start + offset,
+                "stop": start + stop - 1
+            })
+            db.commit()
+            logger.info(f"Seeded {stop} of {rows} orders")
+        
+        db.execute(text("ANALYZE orders"))
+        db.commit()
+
+def _baseline_condition(term: str):
+    # GET /orders search before the trigram indexes
+    return or_(
+        Order.customer_name.ilike(f"%{term}%"),
+        Order.customer_phone.ilike(f"%{term}%"),
+        Order.customer_email.ilike(f"%{term}%"),
+        Order.id == int(term) if term.isdigit() else False
+    )
+
+def _search_stmt(project_id: int, term: str, baseline: bool):
+    if baseline:
+        return (
+            select(Order.id)
+            .where(and_(Order.project_id == project_id, _baseline_condition(term)))
+            .order_by(desc(Order.created_at))
+            .limit(50)
+        )
+    return (
+        select(Order.id)
+        .where(and_(Order.project_id == project_id, order_search_condition(term)))
+        .order_by(desc(order_search_rank(term)), desc(Order.id))
+        .limit(50)
+    )
+
+def benchmark(project_id: int, runs: int, baseline: bool):
+    """Run each search runs times and log median/p95 latency and the plan"""
+    with SessionLocal() as db:
+        total = db.execute(text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'orders'")).scalar()
+        logger.info(f"orders: ~{total} rows; {'baseline ILIKE' if baseline else 'indexed'} search, {runs} runs each")
+        
+        for label, term in SEARCHES.items():
+            stmt = _search_stmt(project_id, term, baseline)
+            timings = []
+            found = 0
+            for _ in range(runs):
+                started = time.perf_counter()
+                found = len(db.execute(stmt).all())
+                timings.append((time.perf_counter() - started) * 1000)
+            
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            logger.info(
+                f"{label:<14} {term!r:<24} rows={found:<3} "
+                f"median={statistics.median(timings):.1f}ms p95={p95:.1f}ms"
+            )
+            
+            compiled = stmt.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+            plan = db.connection().exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {compiled}").scalars().all()
+            for line in plan:
+                logger.debug(line)
+            logger.info(f"{'':<14} plan: {plan[0].strip()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark order search")
+    parser.add_argument("--project-id", type=int, required=True, help="Project to search (and seed)")
+    parser.add_argument("--seed", type=int, default=0, help="Insert this many synthetic orders first")
+    parser.add_argument("--runs", type=int, default=20, help="Executions per search")
+    parser.add_argument("--baseline", action="store_true", help="Measure the previous ILIKE search")
+    args = parser.parse_args()
+    
+    if args.seed:
+        seed(args.project_id, args.seed)
+    benchmark(args.project_id, args.runs, args.baseline)
@@ -15,6 +15,8 @@ from app.core.security import get_password_hash, generate_api_key
 from app.models.user import User, Project, ProjectUser, OrderStatus, UserRole, UserStatus
 from app.models.order import Order, Product, OrderItem, OrderHistory
 from app.models.cpa import SMSTemplate
+from app.services.order_counters import StatusChange, apply_status_changes
+from app.utils.phone import normalize_phone
 
 async def create_initial_data():
     """Create initial data for the application"""
@@ -182,6 +184,7 @@ async def create_initial_data():
                 {"name": "Дмитрий Волков", "phone": "+79991234571", "email": "dmitry@example.com"},
             ]
             
+            status_changes = []
             for i, customer in enumerate(customers):
                 # Random order parameters
                 import random
@@ -197,6 +200,7 @@ async def create_initial_data():
                     project_id=demo_project.id,
                     customer_name=customer["name"],
                     customer_phone=customer["phone"],
+                    phone_norm=normalize_phone(customer["phone"]),
                     customer_email=customer["email"],
                     country="Россия",
                     city=["Москва", "Санкт-Петербург", "Новосибирск", "Екатеринбург", "Казань"][i],
@@ -231,6 +235,10 @@ async def create_initial_data():
                     comment="Заказ создан автоматически при инициализации системы"
                 )
                 db.add(history)
+                
+                status_changes.append(StatusChange(demo_project.id, order.id, None, order.status_id))
+            
+            await apply_status_changes(db, status_changes)
             
             # Create SMS templates
             sms_templates = [
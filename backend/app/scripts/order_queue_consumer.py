@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Consumer that drains the addOrder.html ingestion queue into the database
+"""
+import sys
+import os
+import socket
+import logging
+import argparse
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append('/app')
+
+from app.services.order_queue import run_consumer
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LeadVertex order queue consumer")
+    parser.add_argument(
+        "--name",
+        default=f"{socket.gethostname()}-{os.getpid()}",
+        help="Consumer name; reuse it after a restart to replay its pending entries"
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Exit when the queue is empty"
+    )
+    args = parser.parse_args()
+    
+    run_consumer(args.name, once=args.once)
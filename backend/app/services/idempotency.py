@@ -0,0 +1,69 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.cache import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Responses of requests sent with an Idempotency-Key header, per project and endpoint
+IDEMPOTENCY_KEY = "idempotency:{scope}:{project_id}:{key}"
+PENDING = "pending"
+
+# Upper bound for the header value
+MAX_KEY_LENGTH = 255
+
+def _redis_key(scope: str, project_id: int, key: str) -> str:
+    return IDEMPOTENCY_KEY.format(scope=scope, project_id=project_id, key=key)
+
+async def claim_idempotency_key(scope: str, project_id: int, key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """Reserve key for this request.
+    
+    Returns (True, None) when the caller should process the request,
+    (False, response) for a completed duplicate and (False, None) when the
+    original request is still running after IDEMPOTENCY_WAIT seconds.
+    The claim expires after IDEMPOTENCY_PENDING_TTL, so a request killed
+    before it could release the key doesn't block retries for long.
+    """
+    redis_key = _redis_key(scope, project_id, key)
+    try:
+        if await redis_client.set(redis_key, PENDING, nx=True, ex=settings.IDEMPOTENCY_PENDING_TTL):
+            return True, None
+        
+        # A concurrent duplicate: wait for the original to finish instead of racing it
+        deadline = asyncio.get_running_loop().time() + settings.IDEMPOTENCY_WAIT
+        while True:
+            value = await redis_client.get(redis_key)
+            if value is None:
+                # Original failed and released the key; take it over
+                if await redis_client.set(redis_key, PENDING, nx=True, ex=settings.IDEMPOTENCY_PENDING_TTL):
+                    return True, None
+            elif value != PENDING:
+                return False, json.loads(value)
+            
+            if asyncio.get_running_loop().time() >= deadline:
+                return False, None
+            await asyncio.sleep(0.05)
+    except Exception as e:
+        # Without Redis the request is processed normally
+        logger.warning(f"Idempotency key lookup failed: {str(e)}")
+        return True, None
+
+async def store_idempotency_result(scope: str, project_id: int, key: str, response: Dict[str, Any]):
+    """Remember the response for retries with the same key"""
+    try:
+        await redis_client.set(
+            _redis_key(scope, project_id, key),
+            json.dumps(response, default=str),
+            ex=settings.IDEMPOTENCY_KEY_TTL
+        )
+    except Exception as e:
+        logger.warning(f"Failed to store idempotency result: {str(e)}")
+
+async def release_idempotency_key(scope: str, project_id: int, key: str):
+    """Free key after a failed request so a retry is processed again"""
+    try:
+        await redis_client.delete(_redis_key(scope, project_id, key))
+    except Exception as e:
+        logger.warning(f"Failed to release idempotency key: {str(e)}")
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.cache import TTLCache, redis_client
+
+logger = logging.getLogger(__name__)
+
+# count_mode of list endpoints
+COUNT_EXACT = "exact"
+COUNT_ESTIMATED = "estimated"
+COUNT_NONE = "none"
+COUNT_MODE_PATTERN = r"^(exact|estimated|none)$"
+
+LIST_COUNT_CACHE_NAME = "list_counts"
+COUNT_KEY = "list_count:{scope}:{digest}"
+
+list_count_cache = TTLCache(
+    LIST_COUNT_CACHE_NAME,
+    maxsize=10000,
+    ttl=settings.LIST_COUNT_CACHE_TTL
+)
+
+def _filters_key(scope: str, filters: Dict[str, Any]) -> str:
+    # Unset filters are dropped and the rest sorted, so equal filter sets share a key
+    normalized = json.dumps(
+        {name: value for name, value in sorted(filters.items()) if value is not None},
+        default=str,
+        separators=(",", ":")
+    )
+    return COUNT_KEY.format(scope=scope, digest=hashlib.sha1(normalized.encode()).hexdigest())
+
+async def exact_count(db: AsyncSession, stmt, scope: str, filters: Dict[str, Any]) -> int:
+    """count(*) of the rows of stmt, cached for LIST_COUNT_CACHE_TTL seconds per filter set"""
+    key = _filters_key(scope, filters)
+    total = list_count_cache.get(key)
+    if total is not None:
+        return total
+    
+    try:
+        cached = await redis_client.get(key)
+        if cached is not None:
+            list_count_cache.incr("redis_hits")
+            list_count_cache.set(key, int(cached))
+            return int(cached)
+    except Exception as e:
+        logger.warning(f"List count cache read failed: {str(e)}")
+    
+    list_count_cache.incr("db_counts")
+    result = await db.execute(select(func.count()).select_from(stmt.order_by(None).subquery()))
+    total = result.scalar()
+    
+    try:
+        await redis_client.set(key, total, ex=settings.LIST_COUNT_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"List count cache write failed: {str(e)}")
+    list_count_cache.set(key, total)
+    return total
+
+async def estimated_count(db: AsyncSession, stmt) -> int:
+    """Planner row estimate of stmt (EXPLAIN, no execution)"""
+    # EXPLAIN can't take bind parameters; values are rendered as escaped literals
+    connection = await db.connection()
+    compiled = stmt.order_by(None).compile(
+        dialect=connection.dialect,
+        compile_kwargs={"literal_binds": True}
+    )
+    result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+async def count_rows(
+    db: AsyncSession,
+    stmt,
+    count_mode: str,
+    scope: str,
+    filters: Dict[str, Any]
+) -> Tuple[Optional[int], bool]:
+    """Return (total, is_estimate) of the rows of stmt for count_mode"""
+    if count_mode == COUNT_NONE:
+        return None, False
+    if count_mode == COUNT_ESTIMATED:
+        return await estimated_count(db, stmt), True
+    return await exact_count(db, stmt, scope, filters), False
@@ -0,0 +1,89 @@
+from sqlalchemy import select, union_all, true, false, and_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Tuple
+from app.models.order import Order, OrderChangeSeq, OrderDeletion
+
+def _lock_stmt(project_ids: Iterable[int]):
+    # Sorted so transactions touching several projects lock them in the same order
+    rows = [{"project_id": project_id, "last_seq": 0} for project_id in sorted(set(project_ids))]
+    if not rows:
+        return None
+    
+    stmt = insert(OrderChangeSeq).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[OrderChangeSeq.project_id],
+        set_={"last_seq": OrderChangeSeq.last_seq}
+    )
+
+async def lock_change_seqs(db: AsyncSession, project_ids: Iterable[int]):
+    """Lock the change sequence rows of projects until commit.
+    
+    The orders trigger takes the same lock on the first write; taking it up
+    front keeps the lock order (sequence, then counters) the same for every
+    writer.
+    """
+    stmt = _lock_stmt(project_ids)
+    if stmt is not None:
+        await db.execute(stmt)
+
+def lock_change_seqs_sync(db: Session, project_ids: Iterable[int]):
+    """Sync variant of lock_change_seqs for Celery tasks"""
+    stmt = _lock_stmt(project_ids)
+    if stmt is not None:
+        db.execute(stmt)
+
+async def get_order_changes(
+    db: AsyncSession,
+    project_id: int,
+    after_seq: int,
+    limit: int
+) -> Tuple[List[Tuple[int, int, bool]], Dict[int, Order], bool]:
+    """Return changes of project with change_seq > after_seq, oldest first.
+    
+    Changes are (seq, order_id, deleted) tuples, read in one statement so
+    updates and deletions come from the same snapshot. Orders are loaded
+    separately and may already be newer than their change (or gone); the
+    flag tells whether more changes follow.
+    """
+    changed = union_all(
+        select(
+            Order.change_seq.label("seq"),
+            Order.id.label("order_id"),
+            false().label("deleted")
+        ).where(and_(Order.project_id == project_id, Order.change_seq > after_seq)),
+        select(
+            OrderDeletion.change_seq.label("seq"),
+            OrderDeletion.order_id.label("order_id"),
+            true().label("deleted")
+        ).where(and_(OrderDeletion.project_id == project_id, OrderDeletion.change_seq > after_seq))
+    ).subquery()
+    
+    stmt = select(changed.c.seq, changed.c.order_id, changed.c.deleted).order_by(changed.c.seq).limit(limit + 1)
+    result = await db.execute(stmt)
+    changes = [tuple(row) for row in result.all()]
+    
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    
+    orders: Dict[int, Order] = {}
+    order_ids = [order_id for _, order_id, deleted in changes if not deleted]
+    if order_ids:
+        result = await db.execute(
+            select(Order).where(and_(Order.project_id == project_id, Order.id.in_(order_ids)))
+        )
+        orders = {order.id: order for order in result.scalars().all()}
+    
+    return changes, orders, has_more
+
+async def get_last_change_seq(db: AsyncSession, project_id: int) -> int:
+    """Last committed change sequence number of project (0 before its first change).
+    
+    A plain read sees the committed value: numbers handed out to transactions
+    still holding the row lock are not visible yet.
+    """
+    result = await db.execute(
+        select(OrderChangeSeq.last_seq).where(OrderChangeSeq.project_id == project_id)
+    )
+    return result.scalar() or 0
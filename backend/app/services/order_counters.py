@@ -0,0 +1,273 @@
+from sqlalchemy import select, delete, insert as sa_insert, union_all, literal, case, cast, func, or_, and_, Date, Integer
+from sqlalchemy.dialects.postgresql import insert, ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from datetime import datetime
+from app.core.config import settings
+from app.models.user import Project, OrderStatus
+from app.models.order import Order, OrderStatusCounter, OrderPeriodCounter
+from app.services.order_changes import lock_change_seqs, lock_change_seqs_sync
+from app.utils.timezone import get_project_timezone
+import pytz
+
+# (project_id, status_id) -> change in number of orders
+StatusDeltas = Dict[Tuple[int, int], int]
+
+# Day and month buckets of order_period_counters
+PERIODS = ("day", "month")
+
+class StatusChange(NamedTuple):
+    """An order entering (old None), leaving (new None) or moving between statuses"""
+    project_id: int
+    order_id: int
+    old_status_id: Optional[int]
+    new_status_id: Optional[int]
+
+def count_status_change(
+    deltas: StatusDeltas,
+    project_id: int,
+    old_status_id: Optional[int],
+    new_status_id: Optional[int]
+) -> StatusDeltas:
+    """Add one order moving between statuses (None for create/delete) to deltas"""
+    if old_status_id == new_status_id:
+        return deltas
+    if old_status_id is not None:
+        deltas[(project_id, old_status_id)] = deltas.get((project_id, old_status_id), 0) - 1
+    if new_status_id is not None:
+        deltas[(project_id, new_status_id)] = deltas.get((project_id, new_status_id), 0) + 1
+    return deltas
+
+def _deltas_stmt(deltas: StatusDeltas):
+    # Sorted keys keep the row lock order stable across concurrent writers
+    rows = [
+        {"project_id": project_id, "status_id": status_id, "orders_count": delta}
+        for (project_id, status_id), delta in sorted(deltas.items())
+        if delta
+    ]
+    if not rows:
+        return None
+    
+    stmt = insert(OrderStatusCounter).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[OrderStatusCounter.project_id, OrderStatusCounter.status_id],
+        set_={
+            "orders_count": OrderStatusCounter.orders_count + stmt.excluded.orders_count,
+            "updated_at": func.now()
+        }
+    )
+
+async def apply_status_deltas(db: AsyncSession, deltas: StatusDeltas):
+    """Apply counter deltas in the caller's transaction (no commit)"""
+    stmt = _deltas_stmt(deltas)
+    if stmt is not None:
+        await db.execute(stmt)
+
+def apply_status_deltas_sync(db: Session, deltas: StatusDeltas):
+    """Sync variant of apply_status_deltas for Celery tasks"""
+    stmt = _deltas_stmt(deltas)
+    if stmt is not None:
+        db.execute(stmt)
+
+def _int_array(values: List[Optional[int]]):
+    return cast(literal(values, ARRAY(Integer)), ARRAY(Integer))
+
+def _local_period_start(period: str):
+    # created_at in the project's timezone, truncated to the bucket start
+    project_timezone = func.coalesce(
+        Project.settings["timezone"].as_string(),
+        settings.DEFAULT_PROJECT_TIMEZONE
+    )
+    return cast(func.date_trunc(period, func.timezone(project_timezone, Order.created_at)), Date)
+
+def _is_accepted(order_status):
+    return case((order_status.group == "accepted", 1), else_=0)
+
+def _period_deltas_stmt(changes: List[StatusChange]):
+    """INSERT ... SELECT that adds created/accepted deltas to each order's day and month"""
+    changes = [change for change in changes if change.old_status_id != change.new_status_id]
+    if not changes:
+        return None
+    
+    changed = func.unnest(
+        _int_array([change.order_id for change in changes]),
+        _int_array([change.old_status_id for change in changes]),
+        _int_array([change.new_status_id for change in changes])
+    ).table_valued("order_id", "old_status_id", "new_status_id").alias("changed")
+    old_status = aliased(OrderStatus)
+    new_status = aliased(OrderStatus)
+    
+    created_delta = func.sum(
+        case((changed.c.new_status_id.isnot(None), 1), else_=0)
+        - case((changed.c.old_status_id.isnot(None), 1), else_=0)
+    )
+    accepted_delta = func.sum(_is_accepted(new_status) - _is_accepted(old_status))
+    
+    selects = []
+    for period in PERIODS:
+        period_start = _local_period_start(period)
+        selects.append(
+            select(
+                Order.project_id,
+                literal(period).label("period"),
+                period_start.label("period_start"),
+                created_delta.label("created_count"),
+                accepted_delta.label("accepted_count")
+            )
+            .select_from(changed)
+            .join(Order, Order.id == changed.c.order_id)
+            .join(Project, Project.id == Order.project_id)
+            .outerjoin(old_status, old_status.id == changed.c.old_status_id)
+            .outerjoin(new_status, new_status.id == changed.c.new_status_id)
+            # Group by output name: the bucket expression carries bind parameters
+            .group_by(Order.project_id, "period_start")
+            .having(or_(created_delta != 0, accepted_delta != 0))
+        )
+    
+    stmt = insert(OrderPeriodCounter).from_select(
+        ["project_id", "period", "period_start", "created_count", "accepted_count"],
+        union_all(*selects)
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[OrderPeriodCounter.project_id, OrderPeriodCounter.period, OrderPeriodCounter.period_start],
+        set_={
+            "created_count": OrderPeriodCounter.created_count + stmt.excluded.created_count,
+            "accepted_count": OrderPeriodCounter.accepted_count + stmt.excluded.accepted_count,
+            "updated_at": func.now()
+        }
+    )
+
+def _status_deltas(changes: Iterable[StatusChange]) -> StatusDeltas:
+    deltas: StatusDeltas = {}
+    for change in changes:
+        count_status_change(deltas, change.project_id, change.old_status_id, change.new_status_id)
+    return deltas
+
+async def apply_status_changes(db: AsyncSession, changes: List[StatusChange]):
+    """Update per-status and day/month counters in the caller's transaction (no commit).
+    
+    The orders rows must exist when this runs: call after INSERT, before DELETE.
+    The projects' change sequence rows are locked before the counter rows,
+    in the order the orders trigger takes them.
+    """
+    await lock_change_seqs(db, [change.project_id for change in changes])
+    await apply_status_deltas(db, _status_deltas(changes))
+    stmt = _period_deltas_stmt(changes)
+    if stmt is not None:
+        await db.execute(stmt)
+
+def apply_status_changes_sync(db: Session, changes: List[StatusChange]):
+    """Sync variant of apply_status_changes for Celery tasks"""
+    lock_change_seqs_sync(db, [change.project_id for change in changes])
+    apply_status_deltas_sync(db, _status_deltas(changes))
+    stmt = _period_deltas_stmt(changes)
+    if stmt is not None:
+        db.execute(stmt)
+
+def _locked_status_stmt(order_id: int):
+    return select(Order.status_id).where(Order.id == order_id).with_for_update()
+
+async def lock_order_status(db: AsyncSession, order_id: int) -> Optional[int]:
+    """Lock the order row and return its current status_id.
+    
+    Call before changing status_id so the counter delta uses the committed
+    status rather than one read earlier in the request.
+    """
+    result = await db.execute(_locked_status_stmt(order_id))
+    return result.scalar_one_or_none()
+
+def lock_order_status_sync(db: Session, order_id: int) -> Optional[int]:
+    """Sync variant of lock_order_status for Celery tasks"""
+    return db.execute(_locked_status_stmt(order_id)).scalar_one_or_none()
+
+async def get_period_counts(db: AsyncSession, project_id: int, project_settings: Optional[dict]) -> Dict[str, Dict[str, int]]:
+    """Return today's and this month's {"created", "accepted"} counts in the project's timezone"""
+    today = datetime.now(pytz.timezone(get_project_timezone(project_settings))).date()
+    buckets = {"day": today, "month": today.replace(day=1)}
+    
+    stmt = select(OrderPeriodCounter).where(and_(
+        OrderPeriodCounter.project_id == project_id,
+        or_(*[
+            and_(OrderPeriodCounter.period == period, OrderPeriodCounter.period_start == start)
+            for period, start in buckets.items()
+        ])
+    ))
+    result = await db.execute(stmt)
+    
+    counts = {period: {"created": 0, "accepted": 0} for period in buckets}
+    for counter in result.scalars().all():
+        counts[counter.period] = {"created": counter.created_count, "accepted": counter.accepted_count}
+    return counts
+
+async def get_status_counts(db: AsyncSession, project_id: int) -> Dict[int, int]:
+    """Return {status_id: orders_count} for project"""
+    stmt = select(OrderStatusCounter.status_id, OrderStatusCounter.orders_count).where(
+        OrderStatusCounter.project_id == project_id
+    )
+    result = await db.execute(stmt)
+    return {status_id: orders_count for status_id, orders_count in result.all()}
+
+def reconcile_status_counters_sync(db: Session, project_id: int) -> int:
+    """Recount project orders per status and repair drifted counters.
+    
+    Counter rows are locked first, so writers that already touched them commit
+    before the recount and writers that come later wait for this transaction.
+    Returns the number of corrected counters; the caller commits.
+    """
+    stmt = (
+        select(OrderStatusCounter)
+        .where(OrderStatusCounter.project_id == project_id)
+        .with_for_update()
+    )
+    stored = {
+        counter.status_id: counter.orders_count
+        for counter in db.execute(stmt).scalars().all()
+    }
+    
+    stmt = (
+        select(Order.status_id, func.count(Order.id))
+        .where(Order.project_id == project_id)
+        .group_by(Order.status_id)
+    )
+    actual = dict(db.execute(stmt).all())
+    
+    drift: StatusDeltas = {}
+    for status_id in set(stored) | set(actual):
+        delta = actual.get(status_id, 0) - stored.get(status_id, 0)
+        if delta:
+            drift[(project_id, status_id)] = delta
+    
+    apply_status_deltas_sync(db, drift)
+    return len(drift)
+
+def rebuild_period_counters_sync(db: Session, project_id: int) -> int:
+    """Recompute all day/month counters of project from orders.
+    
+    Used for backfill and after changing the project timezone. Returns the
+    number of counter rows written; the caller commits.
+    """
+    db.execute(delete(OrderPeriodCounter).where(OrderPeriodCounter.project_id == project_id))
+    
+    selects = []
+    for period in PERIODS:
+        period_start = _local_period_start(period)
+        selects.append(
+            select(
+                Order.project_id,
+                literal(period).label("period"),
+                period_start.label("period_start"),
+                func.count(Order.id).label("created_count"),
+                func.sum(_is_accepted(OrderStatus)).label("accepted_count")
+            )
+            .join(Project, Project.id == Order.project_id)
+            .join(OrderStatus, OrderStatus.id == Order.status_id)
+            .where(Order.project_id == project_id)
+            .group_by(Order.project_id, "period_start")
+        )
+    
+    stmt = sa_insert(OrderPeriodCounter).from_select(
+        ["project_id", "period", "period_start", "created_count", "accepted_count"],
+        union_all(*selects)
+    )
+    return db.execute(stmt).rowcount
@@ -0,0 +1,259 @@
+import csv
+import io
+import logging
+import os
+import secrets
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, List, Optional
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from sqlalchemy import select, func, and_, cast, Text
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import async_read_session
+from app.models.user import User
+from app.models.order import Order, OrderItem
+from app.schemas.main import BulkOrderFilter, OrderExportRequest, ProjectConfig
+from app.services.list_counts import estimated_count
+from app.services.order_search import order_filter_conditions
+from app.services.project_config import get_project_config, get_project_config_sync
+
+logger = logging.getLogger(__name__)
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Exports too large for the request are written here (served under /uploads)
+EXPORT_DIR = "exports"
+
+# Text starting with these is run as a formula by spreadsheet apps; customer
+# input (addOrder.html, landing forms) must not be able to plant one
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# (header, order column) of the exported columns, in file order
+EXPORT_COLUMNS = (
+    ("ID", Order.id),
+    ("Created", Order.created_at),
+    ("Status", Order.status_id),
+    ("Customer", Order.customer_name),
+    ("Phone", Order.customer_phone),
+    ("Email", Order.customer_email),
+    ("Country", Order.country),
+    ("Region", Order.region),
+    ("City", Order.city),
+    ("Address", Order.address),
+    ("Postal code", Order.postal_code),
+    ("Total", Order.total_amount),
+    ("Comment", Order.comment),
+    ("Source", Order.source),
+    ("UTM source", Order.utm_source),
+    ("UTM medium", Order.utm_medium),
+    ("UTM campaign", Order.utm_campaign),
+    ("External ID", Order.external_id),
+    ("Shipping service", Order.shipping_service),
+    ("Tracking number", Order.tracking_number),
+    ("Payment status", Order.payment_status),
+)
+EXPORT_HEADERS = [header for header, _ in EXPORT_COLUMNS] + ["Items", "Operator"]
+STATUS_INDEX = [header for header, _ in EXPORT_COLUMNS].index("Status")
+
+def export_conditions(request: OrderExportRequest) -> List:
+    """WHERE conditions selecting the orders of an export"""
+    order_filter = request.filter or BulkOrderFilter()
+    return order_filter_conditions(
+        request.project_id,
+        order_filter.status_id,
+        order_filter.operator_id,
+        order_filter.search.strip() if order_filter.search else None,
+        order_filter.date_from,
+        order_filter.date_to
+    )
+
+def export_stmt(request: OrderExportRequest):
+    """One streamed statement for the whole export, items and operator included.
+    
+    yield_per makes the driver fetch through a server-side cursor, so rows are
+    read ORDER_EXPORT_CHUNK_SIZE at a time whatever the size of the project.
+    """
+    items = (
+        select(func.string_agg(
+            OrderItem.product_name + " x" + cast(OrderItem.quantity, Text),
+            aggregate_order_by("; ", OrderItem.id)
+        ))
+        .where(OrderItem.order_id == Order.id)
+        .scalar_subquery()
+    )
+    operator = func.coalesce(
+        func.nullif(func.concat_ws(" ", User.first_name, User.last_name), ""),
+        User.email
+    )
+    return (
+        select(*[column for _, column in EXPORT_COLUMNS], items, operator)
+        .select_from(Order)
+        .outerjoin(User, User.id == Order.operator_id)
+        .where(and_(*export_conditions(request)))
+        .order_by(Order.id)
+        .execution_options(yield_per=settings.ORDER_EXPORT_CHUNK_SIZE)
+    )
+
+def _cell(value: Any) -> Any:
+    # Spreadsheets have no time zones: timestamps are written in UTC
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def is_formula_text(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(FORMULA_PREFIXES)
+
+class OrderExportWriter:
+    """Writes export rows as CSV or XLSX with a constant memory ceiling.
+    
+    CSV rows come back from write() as encoded chunks, to stream or append to
+    a file. XLSX rows go to an openpyxl write-only worksheet, which spools them
+    to a temporary file until finish() zips the workbook into the output.
+    """
+    
+    def __init__(self, export_format: str, config: ProjectConfig):
+        self.format = export_format
+        self.statuses = {project_status.id: project_status.name for project_status in config.statuses}
+        if export_format == "xlsx":
+            self.workbook = Workbook(write_only=True)
+            self.sheet = self.workbook.create_sheet("Orders")
+        else:
+            self.buffer = io.StringIO()
+            self.writer = csv.writer(self.buffer)
+    
+    def _csv(self, rows) -> bytes:
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.writer.writerows(rows)
+        return self.buffer.getvalue().encode("utf-8")
+    
+    def _escape(self, value: Any) -> Any:
+        if not is_formula_text(value):
+            return value
+        if self.format == "xlsx":
+            # An explicit string cell shows the text as is instead of evaluating it
+            cell = WriteOnlyCell(self.sheet, value)
+            cell.data_type = "s"
+            return cell
+        # CSV has no cell types; the quote prefix makes Excel read the cell as text
+        return "'" + value
+    
+    def start(self) -> bytes:
+        """Header row"""
+        if self.format == "xlsx":
+            self.sheet.append(EXPORT_HEADERS)
+            return b""
+        # BOM so Excel opens the UTF-8 file with the right encoding
+        return b"\xef\xbb\xbf" + self._csv([EXPORT_HEADERS])
+    
+    def write(self, rows: List) -> bytes:
+        """Append result rows of export_stmt"""
+        values = []
+        for row in rows:
+            row = [_cell(value) for value in row]
+            row[STATUS_INDEX] = self.statuses.get(row[STATUS_INDEX], row[STATUS_INDEX])
+            values.append([self._escape(value) for value in row])
+        
+        if self.format == "xlsx":
+            for row in values:
+                self.sheet.append(row)
+            return b""
+        return self._csv(values)
+    
+    def finish(self, file: BinaryIO):
+        """Write the XLSX workbook to file (CSV was already written)"""
+        if self.format == "xlsx":
+            self.workbook.save(file)
+
+def export_filename(request: OrderExportRequest, suffix: str = "") -> str:
+    return f"orders-{request.project_id}-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}{suffix}.{request.format}"
+
+async def estimate_export_rows(db: AsyncSession, request: OrderExportRequest) -> int:
+    """Planner estimate of the exported orders, to pick inline or background export"""
+    return await estimated_count(db, select(Order.id).where(and_(*export_conditions(request))))
+
+async def stream_order_export(request: OrderExportRequest) -> AsyncIterator[bytes]:
+    """Chunks of the export file, read through a server-side cursor in its own (replica) session"""
+    async with await async_read_session() as db:
+        writer = OrderExportWriter(request.format, await get_project_config(db, request.project_id))
+        yield writer.start()
+        
+        result = await db.stream(export_stmt(request))
+        async for rows in result.partitions():
+            chunk = writer.write(rows)
+            if chunk:
+                yield chunk
+    
+    if request.format == "xlsx":
+        # The zip directory comes last, so the workbook is assembled on disk first
+        with tempfile.TemporaryFile() as file:
+            await run_in_threadpool(writer.finish, file)
+            file.seek(0)
+            while chunk := file.read(64 * 1024):
+                yield chunk
+
+def export_orders_to_file(
+    db: Session,
+    request: OrderExportRequest,
+    report: Optional[Callable[[int], None]] = None
+) -> Dict[str, Any]:
+    """Write an export to uploads/exports; returns {"url", "rows"}.
+    
+    The file name carries a random token since /uploads is served without
+    authentication.
+    """
+    export_dir = os.path.join(settings.UPLOAD_DIR, EXPORT_DIR)
+    os.makedirs(export_dir, exist_ok=True)
+    name = export_filename(request, f"-{secrets.token_urlsafe(16)}")
+    path = os.path.join(export_dir, name)
+    
+    writer = OrderExportWriter(request.format, get_project_config_sync(db, request.project_id))
+    rows_written = 0
+    try:
+        # Written under a temporary name and renamed, so the URL never serves a partial file
+        with open(f"{path}.part", "wb") as file:
+            file.write(writer.start())
+            result = db.execute(export_stmt(request))
+            for rows in result.partitions():
+                file.write(writer.write(rows))
+                rows_written += len(rows)
+                if report:
+                    report(rows_written)
+            writer.finish(file)
+        os.replace(f"{path}.part", path)
+    except Exception:
+        if os.path.exists(f"{path}.part"):
+            os.remove(f"{path}.part")
+        raise
+    
+    return {"url": f"/uploads/{EXPORT_DIR}/{name}", "rows": rows_written}
+
+def cleanup_export_files(max_age_hours: int) -> int:
+    """Delete export files (and leftover .part files) older than max_age_hours; returns the number removed.
+    
+    Exports hold customer data under the unauthenticated /uploads path, so
+    they are kept only long enough to be downloaded.
+    """
+    export_dir = os.path.join(settings.UPLOAD_DIR, EXPORT_DIR)
+    if not os.path.isdir(export_dir):
+        return 0
+    
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    for entry in os.scandir(export_dir):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError as e:
+            logger.warning(f"Failed to delete export file {entry.path}: {str(e)}")
+    return removed
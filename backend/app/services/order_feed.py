@@ -0,0 +1,221 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+import asyncpg
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services.order_changes import get_order_changes, get_last_change_seq
+from app.services.order_fields import parse_fieldset, order_event_adapter, load_relations
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY channel of the orders_change_seq trigger; the payload is the project ID,
+# so a transaction touching many orders of a project sends one notification
+ORDER_FEED_CHANNEL = "order_changes"
+
+# Changes read per query
+FEED_PAGE_SIZE = 500
+
+# Seconds the hub waits after a notification so bursts become one read
+FEED_BATCH_DELAY = 0.1
+
+# Event names: "order" per change, "reset" when a resume is too far behind,
+# "keepalive" when nothing happened for ORDER_FEED_KEEPALIVE seconds
+FEED_ORDER = "order"
+FEED_RESET = "reset"
+FEED_KEEPALIVE = "keepalive"
+
+# Orders in events carry the default fields of GET /orders items
+FEED_FIELDSET, FEED_RELATIONS = parse_fieldset(None, None)
+
+# (seq, event name, JSON data)
+FeedEvent = Tuple[int, str, str]
+
+async def read_feed_events(project_id: int, after_seq: int, limit: int) -> Tuple[List[FeedEvent], int, bool]:
+    """Events of the changes after after_seq; returns (events, last seq read, has_more)"""
+    async with AsyncSessionLocal() as db:
+        changes, orders, has_more = await get_order_changes(db, project_id, after_seq, limit)
+        rows = {
+            order_id: {name: getattr(order, name) for name in FEED_FIELDSET}
+            for order_id, order in orders.items()
+        }
+        await load_relations(db, project_id, list(rows.values()), FEED_RELATIONS)
+    
+    adapter = order_event_adapter(FEED_FIELDSET, FEED_RELATIONS)
+    events = []
+    for seq, order_id, deleted in changes:
+        order = rows.get(order_id)
+        if not deleted and order is None:
+            # Deleted since; its tombstone follows later in the feed
+            continue
+        event = {"seq": seq, "id": order_id, "deleted": deleted, "order": None if deleted else order}
+        events.append((seq, FEED_ORDER, adapter.dump_json(event).decode()))
+    
+    last_seq = changes[-1][0] if changes else after_seq
+    return events, last_seq, has_more
+
+class FeedSubscription:
+    """Live events of one project for one connected client"""
+    
+    def __init__(self, project_id: int):
+        self.project_id = project_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.ORDER_FEED_QUEUE_SIZE)
+        self.overflowed = False
+    
+    def push(self, events: List[FeedEvent]):
+        for event in events:
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow client: it re-reads the feed from its last event instead
+                self.overflowed = True
+                return
+
+class OrderFeedHub:
+    """Fans committed order changes out to the clients connected to this worker.
+    
+    One LISTEN connection wakes the hub; changes are read once per project and
+    tick, whatever the number of clients, and pushed to every subscription.
+    """
+    
+    def __init__(self):
+        self.subscriptions: Dict[int, Set[FeedSubscription]] = {}
+        # Last change pushed per subscribed project
+        self.positions: Dict[int, int] = {}
+        self.dirty: Set[int] = set()
+        self.wake = asyncio.Event()
+    
+    async def subscribe(self, project_id: int) -> FeedSubscription:
+        """Register a client; call unsubscribe when it disconnects"""
+        subscription = FeedSubscription(project_id)
+        if project_id not in self.subscriptions:
+            async with AsyncSessionLocal() as db:
+                position = await get_last_change_seq(db, project_id)
+            self.positions.setdefault(project_id, position)
+        self.subscriptions.setdefault(project_id, set()).add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: FeedSubscription):
+        subscriptions = self.subscriptions.get(subscription.project_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self.subscriptions[subscription.project_id]
+            self.positions.pop(subscription.project_id, None)
+    
+    def _mark(self, project_ids):
+        self.dirty.update(project_id for project_id in project_ids if project_id in self.subscriptions)
+        if self.dirty:
+            self.wake.set()
+    
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            self._mark([int(payload)])
+        except ValueError:
+            return
+    
+    async def _deliver(self, project_id: int):
+        has_more = True
+        while has_more and project_id in self.positions:
+            events, last_seq, has_more = await read_feed_events(
+                project_id, self.positions[project_id], FEED_PAGE_SIZE
+            )
+            if project_id not in self.positions:
+                return
+            self.positions[project_id] = last_seq
+            for subscription in list(self.subscriptions.get(project_id, ())):
+                subscription.push(events)
+    
+    async def _pump(self):
+        while True:
+            await self.wake.wait()
+            self.wake.clear()
+            await asyncio.sleep(FEED_BATCH_DELAY)
+            
+            projects, self.dirty = self.dirty, set()
+            for project_id in projects:
+                try:
+                    await self._deliver(project_id)
+                except Exception as e:
+                    logger.warning(f"Order feed delivery for project {project_id} failed: {str(e)}")
+    
+    async def _listen(self):
+        dsn = settings.DATABASE_URL.replace("+asyncpg", "")
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                closed = asyncio.get_running_loop().create_future()
+                connection.add_termination_listener(lambda _: closed.done() or closed.set_result(None))
+                await connection.add_listener(ORDER_FEED_CHANNEL, self._on_notify)
+                
+                # Changes may have committed while disconnected
+                self._mark(list(self.subscriptions))
+                await closed
+                logger.warning("Order feed LISTEN connection closed")
+            except asyncio.CancelledError:
+                if connection is not None:
+                    await connection.close()
+                raise
+            except Exception as e:
+                logger.warning(f"Order feed listener error: {str(e)}")
+            
+            await asyncio.sleep(5)
+    
+    async def run(self):
+        """Listen and deliver (runs for app lifetime)"""
+        await asyncio.gather(self._listen(), self._pump())
+
+order_feed_hub = OrderFeedHub()
+
+async def order_feed_events(project_id: int, after_seq: Optional[int]) -> AsyncIterator[FeedEvent]:
+    """Events of project after after_seq (None: from now on), then live ones as they commit.
+    
+    Yields (seq, event, data). Clients resume by passing the seq of the last
+    event they handled; a "reset" event means they are too far behind and
+    should reload instead.
+    """
+    subscription = await order_feed_hub.subscribe(project_id)
+    try:
+        last_seq = after_seq
+        if last_seq is None:
+            async with AsyncSessionLocal() as db:
+                last_seq = await get_last_change_seq(db, project_id)
+        
+        while True:
+            # Catch up by reading the feed: on connect and after the queue overflowed
+            subscription.overflowed = False
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            
+            replayed = 0
+            has_more = True
+            while has_more:
+                if replayed >= settings.ORDER_FEED_MAX_REPLAY:
+                    async with AsyncSessionLocal() as db:
+                        last_seq = await get_last_change_seq(db, project_id)
+                    yield last_seq, FEED_RESET, json.dumps({"seq": last_seq})
+                    break
+                
+                events, last_seq, has_more = await read_feed_events(project_id, last_seq, FEED_PAGE_SIZE)
+                for event in events:
+                    yield event
+                replayed += len(events)
+            
+            while not subscription.overflowed:
+                try:
+                    seq, event, data = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.ORDER_FEED_KEEPALIVE
+                    )
+                except asyncio.TimeoutError:
+                    yield last_seq, FEED_KEEPALIVE, "{}"
+                    continue
+                
+                # Replay and live delivery overlap; each change goes out once
+                if seq > last_seq:
+                    last_seq = seq
+                    yield seq, event, data
+    finally:
+        order_feed_hub.unsubscribe(subscription)
@@ -0,0 +1,148 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from decimal import Decimal
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.user import User
+from app.models.order import Order, OrderItem
+from app.schemas.main import OrderResponse, UserResponse, StatusSnapshot
+from app.services.project_config import get_project_config
+
+# Relations of GET /orders items, loaded only when listed in include=
+ORDER_RELATIONS = ("status", "operator", "items")
+DEFAULT_INCLUDE = ("status", "operator")
+
+# Columns a relation needs in the row
+RELATION_COLUMNS = {"status": "status_id", "operator": "operator_id", "items": "id"}
+
+# Scalar OrderResponse fields, selectable with fields=
+ORDER_FIELDS = tuple(name for name in OrderResponse.model_fields if name not in ORDER_RELATIONS)
+
+class OrderItemFields(TypedDict):
+    id: int
+    product_id: int
+    product_name: str
+    product_sku: Optional[str]
+    quantity: int
+    price: Decimal
+    total: Decimal
+
+ORDER_ITEM_COLUMNS = tuple(OrderItemFields.__annotations__)
+
+def _split(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+def parse_fieldset(fields: Optional[str], include: Optional[str]) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Normalize fields=/include= into sorted column and relation names; raises ValueError.
+    
+    Without fields= all OrderResponse fields are returned; without include=
+    the relations of OrderResponse (status, operator) are, unless fields= was given.
+    """
+    requested = _split(fields)
+    relations = _split(include)
+    
+    unknown = [name for name in requested if name not in ORDER_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    unknown = [name for name in relations if name not in ORDER_RELATIONS]
+    if unknown:
+        raise ValueError(f"Unknown include: {', '.join(unknown)}. Allowed: {', '.join(ORDER_RELATIONS)}")
+    
+    if include is None and not requested:
+        relations = list(DEFAULT_INCLUDE)
+    columns = set(requested or ORDER_FIELDS)
+    # id identifies rows (cursors, items); relations need their foreign keys
+    columns.add("id")
+    columns.update(RELATION_COLUMNS[relation] for relation in relations)
+    
+    return tuple(sorted(columns)), tuple(sorted(set(relations)))
+
+def order_columns(fieldset: Tuple[str, ...]):
+    """Order columns to SELECT for a fieldset from parse_fieldset"""
+    return [getattr(Order, name) for name in fieldset]
+
+@lru_cache(maxsize=256)
+def _order_item_type(fieldset: Tuple[str, ...], relations: Tuple[str, ...]):
+    # TypedDict of one order dict for a fieldset
+    annotations: Dict[str, Any] = {
+        name: OrderResponse.model_fields[name].annotation for name in fieldset
+    }
+    if "status" in relations:
+        annotations["status"] = Optional[StatusSnapshot]
+    if "operator" in relations:
+        annotations["operator"] = Optional[UserResponse]
+    if "items" in relations:
+        annotations["items"] = List[OrderItemFields]
+    
+    return TypedDict(f"OrderFields{abs(hash((fieldset, relations)))}", annotations)
+
+@lru_cache(maxsize=256)
+def order_page_adapter(fieldset: Tuple[str, ...], relations: Tuple[str, ...]) -> TypeAdapter:
+    """Serializer of a PaginatedResponse page for one fieldset, built once per combination.
+    
+    Items are plain dicts described by a TypedDict, so pages are dumped to JSON
+    without per-row model validation.
+    """
+    page_type = TypedDict(f"OrderPage{abs(hash((fieldset, relations)))}", {
+        "items": List[_order_item_type(fieldset, relations)],
+        "total": Optional[int],
+        "total_is_estimate": bool,
+        "page": int,
+        "limit": int,
+        "pages": Optional[int],
+        "next_cursor": Optional[str],
+        "prev_cursor": Optional[str]
+    })
+    return TypeAdapter(page_type)
+
+@lru_cache(maxsize=256)
+def order_event_adapter(fieldset: Tuple[str, ...], relations: Tuple[str, ...]) -> TypeAdapter:
+    """Serializer of a live order feed event ({"seq", "id", "deleted", "order"}) for one fieldset"""
+    event_type = TypedDict(f"OrderEvent{abs(hash((fieldset, relations)))}", {
+        "seq": int,
+        "id": int,
+        "deleted": bool,
+        "order": Optional[_order_item_type(fieldset, relations)]
+    })
+    return TypeAdapter(event_type)
+
+async def load_relations(
+    db: AsyncSession,
+    project_id: int,
+    orders: List[Dict[str, Any]],
+    relations: Tuple[str, ...]
+):
+    """Attach the requested relations to order dicts in place, one query per relation at most"""
+    if not orders or not relations:
+        return
+    
+    if "status" in relations:
+        # Statuses come from the project config cache
+        config = await get_project_config(db, project_id)
+        for order in orders:
+            order["status"] = config.status(order["status_id"])
+    
+    if "operator" in relations:
+        operators: Dict[int, UserResponse] = {}
+        operator_ids = {order["operator_id"] for order in orders if order["operator_id"]}
+        if operator_ids:
+            result = await db.execute(select(User).where(User.id.in_(operator_ids)))
+            operators = {user.id: UserResponse.model_validate(user) for user in result.scalars().all()}
+        for order in orders:
+            order["operator"] = operators.get(order["operator_id"])
+    
+    if "items" in relations:
+        items: Dict[int, List[Dict[str, Any]]] = {}
+        stmt = (
+            select(OrderItem.order_id, *[getattr(OrderItem, name) for name in ORDER_ITEM_COLUMNS])
+            .where(OrderItem.order_id.in_([order["id"] for order in orders]))
+            .order_by(OrderItem.id)
+        )
+        result = await db.execute(stmt)
+        for row in result.all():
+            item = dict(row._mapping)
+            items.setdefault(item.pop("order_id"), []).append(item)
+        for order in orders:
+            order["items"] = items.get(order["id"], [])
@@ -0,0 +1,127 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from fastapi import Request
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.security import get_user_identity
+from app.models.order import OrderHistory
+from app.schemas.main import OrderHistoryEntry, OrderHistoryUser
+from app.utils.pagination import KeysetCursor, NEXT, encode_cursor, decode_cursor, keyset_condition, keyset_order
+
+# History is read newest first only; cursors carry this sort key
+HISTORY_SORT = ("created_at", "desc")
+
+HISTORY_COLUMNS = (
+    OrderHistory.id,
+    OrderHistory.user_id,
+    OrderHistory.action,
+    OrderHistory.field_name,
+    OrderHistory.old_value,
+    OrderHistory.new_value,
+    OrderHistory.changes,
+    OrderHistory.comment,
+    OrderHistory.created_at,
+)
+
+# OrderHistory.source: where a mutation came from
+HISTORY_SOURCE_ADMIN = "admin"
+HISTORY_SOURCE_API = "api"
+HISTORY_SOURCE_BULK = "bulk"
+HISTORY_SOURCE_AUTOMATION = "automation"
+
+class HistoryContext(NamedTuple):
+    """Source and request metadata stored once per history record"""
+    source: str
+    ip_address: Optional[str] = None
+    user_agent: Optional[str] = None
+
+def request_context(request: Request, source: str) -> HistoryContext:
+    """HistoryContext of an API request"""
+    user_agent = request.headers.get("user-agent")
+    return HistoryContext(
+        source,
+        request.client.host if request.client else None,
+        user_agent[:500] if user_agent else None
+    )
+
+def history_value(value: Any) -> Optional[str]:
+    """Values are kept as text, as in field rows"""
+    return str(value) if value else None
+
+def history_diff(changes: Iterable[Tuple[str, Any, Any]]) -> Dict[str, List[Optional[str]]]:
+    """OrderHistory.changes of (field, old value, new value) changes"""
+    return {field: [history_value(old_value), history_value(new_value)] for field, old_value, new_value in changes}
+
+def expand_history(row, user: Optional[OrderHistoryUser]) -> List[OrderHistoryEntry]:
+    """API items of a history record: one per field of a compact record, newest first like field rows"""
+    entry = {
+        "id": row.id,
+        "action": row.action,
+        "comment": row.comment,
+        "created_at": row.created_at,
+        "user": user
+    }
+    if not row.changes:
+        return [OrderHistoryEntry(
+            **entry, field_name=row.field_name, old_value=row.old_value, new_value=row.new_value
+        )]
+    return [
+        OrderHistoryEntry(**entry, field_name=field, old_value=old_value, new_value=new_value)
+        for field, (old_value, new_value) in reversed(list(row.changes.items()))
+    ]
+
+def decode_history_cursor(token: str) -> KeysetCursor:
+    """Parse a next_cursor of an order history page; raises ValueError"""
+    cursor = decode_cursor(token, datetime)
+    if (cursor.sort_by, cursor.sort_order, cursor.direction) != (*HISTORY_SORT, NEXT):
+        raise ValueError("Cursor was not issued for an order history page")
+    return cursor
+
+async def history_users(db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, OrderHistoryUser]:
+    """Authors of history events from the cached user directory (get_user_identity).
+    
+    A page has few distinct authors, mostly already cached, so this replaces
+    joining users to every history row.
+    """
+    users = {}
+    for user_id in set(user_ids):
+        identity = await get_user_identity(db, user_id)
+        if identity is not None:
+            users[user_id] = OrderHistoryUser.model_validate(identity)
+    return users
+
+async def count_order_history(db: AsyncSession, order_id: int) -> int:
+    """Number of history records of an order (index-only scan of idx_order_history_order_created)"""
+    result = await db.execute(
+        select(func.count()).select_from(OrderHistory).where(OrderHistory.order_id == order_id)
+    )
+    return result.scalar()
+
+async def get_order_history_page(
+    db: AsyncSession,
+    order_id: int,
+    limit: int,
+    cursor: Optional[KeysetCursor] = None
+) -> Tuple[List[OrderHistoryEntry], Optional[str]]:
+    """Entries of up to limit history records of an order, newest first, after cursor; returns (entries, next_cursor)"""
+    stmt = (
+        select(*HISTORY_COLUMNS)
+        .where(OrderHistory.order_id == order_id)
+        .order_by(*keyset_order(OrderHistory.created_at, OrderHistory.id, True))
+        .limit(limit + 1)
+    )
+    if cursor:
+        stmt = stmt.where(keyset_condition(OrderHistory.created_at, OrderHistory.id, cursor, True))
+    
+    result = await db.execute(stmt)
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    users = await history_users(db, [row.user_id for row in rows if row.user_id])
+    entries = [entry for row in rows for entry in expand_history(row, users.get(row.user_id))]
+    
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(KeysetCursor(*HISTORY_SORT, rows[-1].created_at, rows[-1].id, NEXT))
+    return entries, next_cursor
@@ -0,0 +1,229 @@
+import codecs
+import csv
+import logging
+import re
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from openpyxl import load_workbook
+from sqlalchemy.exc import IntegrityError, DataError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.order import OrderSource
+from app.services.order_ingest import (
+    build_order_row, unique_external_id_enabled, find_orders_by_external_ids_sync,
+    insert_orders_sync, insert_order_once_sync
+)
+from app.services.project_config import get_project_config_sync
+
+logger = logging.getLogger(__name__)
+
+IMPORT_EXTENSIONS = (".xlsx", ".csv")
+
+# Imported files are written here before the worker picks them up
+IMPORT_DIR = "imports"
+
+HISTORY_COMMENT = "Order imported from file"
+
+# LeadVertex field (see build_order_row) -> accepted column headers, compared
+# lowercased without spaces, underscores and dashes. Export headers are
+# included, so an export can be imported back.
+IMPORT_FIELD_HEADERS = {
+    "name": ("name", "customer", "customername", "имя", "фио", "клиент"),
+    "phone": ("phone", "customerphone", "телефон"),
+    "email": ("email", "customeremail", "почта"),
+    "country": ("country", "страна"),
+    "region": ("region", "регион", "область"),
+    "city": ("city", "город"),
+    "address": ("address", "адрес"),
+    "postalCode": ("postalcode", "индекс"),
+    "comment": ("comment", "комментарий"),
+    "totalAmount": ("totalamount", "total", "сумма"),
+    "externalId": ("externalid",),
+    "utmSource": ("utmsource",),
+    "utmMedium": ("utmmedium",),
+    "utmCampaign": ("utmcampaign",),
+    "utmContent": ("utmcontent",),
+    "utmTerm": ("utmterm",),
+    "landingUrl": ("landingurl",),
+}
+IMPORT_HEADERS = {
+    header: field for field, headers in IMPORT_FIELD_HEADERS.items() for header in headers
+}
+
+def _header_key(value: Any) -> str:
+    return re.sub(r"[\s_\-]+", "", str(value or "").lower())
+
+def _cell_text(value: Any) -> Any:
+    # Phone numbers typed into Excel as numbers come back as floats
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return value
+
+def _mapped_rows(rows: Iterable) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("File is empty")
+    
+    fields = [IMPORT_HEADERS.get(_header_key(cell)) for cell in header]
+    if "name" not in fields or "phone" not in fields:
+        raise ValueError("File needs name and phone columns")
+    
+    for line, values in enumerate(rows, start=2):
+        data = {
+            field: _cell_text(value)
+            for field, value in zip(fields, values)
+            if field and value not in (None, "")
+        }
+        if data:
+            yield line, data
+
+def _csv_encoding(path: str) -> str:
+    # Excel saves CSV in the ANSI code page (cp1251 for Russian) unless told otherwise
+    with open(path, "rb") as file:
+        sample = file.read(64 * 1024)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "cp1251"
+
+def read_import_file(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Stream (line number, LeadVertex-style fields) of the data rows of an .xlsx or .csv file.
+    
+    The first row holds the headers (IMPORT_FIELD_HEADERS); other columns are
+    ignored. Raises ValueError for files without name and phone columns.
+    """
+    if path.endswith(".xlsx"):
+        # Read-only mode parses the sheet lazily instead of loading it whole
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            yield from _mapped_rows(workbook.active.iter_rows(values_only=True))
+        finally:
+            workbook.close()
+        return
+    
+    with open(path, newline="", encoding=_csv_encoding(path)) as file:
+        try:
+            dialect = csv.Sniffer().sniff(file.read(64 * 1024), delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        file.seek(0)
+        yield from _mapped_rows(csv.reader(file, dialect))
+
+def _chunks(rows: Iterator, size: int) -> Iterator[List]:
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+class ImportProgress:
+    """Counts of an import; errors keeps the first ORDER_IMPORT_MAX_ERRORS failed rows"""
+    
+    def __init__(self):
+        self.processed = 0
+        self.created = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+    
+    def fail(self, line: int, error: str):
+        self.failed += 1
+        if len(self.errors) < settings.ORDER_IMPORT_MAX_ERRORS:
+            self.errors.append({"row": line, "error": error})
+    
+    def counts(self) -> Dict[str, int]:
+        return {
+            "processed": self.processed,
+            "created": self.created,
+            "duplicates": self.duplicates,
+            "failed": self.failed
+        }
+
+def _import_chunk(
+    db: Session,
+    chunk: List[Tuple[int, Dict[str, Any]]],
+    project_id: int,
+    status_id: int,
+    unique_external_id: bool,
+    user_id: Optional[int],
+    progress: ImportProgress
+):
+    rows = []
+    for line, data in chunk:
+        try:
+            row = build_order_row(project_id, data, status_id, OrderSource.EXCEL_IMPORT.value, unique_external_id)
+        except ValueError as e:
+            progress.fail(line, str(e))
+            continue
+        if row["phone_norm"] is None:
+            progress.fail(line, "Invalid phone number")
+            continue
+        rows.append((line, row))
+    
+    if unique_external_id:
+        # Re-uploaded files and externalIds repeated within the file resolve to the first order
+        seen = set(find_orders_by_external_ids_sync(
+            db, project_id, [row["external_id"] for _, row in rows if row["external_id_unique"]]
+        ))
+        kept = []
+        for line, row in rows:
+            if row["external_id_unique"]:
+                if row["external_id"] in seen:
+                    progress.duplicates += 1
+                    continue
+                seen.add(row["external_id"])
+            kept.append((line, row))
+        rows = kept
+    
+    try:
+        insert_orders_sync(db, [row for _, row in rows], HISTORY_COMMENT, user_id)
+        db.commit()
+        progress.created += len(rows)
+    except (IntegrityError, DataError) as e:
+        db.rollback()
+        logger.warning(f"Order import chunk failed, retrying row by row: {str(e)}")
+        
+        # Isolate the rows that can't be inserted; concurrent duplicates resolve to the existing order
+        for line, row in rows:
+            try:
+                _, created = insert_order_once_sync(db, row, HISTORY_COMMENT, user_id)
+                db.commit()
+                if created:
+                    progress.created += 1
+                else:
+                    progress.duplicates += 1
+            except (IntegrityError, DataError) as row_error:
+                db.rollback()
+                logger.warning(f"Order import row {line} failed: {str(row_error)}")
+                progress.fail(line, "Order could not be saved")
+    
+    progress.processed += len(chunk)
+
+def import_orders_file(
+    db: Session,
+    project_id: int,
+    path: str,
+    user_id: Optional[int] = None,
+    report: Optional[Callable[[ImportProgress], None]] = None
+) -> ImportProgress:
+    """Create orders (source excel_import) from an uploaded file, committing per chunk.
+    
+    Rows are validated and normalized with build_order_row, the same as
+    addOrder.html, and each ORDER_IMPORT_CHUNK_SIZE chunk is written with
+    multi-row INSERTs of orders, order_created history and status counters.
+    Rows that fail are reported with their line number.
+    """
+    config = get_project_config_sync(db, project_id)
+    if config.default_status_id is None:
+        raise ValueError("Project has no processing status for new orders")
+    unique_external_id = unique_external_id_enabled(config.settings)
+    
+    progress = ImportProgress()
+    for chunk in _chunks(read_import_file(path), settings.ORDER_IMPORT_CHUNK_SIZE):
+        _import_chunk(db, chunk, project_id, config.default_status_id, unique_external_id, user_id, progress)
+        if report:
+            report(progress)
+    
+    return progress
@@ -0,0 +1,257 @@
+from sqlalchemy import select, insert, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List, Optional, Dict, Any, Mapping, Tuple
+from datetime import datetime
+from functools import lru_cache
+from app.models.order import Order, OrderHistory, OrderSource
+from app.services.order_counters import StatusChange, apply_status_changes, apply_status_changes_sync
+from app.services.order_changes import lock_change_seqs, lock_change_seqs_sync
+from app.services.project_config import get_project_config, get_project_config_sync
+from app.utils.timezone import get_customer_timezone, convert_to_local_time
+from app.utils.phone import normalize_phone
+
+# LeadVertex request field -> orders column
+LEADVERTEX_FIELD_MAP = {
+    "email": "customer_email",
+    "region": "region",
+    "city": "city",
+    "address": "address",
+    "postalCode": "postal_code",
+    "comment": "comment",
+    "externalId": "external_id",
+    "utmSource": "utm_source",
+    "utmMedium": "utm_medium",
+    "utmCampaign": "utm_campaign",
+    "utmContent": "utm_content",
+    "utmTerm": "utm_term",
+    "landingUrl": "landing_url"
+}
+
+# City -> timezone; imports and batches repeat the same cities
+_city_timezone = lru_cache(maxsize=4096)(get_customer_timezone)
+
+def _clean(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def _check_length(column: str, value: Optional[str]):
+    # One oversized value would fail the whole multi-row INSERT
+    max_length = getattr(Order.__table__.c[column].type, "length", None)
+    if value and max_length and len(value) > max_length:
+        raise ValueError(f"{column} is longer than {max_length} characters")
+
+def build_order_row(
+    project_id: int,
+    data: Mapping[str, Any],
+    status_id: int,
+    source: str = OrderSource.API.value,
+    unique_external_id: bool = False
+) -> Dict[str, Any]:
+    """Validate LeadVertex-style order fields and build an orders row"""
+    customer_name = _clean(data.get("name"))
+    customer_phone = _clean(data.get("phone"))
+    
+    if not customer_name or not customer_phone:
+        raise ValueError("Name and phone are required")
+    
+    try:
+        total_amount = float(data.get("totalAmount") or 0)
+    except (TypeError, ValueError):
+        raise ValueError("totalAmount must be a number")
+    
+    row = {
+        "project_id": project_id,
+        "customer_name": customer_name,
+        "customer_phone": customer_phone,
+        "phone_norm": normalize_phone(customer_phone),
+        "country": _clean(data.get("country")) or "Россия",
+        "total_amount": total_amount,
+        "status_id": status_id,
+        "source": source,
+        "custom_fields": {},
+        "customer_timezone": None,
+        "customer_local_time": None
+    }
+    
+    for field, column in LEADVERTEX_FIELD_MAP.items():
+        row[column] = _clean(data.get(field))
+    
+    for column in ("customer_name", "customer_phone", "country", *LEADVERTEX_FIELD_MAP.values()):
+        _check_length(column, row[column])
+    
+    row["external_id_unique"] = bool(unique_external_id and row["external_id"])
+    
+    # Add custom fields
+    if isinstance(data.get("customFields"), dict):
+        row["custom_fields"].update(data["customFields"])
+    for key, value in data.items():
+        if key.startswith("custom_"):
+            row["custom_fields"][key] = value
+    
+    # Detect customer timezone
+    if row["city"]:
+        row["customer_timezone"] = _city_timezone(row["city"])
+        if row["customer_timezone"]:
+            row["customer_local_time"] = convert_to_local_time(
+                datetime.utcnow(),
+                row["customer_timezone"]
+            )
+    
+    return row
+
+async def get_default_status_id(db: AsyncSession, project_id: int) -> Optional[int]:
+    """Get first processing status of project"""
+    config = await get_project_config(db, project_id)
+    return config.default_status_id
+
+def get_default_status_id_sync(db: Session, project_id: int) -> Optional[int]:
+    """Sync variant of get_default_status_id for Celery tasks"""
+    return get_project_config_sync(db, project_id).default_status_id
+
+def unique_external_id_enabled(project_settings: Optional[Mapping[str, Any]]) -> bool:
+    """Whether project deduplicates orders by externalId"""
+    return bool((project_settings or {}).get("unique_external_id"))
+
+def _external_ids_stmt(project_id: int, external_ids: List[str]):
+    return select(Order.external_id, Order.id).where(and_(
+        Order.project_id == project_id,
+        Order.external_id.in_(external_ids),
+        Order.external_id_unique.is_(True)
+    ))
+
+async def find_orders_by_external_ids(db: AsyncSession, project_id: int, external_ids: List[str]) -> Dict[str, int]:
+    """Return {external_id: order_id} of deduplicated orders of project"""
+    if not external_ids:
+        return {}
+    result = await db.execute(_external_ids_stmt(project_id, external_ids))
+    return {external_id: order_id for external_id, order_id in result.all()}
+
+def find_orders_by_external_ids_sync(db: Session, project_id: int, external_ids: List[str]) -> Dict[str, int]:
+    """Sync variant of find_orders_by_external_ids for Celery tasks"""
+    if not external_ids:
+        return {}
+    return {
+        external_id: order_id
+        for external_id, order_id in db.execute(_external_ids_stmt(project_id, external_ids)).all()
+    }
+
+def _history_rows(order_ids: List[int], comment: str, user_id: Optional[int]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "order_id": order_id,
+            "user_id": user_id,
+            "action": "order_created",
+            "comment": comment
+        }
+        for order_id in order_ids
+    ]
+
+def _created_changes(rows: List[Dict[str, Any]], order_ids: List[int]) -> List[StatusChange]:
+    return [
+        StatusChange(row["project_id"], order_id, None, row["status_id"])
+        for row, order_id in zip(rows, order_ids)
+    ]
+
+async def insert_orders(
+    db: AsyncSession,
+    rows: List[Dict[str, Any]],
+    comment: str,
+    user_id: Optional[int] = None
+) -> List[int]:
+    """Insert orders with their order_created history rows and status counters, without committing.
+    
+    Uses multi-row INSERT ... RETURNING, so IDs come back in the order of rows.
+    """
+    if not rows:
+        return []
+    
+    # A batch can span projects; lock their change sequences in a fixed order first
+    await lock_change_seqs(db, [row["project_id"] for row in rows])
+    stmt = insert(Order).returning(Order.id, sort_by_parameter_order=True)
+    result = await db.execute(stmt, rows)
+    order_ids = list(result.scalars().all())
+    
+    await db.execute(insert(OrderHistory), _history_rows(order_ids, comment, user_id))
+    await apply_status_changes(db, _created_changes(rows, order_ids))
+    
+    return order_ids
+
+def insert_orders_sync(
+    db: Session,
+    rows: List[Dict[str, Any]],
+    comment: str,
+    user_id: Optional[int] = None
+) -> List[int]:
+    """Sync variant of insert_orders for Celery tasks"""
+    if not rows:
+        return []
+    
+    lock_change_seqs_sync(db, [row["project_id"] for row in rows])
+    stmt = insert(Order).returning(Order.id, sort_by_parameter_order=True)
+    order_ids = list(db.execute(stmt, rows).scalars().all())
+    
+    db.execute(insert(OrderHistory), _history_rows(order_ids, comment, user_id))
+    apply_status_changes_sync(db, _created_changes(rows, order_ids))
+    
+    return order_ids
+
+def _insert_once_stmt(row: Dict[str, Any]):
+    # Concurrent duplicates wait on the other transaction's index entry, then do nothing
+    return (
+        pg_insert(Order)
+        .values(**row)
+        .on_conflict_do_nothing(
+            index_elements=[Order.project_id, Order.external_id],
+            index_where=Order.external_id_unique
+        )
+        .returning(Order.id)
+    )
+
+async def insert_order_once(
+    db: AsyncSession,
+    row: Dict[str, Any],
+    comment: str,
+    user_id: Optional[int] = None
+) -> Tuple[int, bool]:
+    """Insert an order unless a deduplicated order with its externalId exists.
+    
+    Returns (order_id, created), without committing.
+    """
+    if not row.get("external_id_unique"):
+        order_ids = await insert_orders(db, [row], comment, user_id)
+        return order_ids[0], True
+    
+    result = await db.execute(_insert_once_stmt(row))
+    order_id = result.scalar_one_or_none()
+    
+    if order_id is None:
+        existing = await find_orders_by_external_ids(db, row["project_id"], [row["external_id"]])
+        return existing[row["external_id"]], False
+    
+    await db.execute(insert(OrderHistory), _history_rows([order_id], comment, user_id))
+    await apply_status_changes(db, _created_changes([row], [order_id]))
+    return order_id, True
+
+def insert_order_once_sync(
+    db: Session,
+    row: Dict[str, Any],
+    comment: str,
+    user_id: Optional[int] = None
+) -> Tuple[int, bool]:
+    """Sync variant of insert_order_once for Celery tasks"""
+    if not row.get("external_id_unique"):
+        return insert_orders_sync(db, [row], comment, user_id)[0], True
+    
+    order_id = db.execute(_insert_once_stmt(row)).scalar_one_or_none()
+    
+    if order_id is None:
+        existing = find_orders_by_external_ids_sync(db, row["project_id"], [row["external_id"]])
+        return existing[row["external_id"]], False
+    
+    db.execute(insert(OrderHistory), _history_rows([order_id], comment, user_id))
+    apply_status_changes_sync(db, _created_changes([row], [order_id]))
+    return order_id, True
@@ -0,0 +1,366 @@
+import json
+from sqlalchemy import select, update, delete, insert, func, case, cast, literal, and_, Integer, Text, JSON
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from app.core.config import settings
+from app.models.order import Order, OrderItem, OrderHistory, CallLog
+from app.schemas.main import BulkOrderFilter, BulkOrderRequest, StatusSnapshot
+from app.services.order_changes import lock_change_seqs, lock_change_seqs_sync
+from app.services.order_counters import StatusChange, apply_status_changes, apply_status_changes_sync
+from app.services.order_history import HistoryContext, HISTORY_SOURCE_ADMIN, HISTORY_SOURCE_BULK, history_diff
+from app.services.order_search import order_filter_conditions
+from app.services.project_config import get_project_config
+from app.utils.phone import normalize_phone
+
+# Status groups that stamp a lifecycle timestamp the first time an order enters them
+STATUS_GROUP_TIMESTAMPS = {
+    "accepted": "approved_at",
+    "shipped": "shipped_at",
+    "canceled": "canceled_at",
+    "return": "canceled_at",
+    "spam": "canceled_at",
+}
+
+# OrderHistory action of each bulk action
+BULK_HISTORY_ACTIONS = {
+    "status": "field_updated",
+    "assign": "operator_assigned",
+    "update": "field_updated",
+}
+BULK_HISTORY_COMMENT = "Bulk update"
+BULK_HISTORY_CONTEXT = HistoryContext(HISTORY_SOURCE_BULK)
+
+# (order_id, field_name, old value, new value)
+HistoryRow = Tuple[int, str, Any, Any]
+
+class BulkChunk(NamedTuple):
+    """Outcome of one bulk transaction"""
+    last_id: Optional[int]  # keyset position of the next chunk, None when done
+    processed: int  # orders matched
+    changed: int  # orders updated or deleted
+
+def bulk_conditions(request: BulkOrderRequest) -> List:
+    """WHERE conditions selecting the orders of a bulk request"""
+    if request.order_ids is not None:
+        return [Order.project_id == request.project_id, Order.id.in_(request.order_ids)]
+    
+    order_filter = request.filter or BulkOrderFilter()
+    return order_filter_conditions(
+        request.project_id,
+        order_filter.status_id,
+        order_filter.operator_id,
+        order_filter.search.strip() if order_filter.search else None,
+        order_filter.date_from,
+        order_filter.date_to
+    )
+
+def bulk_changes(request: BulkOrderRequest) -> Dict[str, Any]:
+    """Order columns a bulk request sets (empty for delete)"""
+    if request.action == "status":
+        return {"status_id": request.status_id}
+    if request.action == "assign":
+        return {"operator_id": request.operator_id}
+    if request.action == "update" and request.changes:
+        return request.changes.model_dump(exclude_unset=True)
+    return {}
+
+def status_timestamps(new_status_id: int, order_status: Optional[StatusSnapshot]) -> Dict[str, Any]:
+    """SET values for orders moving to a status: status_updated_at and, once, the group's timestamp"""
+    values = {
+        "status_updated_at": case(
+            (Order.status_id != new_status_id, func.now()),
+            else_=Order.status_updated_at
+        )
+    }
+    column = STATUS_GROUP_TIMESTAMPS.get(order_status.group) if order_status else None
+    if column:
+        values[column] = func.coalesce(getattr(Order, column), func.now())
+    return values
+
+def _set_values(changes: Dict[str, Any], order_status: Optional[StatusSnapshot]) -> Dict[str, Any]:
+    values = dict(changes)
+    values["updated_at"] = func.now()
+    
+    if "customer_phone" in changes:
+        values["phone_norm"] = normalize_phone(changes["customer_phone"])
+    
+    if "status_id" in changes:
+        values.update(status_timestamps(changes["status_id"], order_status))
+    
+    return values
+
+def _array(values: List[Any], item_type):
+    return cast(literal(values, ARRAY(item_type)), ARRAY(item_type))
+
+def _locked_rows_stmt(conditions: List, changes: Dict[str, Any], after_id: int):
+    # Rows are locked in id order before the change sequence and counters,
+    # like lock_order_status does for single orders
+    columns = ["id", "status_id", *[field for field in changes if field not in ("id", "status_id")]]
+    return (
+        select(*[getattr(Order, field) for field in columns])
+        .where(and_(*conditions, Order.id > after_id))
+        .order_by(Order.id)
+        .limit(settings.ORDER_BULK_CHUNK_SIZE)
+        .with_for_update()
+    )
+
+def _plan_chunk(
+    project_id: int,
+    rows: List,
+    changes: Dict[str, Any],
+    deleting: bool
+) -> Tuple[List[int], List[HistoryRow], List[StatusChange]]:
+    """Orders to write, history rows and status moves for the locked rows of a chunk"""
+    order_ids: List[int] = []
+    history: List[HistoryRow] = []
+    status_changes: List[StatusChange] = []
+    
+    for row in rows:
+        if deleting:
+            order_ids.append(row.id)
+            status_changes.append(StatusChange(project_id, row.id, row.status_id, None))
+            continue
+        
+        changed = [
+            (field, getattr(row, field), value)
+            for field, value in changes.items()
+            if getattr(row, field) != value
+        ]
+        if not changed:
+            continue
+        
+        order_ids.append(row.id)
+        for field, old_value, new_value in changed:
+            history.append((row.id, field, old_value, new_value))
+            if field == "status_id":
+                status_changes.append(StatusChange(project_id, row.id, old_value, new_value))
+    
+    return order_ids, history, status_changes
+
+def _update_stmt(order_ids: List[int], values: Dict[str, Any], returning=(Order.id,)):
+    return (
+        update(Order)
+        .where(Order.id.in_(order_ids))
+        .values(**values)
+        .returning(*returning)
+        .execution_options(synchronize_session=False)
+    )
+
+def _history_stmt(
+    history: List[HistoryRow],
+    user_id: Optional[int],
+    action: str,
+    comment: Optional[str],
+    context: HistoryContext
+):
+    """One INSERT ... SELECT from unnested arrays: a compact record per order with all its changed fields"""
+    changes: Dict[int, List[Tuple[str, Any, Any]]] = {}
+    for order_id, field, old_value, new_value in history:
+        changes.setdefault(order_id, []).append((field, old_value, new_value))
+    
+    rows = func.unnest(
+        _array(list(changes), Integer),
+        _array([json.dumps(history_diff(fields)) for fields in changes.values()], Text)
+    ).table_valued("order_id", "changes").alias("history_rows")
+    
+    return insert(OrderHistory).from_select(
+        ["order_id", "user_id", "action", "changes", "comment", "source", "ip_address", "user_agent"],
+        select(
+            rows.c.order_id,
+            cast(literal(user_id), Integer),
+            cast(literal(action), Text),
+            cast(rows.c.changes, JSON),
+            cast(literal(comment), Text),
+            cast(literal(context.source), Text),
+            cast(literal(context.ip_address), Text),
+            cast(literal(context.user_agent), Text)
+        )
+    )
+
+def _delete_stmts(order_ids: List[int]):
+    # Dependents first, as the ORM cascade of delete_order does
+    return [
+        delete(OrderItem).where(OrderItem.order_id.in_(order_ids)),
+        delete(OrderHistory).where(OrderHistory.order_id.in_(order_ids)),
+        update(CallLog).where(CallLog.order_id.in_(order_ids)).values(order_id=None),
+        delete(Order).where(Order.id.in_(order_ids)).returning(Order.id).execution_options(synchronize_session=False)
+    ]
+
+def _chunk_result(rows: List, changed: int) -> BulkChunk:
+    last_id = rows[-1].id if len(rows) == settings.ORDER_BULK_CHUNK_SIZE else None
+    return BulkChunk(last_id, len(rows), changed)
+
+async def apply_bulk_chunk(
+    db: AsyncSession,
+    request: BulkOrderRequest,
+    order_status: Optional[StatusSnapshot],
+    user_id: Optional[int],
+    after_id: int = 0
+) -> BulkChunk:
+    """Apply a bulk request to the next ORDER_BULK_CHUNK_SIZE orders after after_id (no commit).
+    
+    One locking SELECT, one UPDATE (or DELETE) ... RETURNING and one history
+    INSERT ... SELECT per chunk, whatever the number of orders.
+    """
+    changes = bulk_changes(request)
+    deleting = request.action == "delete"
+    result = await db.execute(_locked_rows_stmt(bulk_conditions(request), changes, after_id))
+    rows = result.all()
+    if not rows:
+        return BulkChunk(None, 0, 0)
+    
+    order_ids, history, status_changes = _plan_chunk(request.project_id, rows, changes, deleting)
+    if not order_ids:
+        return _chunk_result(rows, 0)
+    
+    if status_changes:
+        await apply_status_changes(db, status_changes)
+    else:
+        await lock_change_seqs(db, [request.project_id])
+    
+    if deleting:
+        for stmt in _delete_stmts(order_ids):
+            result = await db.execute(stmt)
+        return _chunk_result(rows, len(result.all()))
+    
+    result = await db.execute(_update_stmt(order_ids, _set_values(changes, order_status)))
+    changed = len(result.all())
+    if history:
+        await db.execute(_history_stmt(
+            history, user_id, BULK_HISTORY_ACTIONS[request.action], BULK_HISTORY_COMMENT, BULK_HISTORY_CONTEXT
+        ))
+    return _chunk_result(rows, changed)
+
+def apply_bulk_chunk_sync(
+    db: Session,
+    request: BulkOrderRequest,
+    order_status: Optional[StatusSnapshot],
+    user_id: Optional[int],
+    after_id: int = 0
+) -> BulkChunk:
+    """Sync variant of apply_bulk_chunk for Celery tasks"""
+    changes = bulk_changes(request)
+    deleting = request.action == "delete"
+    rows = db.execute(_locked_rows_stmt(bulk_conditions(request), changes, after_id)).all()
+    if not rows:
+        return BulkChunk(None, 0, 0)
+    
+    order_ids, history, status_changes = _plan_chunk(request.project_id, rows, changes, deleting)
+    if not order_ids:
+        return _chunk_result(rows, 0)
+    
+    if status_changes:
+        apply_status_changes_sync(db, status_changes)
+    else:
+        lock_change_seqs_sync(db, [request.project_id])
+    
+    if deleting:
+        for stmt in _delete_stmts(order_ids):
+            result = db.execute(stmt)
+        return _chunk_result(rows, len(result.all()))
+    
+    changed = len(db.execute(_update_stmt(order_ids, _set_values(changes, order_status))).all())
+    if history:
+        db.execute(_history_stmt(
+            history, user_id, BULK_HISTORY_ACTIONS[request.action], BULK_HISTORY_COMMENT, BULK_HISTORY_CONTEXT
+        ))
+    return _chunk_result(rows, changed)
+
+async def count_bulk_orders(db: AsyncSession, request: BulkOrderRequest) -> int:
+    """Number of orders a bulk request matches"""
+    stmt = select(func.count(Order.id)).where(and_(*bulk_conditions(request)))
+    result = await db.execute(stmt)
+    return result.scalar()
+
+def count_bulk_orders_sync(db: Session, request: BulkOrderRequest) -> int:
+    """Sync variant of count_bulk_orders for Celery tasks"""
+    stmt = select(func.count(Order.id)).where(and_(*bulk_conditions(request)))
+    return db.execute(stmt).scalar()
+
+async def run_bulk_operation(
+    db: AsyncSession,
+    request: BulkOrderRequest,
+    order_status: Optional[StatusSnapshot],
+    user_id: Optional[int]
+) -> Tuple[int, int]:
+    """Apply a bulk request chunk by chunk in the caller's transaction; returns (processed, changed)"""
+    processed = changed = 0
+    after_id = 0
+    while True:
+        chunk = await apply_bulk_chunk(db, request, order_status, user_id, after_id)
+        processed += chunk.processed
+        changed += chunk.changed
+        if chunk.last_id is None:
+            return processed, changed
+        after_id = chunk.last_id
+
+def run_bulk_operation_sync(
+    db: Session,
+    request: BulkOrderRequest,
+    order_status: Optional[StatusSnapshot],
+    user_id: Optional[int],
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Tuple[int, int]:
+    """Apply a bulk request committing each chunk, calling progress(processed, changed) after each"""
+    processed = changed = 0
+    after_id = 0
+    while True:
+        chunk = apply_bulk_chunk_sync(db, request, order_status, user_id, after_id)
+        db.commit()
+        processed += chunk.processed
+        changed += chunk.changed
+        if progress:
+            progress(processed, changed)
+        if chunk.last_id is None:
+            return processed, changed
+        after_id = chunk.last_id
+
+def _locked_order_stmt(order_id: int, project_id: Optional[int]):
+    conditions = [Order.id == order_id]
+    if project_id is not None:
+        conditions.append(Order.project_id == project_id)
+    return select(*Order.__table__.c).where(and_(*conditions)).with_for_update()
+
+async def lock_order_row(db: AsyncSession, order_id: int, project_id: Optional[int] = None):
+    """Lock an order until commit and return its row (all columns), or None if not found"""
+    result = await db.execute(_locked_order_stmt(order_id, project_id))
+    return result.one_or_none()
+
+async def apply_order_update(
+    db: AsyncSession,
+    order,
+    changes: Dict[str, Any],
+    user_id: Optional[int] = None,
+    action: str = "field_updated",
+    comment: Optional[str] = None,
+    context: HistoryContext = HistoryContext(HISTORY_SOURCE_ADMIN)
+):
+    """Apply changes to an order locked with lock_order_row, in the caller's transaction (no commit).
+    
+    Only fields that differ are written, with one UPDATE ... RETURNING, one
+    compact history record for all of them and the status counters. Returns
+    the updated row, or order itself when nothing changed.
+    """
+    order_ids, history, status_changes = _plan_chunk(order.project_id, [order], changes, False)
+    if not order_ids:
+        return order
+    
+    changed = {field: changes[field] for _, field, _, _ in history}
+    order_status = None
+    if "status_id" in changed:
+        config = await get_project_config(db, order.project_id)
+        order_status = config.status(changed["status_id"])
+    
+    result = await db.execute(
+        _update_stmt(order_ids, _set_values(changed, order_status), tuple(Order.__table__.c))
+    )
+    updated = result.one()
+    
+    # The UPDATE took the change sequence lock; counters come after it
+    if status_changes:
+        await apply_status_changes(db, status_changes)
+    await db.execute(_history_stmt(history, user_id, action, comment, context))
+    
+    return updated
@@ -0,0 +1,231 @@
+import json
+import logging
+import time
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple
+from redis.exceptions import ResponseError
+from sqlalchemy import select, insert
+from sqlalchemy.exc import IntegrityError, DataError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.cache import redis_client, sync_redis_client
+from app.core.database import SessionLocal
+from app.models.order import OrderIngestTicket
+from app.services.order_ingest import insert_orders_sync, insert_order_once_sync
+from app.utils.phone import normalize_phone
+
+logger = logging.getLogger(__name__)
+
+# Write-behind lead ingestion: addOrder.html -> Redis Stream -> consumer -> orders
+STREAM_KEY = "orders:ingest"
+DEAD_LETTER_KEY = "orders:ingest:dead"
+CONSUMER_GROUP = "order-writers"
+RESULT_KEY = "orders:ingest:result:{ticket}"
+NOTIFY_KEY = "orders:ingest:notify:{ticket}"
+
+HISTORY_COMMENT = "Order created via API queue"
+
+class OrderQueueFullError(Exception):
+    """Raised when the ingestion backlog is above ORDER_QUEUE_MAX_LENGTH"""
+    pass
+
+def _encode_row(row: Dict[str, Any]) -> str:
+    return json.dumps(
+        row,
+        ensure_ascii=False,
+        default=lambda value: value.isoformat() if isinstance(value, datetime) else str(value)
+    )
+
+def _decode_row(payload: str) -> Dict[str, Any]:
+    row = json.loads(payload)
+    # Entries queued before externalId deduplication / phone_norm existed
+    row.setdefault("external_id_unique", False)
+    if "phone_norm" not in row:
+        row["phone_norm"] = normalize_phone(row.get("customer_phone"))
+    if row.get("customer_local_time"):
+        row["customer_local_time"] = datetime.fromisoformat(row["customer_local_time"])
+    return row
+
+async def enqueue_order(row: Dict[str, Any]) -> str:
+    """Append a validated orders row to the ingestion stream and return its ticket"""
+    backlog = await redis_client.xlen(STREAM_KEY)
+    if backlog >= settings.ORDER_QUEUE_MAX_LENGTH:
+        raise OrderQueueFullError(f"Order queue backlog is {backlog}")
+    
+    return await redis_client.xadd(STREAM_KEY, {"row": _encode_row(row)})
+
+async def get_ticket_result(ticket: str, wait: float = 0) -> Optional[Dict[str, Any]]:
+    """Return {"project_id", "order_id"} or {"project_id", "error"} once the ticket is written"""
+    if wait > 0:
+        # The consumer pushes the result here right after commit
+        popped = await redis_client.blpop(NOTIFY_KEY.format(ticket=ticket), timeout=wait)
+        if popped:
+            return json.loads(popped[1])
+    
+    result = await redis_client.get(RESULT_KEY.format(ticket=ticket))
+    return json.loads(result) if result else None
+
+# Consumer side (sync, runs in app/scripts/order_queue_consumer.py)
+
+def ensure_consumer_group():
+    """Create the stream and consumer group if they don't exist yet"""
+    try:
+        sync_redis_client.xgroup_create(STREAM_KEY, CONSUMER_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+def _store_results(results: Dict[str, Dict[str, Any]], dead: List[Tuple[str, Dict[str, str]]]):
+    """Publish ticket results, then acknowledge and drop the stream entries"""
+    pipe = sync_redis_client.pipeline(transaction=True)
+    for ticket, result in results.items():
+        payload = json.dumps(result)
+        pipe.set(RESULT_KEY.format(ticket=ticket), payload, ex=settings.ORDER_QUEUE_RESULT_TTL)
+        notify_key = NOTIFY_KEY.format(ticket=ticket)
+        pipe.rpush(notify_key, payload)
+        pipe.expire(notify_key, 60)
+    for ticket, fields in dead:
+        pipe.xadd(DEAD_LETTER_KEY, {**fields, "ticket": ticket})
+    if results:
+        pipe.xack(STREAM_KEY, CONSUMER_GROUP, *results.keys())
+        pipe.xdel(STREAM_KEY, *results.keys())
+    pipe.execute()
+
+def _committed_tickets(db: Session, tickets: List[str]) -> Dict[str, Dict[str, Any]]:
+    # Results of tickets whose orders were committed, from order_ingest_tickets
+    if not tickets:
+        return {}
+    stmt = (
+        select(OrderIngestTicket.ticket, OrderIngestTicket.project_id, OrderIngestTicket.order_id)
+        .where(OrderIngestTicket.ticket.in_(tickets))
+    )
+    return {
+        ticket: {"project_id": project_id, "order_id": order_id}
+        for ticket, project_id, order_id in db.execute(stmt).all()
+    }
+
+def _ticket_rows(tickets: List[str], rows: List[Dict[str, Any]], order_ids: List[int]) -> List[Dict[str, Any]]:
+    return [
+        {"ticket": ticket, "project_id": row["project_id"], "order_id": order_id}
+        for ticket, row, order_id in zip(tickets, rows, order_ids)
+    ]
+
+def process_entries(entries: List[Tuple[str, Dict[str, str]]]) -> int:
+    """Write a micro-batch of stream entries to orders/order_history in one transaction.
+    
+    Each ticket is committed with its order (order_ingest_tickets), so an entry
+    redelivered after the commit but before its XACK resolves to that order.
+    """
+    if not entries:
+        return 0
+    
+    # Entries redelivered after a crash may already be committed; their result is usually still in Redis
+    pipe = sync_redis_client.pipeline(transaction=False)
+    for ticket, _ in entries:
+        pipe.get(RESULT_KEY.format(ticket=ticket))
+    existing = pipe.execute()
+    
+    results: Dict[str, Dict[str, Any]] = {}
+    dead: List[Tuple[str, Dict[str, str]]] = []
+    pending: List[Tuple[str, Dict[str, Any]]] = []
+    
+    for (ticket, fields), stored in zip(entries, existing):
+        if stored:
+            results[ticket] = json.loads(stored)
+            continue
+        try:
+            pending.append((ticket, _decode_row(fields["row"])))
+        except (KeyError, TypeError, ValueError) as e:
+            results[ticket] = {"project_id": None, "error": f"Malformed entry: {str(e)}"}
+            dead.append((ticket, fields or {}))
+    
+    written = 0
+    with SessionLocal() as db:
+        # The database is authoritative when the results weren't published
+        committed = _committed_tickets(db, [ticket for ticket, _ in pending])
+        results.update(committed)
+        pending = [(ticket, row) for ticket, row in pending if ticket not in committed]
+        
+        try:
+            rows = [row for _, row in pending]
+            order_ids = insert_orders_sync(db, rows, HISTORY_COMMENT)
+            if order_ids:
+                db.execute(insert(OrderIngestTicket), _ticket_rows([ticket for ticket, _ in pending], rows, order_ids))
+            db.commit()
+            for (ticket, row), order_id in zip(pending, order_ids):
+                results[ticket] = {"project_id": row["project_id"], "order_id": order_id}
+            written = len(order_ids)
+        except (IntegrityError, DataError) as e:
+            db.rollback()
+            logger.warning(f"Order queue batch failed, retrying row by row: {str(e)}")
+            
+            # Isolate the rows that can't be inserted; anything other than bad
+            # data (e.g. database down) propagates and the entries stay pending.
+            # Duplicate externalIds resolve to the existing order.
+            for ticket, row in pending:
+                try:
+                    order_id, created = insert_order_once_sync(db, row, HISTORY_COMMENT)
+                    db.execute(insert(OrderIngestTicket), _ticket_rows([ticket], [row], [order_id]))
+                    db.commit()
+                    results[ticket] = {"project_id": row["project_id"], "order_id": order_id}
+                    written += int(created)
+                except (IntegrityError, DataError) as row_error:
+                    db.rollback()
+                    # A consumer that claimed the same entry committed it first
+                    committed = _committed_tickets(db, [ticket])
+                    if committed:
+                        results.update(committed)
+                        continue
+                    logger.error(f"Order queue entry {ticket} failed: {str(row_error)}")
+                    results[ticket] = {"project_id": row["project_id"], "error": "Order could not be saved"}
+                    dead.append((ticket, dict(entries)[ticket]))
+    
+    _store_results(results, dead)
+    return written
+
+def run_consumer(consumer_name: str, once: bool = False):
+    """Drain the ingestion stream into the database in micro-batches"""
+    ensure_consumer_group()
+    batch_size = settings.ORDER_QUEUE_BATCH_SIZE
+    
+    # Replay entries this consumer read but did not acknowledge before a crash
+    while True:
+        response = sync_redis_client.xreadgroup(
+            CONSUMER_GROUP, consumer_name, {STREAM_KEY: "0"}, count=batch_size
+        )
+        entries = response[0][1] if response else []
+        if not entries:
+            break
+        logger.info(f"Replaying {len(entries)} pending order queue entries")
+        process_entries(entries)
+    
+    last_claim = 0.0
+    while True:
+        try:
+            # Take over entries left pending by dead consumers or failed batches
+            if time.monotonic() - last_claim > settings.ORDER_QUEUE_CLAIM_IDLE_MS / 1000:
+                last_claim = time.monotonic()
+                _, claimed, *_ = sync_redis_client.xautoclaim(
+                    STREAM_KEY, CONSUMER_GROUP, consumer_name,
+                    min_idle_time=settings.ORDER_QUEUE_CLAIM_IDLE_MS,
+                    count=batch_size
+                )
+                if claimed:
+                    logger.info(f"Claimed {len(claimed)} stale order queue entries")
+                    process_entries(claimed)
+            
+            response = sync_redis_client.xreadgroup(
+                CONSUMER_GROUP, consumer_name, {STREAM_KEY: ">"},
+                count=batch_size, block=1000
+            )
+            entries = response[0][1] if response else []
+            if entries:
+                written = process_entries(entries)
+                logger.info(f"Order queue: wrote {written} of {len(entries)} entries")
+            elif once:
+                return
+        
+        except Exception as e:
+            # Unacknowledged entries are picked up again by xautoclaim
+            logger.error(f"Order queue consumer error: {str(e)}")
+            time.sleep(5)
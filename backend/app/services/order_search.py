@@ -0,0 +1,84 @@
+from sqlalchemy import or_, case, cast, func, literal, Float
+from typing import List, Optional
+from datetime import datetime
+from app.models.order import Order
+from app.utils.phone import phone_digits_sql, phone_search_digits
+
+def _like_pattern(term: str) -> str:
+    # The term is matched literally: escape LIKE wildcards
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def _exact_match(term: str):
+    # tracking_number/external_id/id lookups use their btree indexes
+    conditions = [Order.tracking_number == term, Order.external_id == term]
+    if term.isdigit() and len(term) < 10:
+        conditions.append(Order.id == int(term))
+    return or_(*conditions)
+
+def order_search_condition(term: str):
+    """WHERE clause for the operator search box.
+    
+    Every branch is index-backed (trigram GIN on name/email/phone digits,
+    btree on tracking number, external ID and ID), so the OR becomes a bitmap
+    scan instead of a scan of the project's orders.
+    """
+    term = term.strip()
+    digits = phone_search_digits(term)
+    if digits:
+        # Phone-like terms ignore +7/8 prefixes and formatting
+        return or_(phone_digits_sql(Order.customer_phone).like(f"%{digits}%"), _exact_match(term))
+    
+    pattern = _like_pattern(term)
+    return or_(
+        Order.customer_name.ilike(pattern),
+        Order.customer_email.ilike(pattern),
+        _exact_match(term)
+    )
+
+def order_search_rank(term: str):
+    """Relevance of an order for term (higher is better), for sort_by=relevance"""
+    term = term.strip()
+    exact = case((_exact_match(term), 2.0), else_=0.0)
+    digits: Optional[str] = phone_search_digits(term)
+    if digits:
+        # Full number first, then numbers where the digits appear earlier
+        phone_digits = phone_digits_sql(Order.customer_phone)
+        similarity = case(
+            (phone_digits == digits, 1.0),
+            else_=1.0 / (1 + func.strpos(phone_digits, digits))
+        )
+    else:
+        similarity = func.greatest(
+            func.similarity(Order.customer_name, literal(term), type_=Float),
+            func.similarity(func.coalesce(Order.customer_email, ""), literal(term), type_=Float)
+        )
+    return cast(exact + similarity, Float)
+
+def order_filter_conditions(
+    project_id: int,
+    status_id: Optional[int] = None,
+    operator_id: Optional[int] = None,
+    search: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None
+) -> List:
+    """WHERE conditions of the admin order list filters"""
+    conditions = [Order.project_id == project_id]
+    
+    if status_id:
+        conditions.append(Order.status_id == status_id)
+    
+    if operator_id:
+        conditions.append(Order.operator_id == operator_id)
+    
+    if search:
+        conditions.append(order_search_condition(search))
+    
+    if date_from:
+        conditions.append(Order.created_at >= date_from)
+    
+    if date_to:
+        conditions.append(Order.created_at <= date_to)
+    
+    return conditions
@@ -0,0 +1,177 @@
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Tables that can be partitioned by month of created_at (see ORDER_HISTORY_PARTITIONING)
+MONTHLY_PARTITIONED_TABLES = ("order_history",)
+
+PARTITION_KEY = "created_at"
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+def _partition_month(table: str, name: str) -> Optional[date]:
+    match = re.fullmatch(rf"{re.escape(table)}_p(\d{{4}})_(\d{{2}})", name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+def is_partitioned(connection, table: str) -> bool:
+    """Whether table exists as a partitioned (parent) table"""
+    result = connection.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": table}
+    )
+    return bool(result.scalar())
+
+def list_partitions(connection, table: str) -> List[Tuple[str, Optional[date]]]:
+    """(name, month) of the partitions of table, oldest first; month is None for the default partition"""
+    result = connection.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(:table)"
+        ),
+        {"table": table}
+    )
+    partitions = [(name, _partition_month(table, name)) for name in result.scalars().all()]
+    return sorted(partitions, key=lambda partition: partition[1] or date.max)
+
+def create_partition(connection, table: str, month: date) -> str:
+    """Create the partition of table for month (UTC bounds) unless it exists"""
+    name = partition_name(table, month)
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+        f"TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+    ))
+    return name
+
+def ensure_partitions(connection, table: str, months_ahead: int) -> List[str]:
+    """Create missing partitions from the current month to months_ahead months later.
+    
+    Rows only land in the default partition if this falls behind; creating a
+    month that already has rows there fails, so partitions are made in advance.
+    """
+    existing = {name for name, _ in list_partitions(connection, table)}
+    current = month_start(datetime.now(timezone.utc).date())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if partition_name(table, month) not in existing:
+            created.append(create_partition(connection, table, month))
+    return created
+
+def drop_partitions_before(connection, table: str, before: date, detach_only: bool = False) -> List[str]:
+    """Detach and drop (or only detach) the monthly partitions entirely before the month of before.
+    
+    Removing a partition is a catalog change, unlike a DELETE of the same rows;
+    detached partitions stay as plain tables for archiving.
+    """
+    cutoff = month_start(before)
+    removed = []
+    for name, month in list_partitions(connection, table):
+        if month is None or add_months(month, 1) > cutoff:
+            continue
+        connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        if not detach_only:
+            connection.execute(text(f"DROP TABLE {name}"))
+        removed.append(name)
+    return removed
+
+def _copy_definitions(connection, source: str) -> Tuple[List[Tuple[str, str]], List[str], Optional[str]]:
+    # Foreign keys, index definitions and the owned id sequence of source
+    foreign_keys = connection.execute(
+        text(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(:table) AND contype = 'f'"
+        ),
+        {"table": source}
+    ).all()
+    indexes = connection.execute(
+        text(
+            "SELECT pg_get_indexdef(indexrelid) FROM pg_index "
+            "WHERE indrelid = to_regclass(:table) AND NOT indisprimary"
+        ),
+        {"table": source}
+    ).scalars().all()
+    sequence = connection.execute(
+        text("SELECT pg_get_serial_sequence(:table, 'id')"),
+        {"table": source}
+    ).scalar()
+    return [tuple(foreign_key) for foreign_key in foreign_keys], list(indexes), sequence
+
+def rebuild_table(connection, table: str, partitioned: bool, months_ahead: int = 3) -> Dict[str, Any]:
+    """Convert table to monthly partitions of created_at (or back to a plain table), keeping its rows.
+    
+    Rows are copied within the caller's transaction while the old table is
+    renamed aside, so writers wait until it commits: run it in a maintenance
+    window. The primary key becomes (id, created_at), as unique constraints of
+    partitioned tables must include the partition key, and created_at becomes
+    NOT NULL. Indexes, foreign keys and the id sequence carry over; tables
+    other tables reference can't be converted.
+    """
+    referenced = connection.execute(
+        text("SELECT count(*) FROM pg_constraint WHERE confrelid = to_regclass(:table)"),
+        {"table": table}
+    ).scalar()
+    if referenced:
+        raise ValueError(f"{table} is referenced by foreign keys and can't be rebuilt")
+    
+    old = f"{table}_old"
+    connection.execute(text(f"ALTER TABLE {table} RENAME TO {old}"))
+    foreign_keys, indexes, sequence = _copy_definitions(connection, old)
+    
+    partition_by = f" PARTITION BY RANGE ({PARTITION_KEY})" if partitioned else ""
+    connection.execute(text(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS){partition_by}"))
+    connection.execute(text(f"ALTER TABLE {table} ALTER COLUMN {PARTITION_KEY} SET NOT NULL"))
+    
+    partitions = 0
+    if partitioned:
+        first = connection.execute(text(f"SELECT min({PARTITION_KEY}) FROM {old}")).scalar()
+        current = month_start(datetime.now(timezone.utc).date())
+        month = month_start(first.astimezone(timezone.utc).date()) if first else current
+        while month <= add_months(current, months_ahead):
+            create_partition(connection, table, month)
+            partitions += 1
+            month = add_months(month, 1)
+        # Catches rows outside the premade months if partition maintenance stops
+        connection.execute(text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"))
+    
+    columns = connection.execute(
+        text(
+            "SELECT attname FROM pg_attribute "
+            "WHERE attrelid = to_regclass(:table) AND attnum > 0 AND NOT attisdropped ORDER BY attnum"
+        ),
+        {"table": table}
+    ).scalars().all()
+    values = [f"coalesce({column}, now())" if column == PARTITION_KEY else column for column in columns]
+    result = connection.execute(text(
+        f"INSERT INTO {table} ({', '.join(columns)}) SELECT {', '.join(values)} FROM {old}"
+    ))
+    rows = result.rowcount
+    
+    if sequence:
+        connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+    connection.execute(text(f"DROP TABLE {old}"))
+    
+    # Index names are schema-wide, so they can be reused only once the old table is gone;
+    # building them after the copy is also faster than maintaining them row by row
+    primary_key = f"id, {PARTITION_KEY}" if partitioned else "id"
+    connection.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY ({primary_key})"))
+    for definition in indexes:
+        connection.execute(text(re.sub(rf" ON (ONLY )?(\w+\.)?{old} ", f" ON {table} ", definition, count=1)))
+    for name, definition in foreign_keys:
+        connection.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}"))
+    
+    logger.info(f"Rebuilt {table} ({'partitioned' if partitioned else 'plain'}): {rows} rows, {partitions} partitions")
+    return {"rows": rows, "partitions": partitions}
@@ -0,0 +1,142 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+import logging
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, SessionLocal, is_replica_session
+from app.core.cache import (
+    TTLCache, redis_client, sync_redis_client, publish_invalidation, publish_invalidation_sync
+)
+from app.models.user import Project, OrderStatus
+from app.schemas.main import ProjectConfig, StatusSnapshot
+
+logger = logging.getLogger(__name__)
+
+PROJECT_CONFIG_CACHE_NAME = "project_config"
+
+# Bumped on every status/settings change; cached snapshots are keyed by version
+VERSION_KEY = "project_config:version:{project_id}"
+SNAPSHOT_KEY = "project_config:{project_id}:{version}"
+
+project_config_cache = TTLCache(
+    PROJECT_CONFIG_CACHE_NAME,
+    maxsize=10000,
+    ttl=settings.PROJECT_CONFIG_CACHE_TTL
+)
+
+def _statuses_stmt(project_id: int):
+    return (
+        select(OrderStatus)
+        .where(OrderStatus.project_id == project_id)
+        .order_by(OrderStatus.position, OrderStatus.id)
+    )
+
+def _settings_stmt(project_id: int):
+    return select(Project.settings).where(Project.id == project_id)
+
+def _build_config(project_id: int, version: int, project_settings, statuses) -> ProjectConfig:
+    snapshots = [StatusSnapshot.model_validate(order_status) for order_status in statuses]
+    groups: Dict[str, List[int]] = {}
+    for snapshot in snapshots:
+        groups.setdefault(snapshot.group, []).append(snapshot.id)
+
+    return ProjectConfig(
+        project_id=project_id,
+        version=version,
+        settings=project_settings,
+        statuses=snapshots,
+        groups=groups
+    )
+
+async def get_project_config(db: AsyncSession, project_id: int) -> ProjectConfig:
+    """Return statuses, status groups and settings of project without hitting the database when cached"""
+    config = project_config_cache.get(project_id)
+    if config is not None:
+        return config
+
+    version = 0
+    try:
+        version = int(await redis_client.get(VERSION_KEY.format(project_id=project_id)) or 0)
+        cached = await redis_client.get(SNAPSHOT_KEY.format(project_id=project_id, version=version))
+        if cached:
+            config = ProjectConfig.model_validate_json(cached)
+            project_config_cache.incr("redis_hits")
+    except Exception as e:
+        logger.warning(f"Project config cache read failed for project {project_id}: {str(e)}")
+
+    if config is None:
+        # Snapshots are shared under the current version: build them from the primary, not a lagging replica
+        if is_replica_session(db):
+            async with AsyncSessionLocal() as primary_db:
+                return await get_project_config(primary_db, project_id)
+        project_config_cache.incr("db_lookups")
+        result = await db.execute(_settings_stmt(project_id))
+        project_settings = result.scalar_one_or_none()
+        result = await db.execute(_statuses_stmt(project_id))
+        config = _build_config(project_id, version, project_settings, result.scalars().all())
+
+        try:
+            await redis_client.set(
+                SNAPSHOT_KEY.format(project_id=project_id, version=version),
+                config.model_dump_json(),
+                ex=settings.PROJECT_CONFIG_REDIS_TTL
+            )
+        except Exception as e:
+            logger.warning(f"Project config cache write failed for project {project_id}: {str(e)}")
+
+    project_config_cache.set(project_id, config)
+    return config
+
+def get_project_config_sync(db: Session, project_id: int) -> ProjectConfig:
+    """Sync variant of get_project_config for Celery tasks"""
+    config = project_config_cache.get(project_id)
+    if config is not None:
+        return config
+
+    version = 0
+    try:
+        version = int(sync_redis_client.get(VERSION_KEY.format(project_id=project_id)) or 0)
+        cached = sync_redis_client.get(SNAPSHOT_KEY.format(project_id=project_id, version=version))
+        if cached:
+            config = ProjectConfig.model_validate_json(cached)
+            project_config_cache.incr("redis_hits")
+    except Exception as e:
+        logger.warning(f"Project config cache read failed for project {project_id}: {str(e)}")
+
+    if config is None:
+        if is_replica_session(db):
+            with SessionLocal() as primary_db:
+                return get_project_config_sync(primary_db, project_id)
+        project_config_cache.incr("db_lookups")
+        project_settings = db.execute(_settings_stmt(project_id)).scalar_one_or_none()
+        statuses = db.execute(_statuses_stmt(project_id)).scalars().all()
+        config = _build_config(project_id, version, project_settings, statuses)
+
+        try:
+            sync_redis_client.set(
+                SNAPSHOT_KEY.format(project_id=project_id, version=version),
+                config.model_dump_json(),
+                ex=settings.PROJECT_CONFIG_REDIS_TTL
+            )
+        except Exception as e:
+            logger.warning(f"Project config cache write failed for project {project_id}: {str(e)}")
+
+    project_config_cache.set(project_id, config)
+    return config
+
+async def invalidate_project_config(project_id: int):
+    """Bump the config version of project; call after the change is committed"""
+    try:
+        await redis_client.incr(VERSION_KEY.format(project_id=project_id))
+    except Exception as e:
+        logger.warning(f"Failed to bump project config version for project {project_id}: {str(e)}")
+    await publish_invalidation(PROJECT_CONFIG_CACHE_NAME, project_id)
+
+def invalidate_project_config_sync(project_id: int):
+    """Sync variant of invalidate_project_config for Celery tasks"""
+    try:
+        sync_redis_client.incr(VERSION_KEY.format(project_id=project_id))
+    except Exception as e:
+        logger.warning(f"Failed to bump project config version for project {project_id}: {str(e)}")
+    publish_invalidation_sync(PROJECT_CONFIG_CACHE_NAME, project_id)
@@ -0,0 +1,73 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, NamedTuple, Optional
+from sqlalchemy import asc, desc, tuple_
+
+NEXT = "next"
+PREV = "prev"
+
+class KeysetCursor(NamedTuple):
+    """Position after (direction "next") or before ("prev") the row with (value, id)"""
+    sort_by: str
+    sort_order: str
+    value: Any
+    id: int
+    direction: str
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def _load_value(value: Any, python_type: type) -> Any:
+    if value is None:
+        return None
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+def encode_cursor(cursor: KeysetCursor) -> str:
+    """Serialize cursor into an opaque URL-safe token"""
+    payload = json.dumps(
+        [cursor.sort_by, cursor.sort_order, _dump_value(cursor.value), cursor.id, cursor.direction],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(token: str, python_type: type) -> KeysetCursor:
+    """Parse a token from encode_cursor; raises ValueError when it is malformed"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        sort_by, sort_order, value, row_id, direction = json.loads(base64.urlsafe_b64decode(padded))
+        cursor = KeysetCursor(sort_by, sort_order, _load_value(value, python_type), int(row_id), direction)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+    
+    if cursor.direction not in (NEXT, PREV):
+        raise ValueError("Invalid cursor direction")
+    return cursor
+
+def keyset_condition(sort_column, id_column, cursor: KeysetCursor, descending: bool):
+    """Rows strictly after the cursor position in the direction of the cursor.
+    
+    Uses a row comparison, so a (..., sort_column, id_column) index serves it
+    as a single range scan.
+    """
+    # Walking backwards in a descending list means ascending values, and vice versa
+    forward_is_greater = not descending if cursor.direction == NEXT else descending
+    key = tuple_(sort_column, id_column)
+    bound = tuple_(cursor.value, cursor.id)
+    return key > bound if forward_is_greater else key < bound
+
+def keyset_order(sort_column, id_column, descending: bool, direction: Optional[str] = NEXT):
+    """ORDER BY clauses for fetching a page in the direction of the cursor"""
+    if direction == PREV:
+        descending = not descending
+    order = desc if descending else asc
+    return [order(sort_column), order(id_column)]
@@ -0,0 +1,56 @@
+import re
+from typing import Optional
+from sqlalchemy import func, literal_column
+
+# Digits kept for matching: the national number without the +7/8 trunk prefix
+NATIONAL_DIGITS = 10
+
+# Search terms that look like (part of) a phone number
+PHONE_TERM = re.compile(r"^[\d\s()+\-.]+$")
+
+# Country code for national numbers without one (orders are mostly Russian)
+DEFAULT_COUNTRY_CODE = "7"
+
+def normalize_phone(value: Optional[str], default_country_code: str = DEFAULT_COUNTRY_CODE) -> Optional[str]:
+    """E.164 form of a phone number as typed ("8 (999) 123-45-67" -> "+79991234567"), or None"""
+    if not value:
+        return None
+    
+    digits = re.sub(r"\D", "", value)
+    if not value.strip().startswith("+"):
+        if len(digits) == 11 and digits[0] == "8":
+            # Russian trunk prefix
+            digits = "7" + digits[1:]
+        elif len(digits) == 10:
+            digits = default_country_code + digits
+    
+    if not 8 <= len(digits) <= 15:
+        return None
+    return "+" + digits
+
+def phone_digits_sql(column):
+    """SQL expression with the last NATIONAL_DIGITS digits of a phone column.
+    
+    Constants are inlined, so the same expression in a WHERE clause matches
+    the expression index built from it.
+    """
+    return func.right(
+        func.regexp_replace(column, literal_column(r"'\D'"), literal_column("''"), literal_column("'g'")),
+        literal_column(str(NATIONAL_DIGITS))
+    )
+
+def phone_search_digits(term: str) -> Optional[str]:
+    """Digits to match against phone_digits_sql, or None if term is not a phone number"""
+    if not PHONE_TERM.match(term):
+        return None
+    digits = re.sub(r"\D", "", term)
+    # "+7 999 ..." and "8 999 ..." both become "999..."; partial "+7 99" and "8 99" too.
+    # Dropping a leading 8 that was part of the national number ("800 ...") only
+    # widens the substring match, which still finds it.
+    if term.strip().startswith("+7"):
+        digits = digits[1:]
+    elif term.strip().startswith("8") and len(digits) <= NATIONAL_DIGITS + 1:
+        digits = digits[1:]
+    digits = digits[-NATIONAL_DIGITS:]
+    # Trigram index needs at least 3 characters
+    return digits if len(digits) >= 3 else None
@@ -0,0 +1,58 @@
+import json
+from typing import Any, AsyncIterator, Iterable, Tuple, Union
+
+# Flush to the client roughly every 64KB
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+async def _aiter(items: Union[Iterable, AsyncIterator]):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+async def stream_json_array(items: Union[Iterable, AsyncIterator]) -> AsyncIterator[str]:
+    """Encode items as a JSON array, yielding buffered chunks"""
+    buffer = ["["]
+    size = 1
+    first = True
+    
+    async for item in _aiter(items):
+        encoded = _dumps(item) if first else "," + _dumps(item)
+        first = False
+        buffer.append(encoded)
+        size += len(encoded)
+        
+        if size >= STREAM_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    
+    buffer.append("]")
+    yield "".join(buffer)
+
+async def stream_json_object(pairs: Union[Iterable[Tuple[str, Any]], AsyncIterator]) -> AsyncIterator[str]:
+    """Encode (key, value) pairs as a JSON object, yielding buffered chunks"""
+    buffer = ["{"]
+    size = 1
+    first = True
+    
+    async for key, value in _aiter(pairs):
+        encoded = f"{_dumps(str(key))}:{_dumps(value)}"
+        if not first:
+            encoded = "," + encoded
+        first = False
+        buffer.append(encoded)
+        size += len(encoded)
+        
+        if size >= STREAM_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    
+    buffer.append("}")
+    yield "".join(buffer)
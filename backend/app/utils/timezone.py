@@ -1,6 +1,7 @@
 import pytz
 from datetime import datetime
 from typing import Optional
+from app.core.config import settings
 
 # City to timezone mapping for Russian and CIS cities
 CITY_TIMEZONE_MAP = {
@@ -269,6 +270,21 @@ def convert_to_utc(local_time: datetime, timezone_str: str) -> Optional[datetime
     except Exception:
         return None
 
+def get_project_timezone(project_settings: Optional[dict]) -> str:
+    """
+    Get timezone used for project day/month boundaries.
+    
+    Args:
+        project_settings: Project settings dict
+        
+    Returns:
+        settings["timezone"] if valid, otherwise DEFAULT_PROJECT_TIMEZONE
+    """
+    timezone_str = (project_settings or {}).get("timezone")
+    if timezone_str in pytz.all_timezones_set:
+        return timezone_str
+    return settings.DEFAULT_PROJECT_TIMEZONE
+
 def get_working_hours_status(city: str, current_time: Optional[datetime] = None) -> dict:
     """
     Check if it's working hours in the given city.
@@ -0,0 +1,17 @@
+from app.core.cache import TTLCache
+
+def test_set_skips_values_loaded_before_an_invalidation():
+    cache = TTLCache("test_epoch", maxsize=10, ttl=60)
+    epoch = cache.epoch
+    cache.pop("key")
+    cache.set("key", "stale", epoch=epoch)
+    assert cache.get("key") is None
+    
+    cache.set("key", "fresh", epoch=cache.epoch)
+    assert cache.get("key") == "fresh"
+
+def test_set_without_epoch_always_stores():
+    cache = TTLCache("test_plain", maxsize=10, ttl=60)
+    cache.clear()
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
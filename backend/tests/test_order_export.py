@@ -0,0 +1,51 @@
+import csv
+import io
+from datetime import datetime, timezone
+from openpyxl import load_workbook
+from app.schemas.main import ProjectConfig, StatusSnapshot
+from app.services.order_export import EXPORT_COLUMNS, OrderExportWriter
+
+FORMULA = '=HYPERLINK("http://example.com","click")'
+
+def _config() -> ProjectConfig:
+    return ProjectConfig(
+        project_id=1,
+        statuses=[StatusSnapshot(id=1, name="New", group="processing")]
+    )
+
+def _row(**values):
+    row = [None] * len(EXPORT_COLUMNS)
+    for index, (header, _) in enumerate(EXPORT_COLUMNS):
+        row[index] = values.get(header)
+    row[0] = 1
+    row[1] = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    row[2] = 1
+    return row + ["Item x1", "Operator"]
+
+def test_csv_export_neutralizes_formulas():
+    writer = OrderExportWriter("csv", _config())
+    data = writer.start() + writer.write([_row(Customer=FORMULA, Comment="+7 999", Address="@SUM(A1)", City="Moscow")])
+    
+    rows = list(csv.reader(io.StringIO(data.decode("utf-8-sig"))))
+    headers = rows[0]
+    exported = dict(zip(headers, rows[1]))
+    assert exported["Customer"] == "'" + FORMULA
+    assert exported["Comment"] == "'+7 999"
+    assert exported["Address"] == "'@SUM(A1)"
+    assert exported["City"] == "Moscow"
+    assert exported["Status"] == "New"
+
+def test_xlsx_export_writes_formulas_as_text():
+    writer = OrderExportWriter("xlsx", _config())
+    writer.start()
+    writer.write([_row(Customer=FORMULA, Comment="-1+1", City="Moscow")])
+    output = io.BytesIO()
+    writer.finish(output)
+    
+    sheet = load_workbook(io.BytesIO(output.getvalue())).active
+    headers = [cell.value for cell in sheet[1]]
+    cells = dict(zip(headers, sheet[2]))
+    assert cells["Customer"].value == FORMULA
+    assert cells["Customer"].data_type == "s"
+    assert cells["Comment"].data_type == "s"
+    assert cells["City"].value == "Moscow"
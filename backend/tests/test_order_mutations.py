@@ -0,0 +1,17 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.services.order_mutations import _plan_chunk
+
+def test_unchanged_amount_is_not_written():
+    row = SimpleNamespace(id=1, status_id=1, total_amount=Decimal("99.99"))
+    order_ids, history, status_changes = _plan_chunk(1, [row], {"total_amount": Decimal("99.990")}, False)
+    assert order_ids == []
+    assert history == []
+    assert status_changes == []
+
+def test_changed_amount_is_recorded():
+    row = SimpleNamespace(id=1, status_id=1, total_amount=Decimal("99.99"))
+    order_ids, history, _ = _plan_chunk(1, [row], {"total_amount": Decimal("100")}, False)
+    assert order_ids == [1]
+    assert history == [(1, "total_amount", Decimal("99.99"), Decimal("100"))]
@@ -0,0 +1,20 @@
+from app.utils.phone import normalize_phone, phone_search_digits
+
+def test_normalize_phone_trunk_prefix():
+    assert normalize_phone("8 (999) 123-45-67") == "+79991234567"
+    assert normalize_phone("999 123 45 67") == "+79991234567"
+
+def test_search_full_numbers():
+    assert phone_search_digits("+7 999 123 45 67") == "9991234567"
+    assert phone_search_digits("8 999 123 45 67") == "9991234567"
+    assert phone_search_digits("999 123 45 67") == "9991234567"
+
+def test_search_partial_8_prefixed_terms():
+    assert phone_search_digits("8 900 123") == "900123"
+    assert phone_search_digits("8900123") == "900123"
+    assert phone_search_digits("8 (900)") == "900"
+    assert phone_search_digits("+7 900 12") == "90012"
+
+def test_search_non_phone_terms():
+    assert phone_search_digits("Ivan") is None
+    assert phone_search_digits("8 9") is None